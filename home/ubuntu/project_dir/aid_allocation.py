@@ -0,0 +1,152 @@
+# aid_allocation.py - Distribution-day allocation of limited aid stock
+#
+# Given N kits per entry_type, recipients are picked in need order: highest
+# priority_score first, then larger households, then more dependents, then lower id.
+# Fairness rules are applied per entry_type: citizens who received aid of the same
+# type within the last min_days_between days are skipped, and at most
+# max_per_neighbourhood kits go to one neighbourhood (the first part of the address).
+# Greedy selection in need order is optimal under these rules. Candidates are held as
+# column arrays; with numpy installed the ordering, eligibility masks and
+# per-neighbourhood caps are vectorized, otherwise a plain Python pass is used.
+
+from array import array
+from functools import lru_cache
+from operator import attrgetter
+import re
+
+from date_normalization import date_key, normalize_column
+from text_search import normalize_text
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_NEIGHBOURHOOD_SEPARATORS = re.compile(r"\s*[-,،/]\s*")
+
+
+@lru_cache(maxsize=65536)
+def neighbourhood_of(address):
+    """Neighbourhood key of an address: its first part, normalized ("غزة - الرمال" -> "غزه")."""
+    first = _NEIGHBOURHOOD_SEPARATORS.split(str(address or "").strip(), maxsplit=1)[0]
+    return " ".join(normalize_text(first).split())
+
+
+def _numbers(values):
+    """A float column; values that are not numbers count as 0."""
+    try:
+        return array("d", values)
+    except TypeError:
+        return array("d", (_number(value) for value in values))
+
+
+def _number(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class Candidates:
+    """Column arrays of the citizens that can receive aid, built from CitizenRecords."""
+
+    def __init__(self, citizens, neighbourhood=neighbourhood_of):
+        self.records = [citizen for citizen in citizens if isinstance(citizen.id, int)]
+
+        def column(field):
+            return map(attrgetter(field), self.records)
+        self.ids = list(column("id"))
+        self.scores = _numbers(list(column("priority_score")))
+        self.household = _numbers(list(column("household_members")))
+        self.dependents = _numbers(list(column("dependents")))
+        self.neighbourhoods = list(map(neighbourhood, column("address")))
+        codes = {hood: code for code, hood in enumerate(dict.fromkeys(self.neighbourhoods))}
+        self.hood_codes = list(map(codes.__getitem__, self.neighbourhoods))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def need_order(self):
+        """Candidate positions, most in need first."""
+        if np is not None:
+            return np.lexsort((np.array(self.ids), -np.frombuffer(self.dependents),
+                               -np.frombuffer(self.household), -np.frombuffer(self.scores)))
+        return sorted(range(len(self.ids)), key=lambda i: (-self.scores[i], -self.household[i],
+                                                             -self.dependents[i], self.ids[i]))
+
+
+def recent_recipients(entries, entry_types, cutoff):
+    """{entry_type: set of citizen ids} who received that type on or after ISO date cutoff.
+
+    entries are AidEntryRecords (citizen ids are returned as they are stored there)."""
+    recent = {entry_type: set() for entry_type in entry_types}
+    legacy = []
+    entries = entries if isinstance(entries, list) else list(entries)
+    columns = zip(map(attrgetter("entry_type"), entries), map(attrgetter("date"), entries),
+                  map(attrgetter("citizen_internal_id"), entries))
+    for entry_type, date, citizen_id in columns:
+        if entry_type not in recent:
+            continue
+        if date[4:5] == "-" and date[7:8] == "-":  # ISO dates compare as text
+            if date >= cutoff:
+                recent[entry_type].add(citizen_id)
+        else:
+            legacy.append((entry_type, date, citizen_id))
+    # Legacy files mix date formats, so their dates are normalized as a whole column
+    cutoff_key = date_key(cutoff)
+    for (entry_type, _, citizen_id), date in zip(legacy, normalize_column([date for _, date, _ in legacy])):
+        if date_key(date) >= cutoff_key:
+            recent[entry_type].add(citizen_id)
+    return recent
+
+
+def _allocate_numpy(candidates, order, kits, excluded, max_per_neighbourhood, hood_codes):
+    eligible = ~np.isin(np.array(candidates.ids, dtype=np.int64), np.array(list(excluded), dtype=np.int64))
+    chosen = order[eligible[order]]
+    if max_per_neighbourhood is not None:
+        # Rank of each candidate within its neighbourhood, in need order
+        groups = hood_codes[chosen]
+        by_group = np.argsort(groups, kind="stable")
+        sorted_groups = groups[by_group]
+        starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+        counts = np.diff(np.r_[starts, len(sorted_groups)])
+        within = np.empty(len(chosen), dtype=np.int64)
+        within[by_group] = np.arange(len(sorted_groups)) - np.repeat(starts, counts)
+        chosen = chosen[within < max_per_neighbourhood]
+    return chosen[:kits].tolist()
+
+
+def _allocate_python(candidates, order, kits, excluded, max_per_neighbourhood):
+    chosen = []
+    per_neighbourhood = {}
+    for index in order:
+        if len(chosen) >= kits:
+            break
+        if candidates.ids[index] in excluded:
+            continue
+        if max_per_neighbourhood is not None:
+            hood = candidates.neighbourhoods[index]
+            if per_neighbourhood.get(hood, 0) >= max_per_neighbourhood:
+                continue
+            per_neighbourhood[hood] = per_neighbourhood.get(hood, 0) + 1
+        chosen.append(index)
+    return chosen
+
+
+def allocate(candidates, stock, recent=None, max_per_neighbourhood=None):
+    """Returns {entry_type: [candidate positions]} in need order.
+
+    stock: {entry_type: number of kits}. recent: {entry_type: citizen ids to skip}.
+    """
+    recent = recent or {}
+    order = candidates.need_order()
+    hood_codes = np.array(candidates.hood_codes, dtype=np.int64) if np is not None else None
+    plan = {}
+    for entry_type, kits in stock.items():
+        kits = max(0, int(kits))
+        excluded = {int(citizen_id) for citizen_id in recent.get(entry_type, ()) if str(citizen_id).strip().isdigit()}
+        if np is not None:
+            plan[entry_type] = _allocate_numpy(candidates, order, kits, excluded, max_per_neighbourhood, hood_codes)
+        else:
+            plan[entry_type] = _allocate_python(candidates, order, kits, excluded, max_per_neighbourhood)
+    return plan
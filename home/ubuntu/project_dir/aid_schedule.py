@@ -0,0 +1,92 @@
+# aid_schedule.py - Upcoming aid distributions ordered by due date
+#
+# An aid history entry with a next_date schedules the citizen's next aid. Only a
+# citizen's latest entry counts: a later entry either reschedules (a new next_date)
+# or closes the schedule (aid received, empty next_date). AidSchedule keeps the
+# open schedules as a sorted list of (next_date, citizen id) keys, updated with
+# bisect as entries are appended, so due-date ranges, overdue lists and the next N
+# due are answered without scanning the aid history.
+
+import bisect
+import datetime
+
+from date_normalization import date_key, normalize_column, to_iso_date
+
+# Sorts after every citizen id, for inclusive end-of-range lookups
+_MAX_ID = chr(0x10FFFF)
+
+
+def as_iso_day(value=None):
+    """ISO date of a date, datetime or date string; today when value is None."""
+    if value is None:
+        return datetime.date.today().isoformat()
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return to_iso_date(str(value).strip())
+
+
+def previous_day(iso_day):
+    return (datetime.date.fromisoformat(iso_day) - datetime.timedelta(days=1)).isoformat()
+
+
+class AidSchedule:
+    """Open aid schedules (the latest entry of each citizen, if it has a next_date) by due date."""
+
+    def __init__(self):
+        self._keys = []
+        self._entries = {}  # citizen id -> (ISO next_date, latest entry), when it is open
+        self.unparsed = 0   # open entries whose next_date could not be read as a date
+
+    def __len__(self):
+        return len(self._keys)
+
+    def rebuild(self, entries):
+        """Builds the schedule from aid entries in file order (later entries supersede earlier)."""
+        latest = {}
+        for entry in entries:
+            latest[str(entry.get("citizen_internal_id"))] = entry
+        open_entries = [(citizen_id, entry) for citizen_id, entry in latest.items() if entry.get("next_date")]
+        # Legacy files mix date formats, so the next_date column is normalized as a whole
+        dates = normalize_column([entry.get("next_date") for _, entry in open_entries])
+        self._entries = {}
+        self._keys = []
+        self.unparsed = 0
+        for (citizen_id, entry), next_date in zip(open_entries, dates):
+            if not date_key(next_date):
+                self.unparsed += 1
+                continue
+            self._entries[citizen_id] = (next_date, entry)
+            self._keys.append((next_date, citizen_id))
+        self._keys.sort()
+
+    def record(self, entry):
+        """Applies an aid entry appended after the build: it supersedes the citizen's schedule."""
+        citizen_id = str(entry.get("citizen_internal_id"))
+        self._remove(citizen_id)
+        if not entry.get("next_date"):
+            return
+        next_date = as_iso_day(entry.get("next_date"))
+        if not date_key(next_date):
+            self.unparsed += 1
+            return
+        self._entries[citizen_id] = (next_date, entry)
+        bisect.insort(self._keys, (next_date, citizen_id))
+
+    def _remove(self, citizen_id):
+        current = self._entries.pop(citizen_id, None)
+        if current is None:
+            return
+        key = (current[0], citizen_id)
+        index = bisect.bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            del self._keys[index]
+
+    def between(self, start=None, end=None, limit=None):
+        """[(next_date, entry)] due from start to end (ISO dates, both inclusive), earliest first."""
+        low = 0 if start is None else bisect.bisect_left(self._keys, (start,))
+        high = len(self._keys) if end is None else bisect.bisect_right(self._keys, (end, _MAX_ID))
+        if limit is not None:
+            high = min(high, low + max(0, limit))
+        return [self._entries[citizen_id] for _, citizen_id in self._keys[low:high]]
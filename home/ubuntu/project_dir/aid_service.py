@@ -0,0 +1,235 @@
+# aid_service.py - Optional HTTP/JSON service in front of backend_functions
+#
+# One process opens the data files, keeps the in-memory indexes warm and answers
+# requests from any number of workstations, instead of every Tk client reading the
+# CSV files itself. Requests are handled on a thread pool; reads run concurrently
+# (the indexes have their own locks) while writes are serialized by one lock.
+#
+# Protocol: POST /api/<function> with a JSON body {"args": [...], "kwargs": {...}}
+# answers {"result": ...}, or {"error": "..."} with a 4xx/5xx status. GET /health
+# answers {"status": "ok"}. Only the functions in SERVICE_FUNCTIONS can be called.
+# When CITIZEN_AID_SERVICE_TOKEN is set, requests must send it in X-Service-Token.
+#
+# RemoteBackend is the client side: it has the same call signatures as
+# backend_functions for the exposed functions, so the Tk app can use it in place of
+# the module (integrated_app.py does when CITIZEN_AID_SERVICE_URL is set).
+
+import argparse
+import datetime
+import hmac
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import backend_functions as be
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 8
+MAX_REQUEST_BYTES = 1024 * 1024
+SERVICE_TOKEN = os.environ.get("CITIZEN_AID_SERVICE_TOKEN", "")
+TOKEN_HEADER = "X-Service-Token"
+
+READ_FUNCTIONS = frozenset({
+    "verify_admin_login_csv", "verify_citizen_login_csv", "check_citizen_exists_csv",
+    "get_citizen_by_national_id_csv", "get_citizen_details_csv", "search_citizens",
+    "query_citizens", "get_citizens_list_csv", "get_citizens_page_csv", "top_k_citizens",
+    "get_ranked_citizens_page", "get_citizen_rank", "page_citizens", "read_aid_history",
+    "page_aid_history", "check_citizen_received_aid", "get_aid_due_between",
+    "get_overdue_aid", "get_next_due_aid", "plan_aid_allocation", "read_messages",
+    "get_inbox", "page_messages", "get_statistics",
+})
+WRITE_FUNCTIONS = frozenset({
+    "register_citizen_csv", "register_admin_csv", "update_citizen_details_csv",
+    "save_aid_history_entry", "record_aid_allocation", "save_message_entry",
+})
+SERVICE_FUNCTIONS = READ_FUNCTIONS | WRITE_FUNCTIONS
+
+
+class ServiceError(RuntimeError):
+    """A request the service rejected or failed to answer; status is the HTTP status (0 if unreachable)."""
+
+    def __init__(self, message, status=0):
+        super().__init__(message)
+        self.status = status
+
+
+def _without_password_hash(admin):
+    if admin:
+        admin = dict(admin)
+        admin.pop("password_hash", None)
+    return admin
+
+
+# Results that must not leave the service as the backend returns them
+_RESULT_FILTERS = {"verify_admin_login_csv": _without_password_hash}
+
+_write_lock = threading.Lock()
+
+
+def call_backend(name, args=(), kwargs=None):
+    """Runs one exposed backend function; writes are serialized."""
+    if name not in SERVICE_FUNCTIONS:
+        raise KeyError(name)
+    function = getattr(be, name)
+    if name in WRITE_FUNCTIONS:
+        with _write_lock:
+            result = function(*args, **(kwargs or {}))
+    else:
+        result = function(*args, **(kwargs or {}))
+    result_filter = _RESULT_FILTERS.get(name)
+    return result_filter(result) if result_filter else result
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = "CitizenAidService/1.0"
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self):
+        if not SERVICE_TOKEN:
+            return True
+        return hmac.compare_digest(self.headers.get(TOKEN_HEADER, ""), SERVICE_TOKEN)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if not self._authorized():
+            self._send_json(401, {"error": "Missing or wrong service token"})
+            return
+        prefix = "/api/"
+        name = self.path[len(prefix):] if self.path.startswith(prefix) else None
+        if name not in SERVICE_FUNCTIONS:
+            self._send_json(404, {"error": f"Unknown function {name or self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_REQUEST_BYTES:
+                self._send_json(413, {"error": "Request body too large"})
+                return
+            request = json.loads(self.rfile.read(length) or b"{}")
+            args, kwargs = request.get("args", []), request.get("kwargs", {})
+            if not isinstance(args, list) or not isinstance(kwargs, dict):
+                raise ValueError("args must be a list and kwargs an object")
+        except (ValueError, AttributeError) as e:
+            self._send_json(400, {"error": f"Bad request: {e}"})
+            return
+        try:
+            result = call_backend(name, args, kwargs)
+        except (TypeError, ValueError) as e:
+            self._send_json(400, {"error": f"{name}: {e}"})
+        except Exception as e:
+            self.log_error("%s failed: %r", name, e)
+            self._send_json(500, {"error": f"{name} failed: {e}"})
+        else:
+            self._send_json(200, {"result": result})
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that handles each connection on a fixed pool of worker threads."""
+
+    def __init__(self, address, handler_class, workers=DEFAULT_WORKERS):
+        super().__init__(address, handler_class)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aid-service")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def create_server(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS):
+    """Prepares the data files, warms the indexes and returns a server ready for serve_forever()."""
+    be.setup_csv_files()
+    be.warm_indexes()
+    return PooledHTTPServer((host, port), _RequestHandler, workers)
+
+
+def _json_default(value):
+    """Sends dates as ISO strings; anything else that JSON cannot carry (callables, say) is refused."""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} cannot be sent to the service")
+
+
+class RemoteBackend:
+    """Client for the service with the call signatures of backend_functions.
+
+    remote = RemoteBackend("http://127.0.0.1:8765"); remote.get_statistics()
+    """
+
+    def __init__(self, url, token=None, timeout=30):
+        self.url = url.rstrip("/")
+        self.token = SERVICE_TOKEN if token is None else token
+        self.timeout = timeout
+
+    def call(self, name, *args, **kwargs):
+        body = json.dumps({"args": list(args), "kwargs": kwargs}, default=_json_default).encode("utf-8")
+        request = urllib.request.Request(f"{self.url}/api/{name}", data=body, method="POST",
+                                         headers={"Content-Type": "application/json"})
+        if self.token:
+            request.add_header(TOKEN_HEADER, self.token)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())["result"]
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error", e.reason)
+            except ValueError:
+                message = e.reason
+            raise ServiceError(message, e.code) from None
+        except urllib.error.URLError as e:
+            raise ServiceError(f"Service at {self.url} is unreachable: {e.reason}") from None
+
+    def setup_csv_files(self):
+        """The service prepares the data files itself; kept so clients can call it unconditionally."""
+
+    def __getattr__(self, name):
+        if name not in SERVICE_FUNCTIONS:
+            raise AttributeError(f"{name} is not available through the service")
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+
+# ---------------------------- MAIN ----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Serve the citizen aid backend over HTTP/JSON.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.workers)
+    print(f"Citizen aid service listening on http://{args.host}:{args.port} ({args.workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# aid_statistics.py - Streaming aggregates behind the System Statistics panel
+#
+# StatisticsAccumulator consumes citizens, aid entries and messages one row at a
+# time and keeps every aggregate the dashboard and the test report show: totals,
+# active / inactive, received / not received, operations per entry_type and the
+# priority score distribution. Rows can be added (and citizens replaced) after
+# the initial pass, so the numbers stay current without re-reading any file and
+# snapshot() is O(number of distinct scores and entry types).
+
+from collections import Counter
+
+
+def _score(citizen):
+    try:
+        return float(citizen.get("priority_score") or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _is_active(citizen):
+    value = citizen.get("is_active", True)
+    return value if isinstance(value, bool) else str(value).strip().lower() == "true"
+
+
+class StatisticsAccumulator:
+    """Incrementally maintained aggregates over citizens, aid history and messages."""
+
+    def __init__(self):
+        self.citizen_ids = set()
+        self.received_ids = set()  # citizens with an entry that has no next_date, registered or not
+        self.active_citizens = 0
+        self.received_citizens = 0
+        self.score_sum = 0.0
+        self.score_counts = Counter()
+        self.aid_operations = 0
+        self.operations_by_type = Counter()
+        self.total_messages = 0
+
+    # ---------------------------- CITIZENS ----------------------------
+    def add_citizen(self, citizen):
+        citizen_id = str(citizen.get("id"))
+        if citizen_id in self.citizen_ids:
+            return
+        self.citizen_ids.add(citizen_id)
+        self.active_citizens += _is_active(citizen)
+        self.received_citizens += citizen_id in self.received_ids
+        score = _score(citizen)
+        self.score_sum += score
+        self.score_counts[score] += 1
+
+    def remove_citizen(self, citizen):
+        citizen_id = str(citizen.get("id"))
+        if citizen_id not in self.citizen_ids:
+            return
+        self.citizen_ids.discard(citizen_id)
+        self.active_citizens -= _is_active(citizen)
+        self.received_citizens -= citizen_id in self.received_ids
+        score = _score(citizen)
+        self.score_sum -= score
+        self.score_counts[score] -= 1
+        if self.score_counts[score] <= 0:
+            del self.score_counts[score]
+
+    def replace_citizen(self, old, new):
+        self.remove_citizen(old)
+        self.add_citizen(new)
+
+    # ---------------------------- AID AND MESSAGES ----------------------------
+    def add_aid_entry(self, entry):
+        self.aid_operations += 1
+        self.operations_by_type[entry.get("entry_type") or ""] += 1
+        citizen_id = str(entry.get("citizen_internal_id"))
+        if entry.get("next_date") == "" and citizen_id not in self.received_ids:
+            self.received_ids.add(citizen_id)
+            self.received_citizens += citizen_id in self.citizen_ids
+
+    def add_message(self, message=None):
+        self.total_messages += 1
+
+    # ---------------------------- RESULTS ----------------------------
+    def snapshot(self):
+        total = len(self.citizen_ids)
+        scores = [score for score, count in self.score_counts.items() if count > 0]
+        return {
+            "total_citizens": total,
+            "active_citizens": self.active_citizens,
+            "inactive_citizens": total - self.active_citizens,
+            "received_aid": self.received_citizens,
+            "not_received": total - self.received_citizens,
+            "aid_operations": self.aid_operations,
+            "operations_by_type": dict(self.operations_by_type),
+            "total_messages": self.total_messages,
+            "score_min": min(scores) if scores else 0.0,
+            "score_max": max(scores) if scores else 0.0,
+            "score_average": self.score_sum / total if total else 0.0,
+            "score_distribution": {score: self.score_counts[score] for score in sorted(scores)},
+        }
+
+
+def compute_statistics(citizens, aid_entries, messages=()):
+    """One streaming pass over the three tables. Returns the snapshot dict."""
+    stats = StatisticsAccumulator()
+    for citizen in citizens:
+        stats.add_citizen(citizen)
+    for entry in aid_entries:
+        stats.add_aid_entry(entry)
+    for message in messages:
+        stats.add_message(message)
+    return stats.snapshot()
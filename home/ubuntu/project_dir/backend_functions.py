@@ -1,19 +1,59 @@
 # backend_functions.py - Improved and Complete Version with Sync Fix
 
+import codecs
 import csv
 import os
+import sys
 import datetime
 import tempfile
 import shutil
 import hashlib
+import heapq
+import base64
+import json
+import threading
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from itertools import chain, islice
+
+from date_normalization import normalize_rows, to_iso_date
+from priority_ranking import PriorityRanking, ranking_key, top_k_heap
+from aid_statistics import StatisticsAccumulator, compute_statistics
+from aid_schedule import AidSchedule, as_iso_day, previous_day
+from aid_allocation import Candidates, allocate, recent_recipients
+from duplicate_detection import DEFAULT_MIN_SCORE, find_duplicates
+from text_search import SearchIndex
+from records import AdminRecord, AidEntryRecord, CitizenRecord, Record
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 # Configuration: Define file paths and Fieldnames
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-CITIZENS_CSV_FILE = os.path.join(BASE_DIR, "citizens_data.csv")
-ADMINS_CSV_FILE = os.path.join(BASE_DIR, "admins_data.csv")
-AID_HISTORY_CSV_FILE = os.path.join(BASE_DIR, "aid_history.csv")
-MESSAGES_CSV_FILE = os.path.join(BASE_DIR, "messages.csv")
-ID_COUNTER_FILE = os.path.join(BASE_DIR, "citizen_id_counter.txt")
+# Directory of the data files; CITIZEN_AID_DATA_DIR points a process at another data set
+DATA_DIR = os.environ.get("CITIZEN_AID_DATA_DIR") or BASE_DIR
+CITIZENS_CSV_FILE = os.path.join(DATA_DIR, "citizens_data.csv")
+ADMINS_CSV_FILE = os.path.join(DATA_DIR, "admins_data.csv")
+AID_HISTORY_CSV_FILE = os.path.join(DATA_DIR, "aid_history.csv")
+MESSAGES_CSV_FILE = os.path.join(DATA_DIR, "messages.csv")
+ID_COUNTER_FILE = os.path.join(DATA_DIR, "citizen_id_counter.txt")
+ADMINS_ID_COUNTER_FILE = os.path.join(DATA_DIR, "admin_id_counter.txt")
+AID_HISTORY_ID_COUNTER_FILE = os.path.join(DATA_DIR, "aid_history_id_counter.txt")
+MESSAGES_ID_COUNTER_FILE = os.path.join(DATA_DIR, "message_id_counter.txt")
+CITIZEN_CHANGES_CSV_FILE = os.path.join(DATA_DIR, "citizens_changes.csv")
+CITIZENS_LOCK_FILE = CITIZENS_CSV_FILE + ".lock"
+
+# Storage backend: "csv" (default) or "sqlite". Set CITIZEN_AID_STORAGE=sqlite or call
+# configure_storage() to run every function below against a local SQLite database instead.
+STORAGE_BACKEND = os.environ.get("CITIZEN_AID_STORAGE", "csv").strip().lower()
+SQLITE_DB_FILE = os.environ.get("CITIZEN_AID_DB", os.path.join(DATA_DIR, "citizen_aid.db"))
+
+# Fold the citizen change log back into citizens_data.csv once it grows past this size
+CITIZEN_CHANGES_COMPACT_BYTES = 256 * 1024
 
 # Define the exact headers/fieldnames for CSV files
 CITIZENS_FIELDNAMES = [
@@ -34,6 +74,32 @@ MESSAGES_FIELDNAMES = [
     "id", "citizen_internal_id", "message", "timestamp"
 ]
 
+CITIZEN_CHANGES_FIELDNAMES = [
+    "citizen_id", "field", "value", "timestamp"
+]
+
+DATA_FILES = {
+    CITIZENS_CSV_FILE: CITIZENS_FIELDNAMES,
+    ADMINS_CSV_FILE: ADMINS_FIELDNAMES,
+    AID_HISTORY_CSV_FILE: AID_HISTORY_FIELDNAMES,
+    MESSAGES_CSV_FILE: MESSAGES_FIELDNAMES
+}
+
+# Date columns of each file and their canonical form ("date" -> YYYY-MM-DD, "timestamp" -> ISO datetime)
+DATE_COLUMNS = {
+    CITIZENS_CSV_FILE: {"date_of_birth": "date", "registration_date": "timestamp"},
+    AID_HISTORY_CSV_FILE: {"date": "date", "next_date": "date", "timestamp": "timestamp"},
+    MESSAGES_CSV_FILE: {"timestamp": "timestamp"},
+    CITIZEN_CHANGES_CSV_FILE: {"timestamp": "timestamp"}
+}
+
+TABLE_NAMES = {
+    CITIZENS_CSV_FILE: "citizens",
+    ADMINS_CSV_FILE: "admins",
+    AID_HISTORY_CSV_FILE: "aid_history",
+    MESSAGES_CSV_FILE: "messages"
+}
+
 # ---------------------------- PASSWORD HASHING ----------------------------
 def _hash_password(password):
     salt = "citizen_aid_system_2024"
@@ -42,30 +108,224 @@ def _hash_password(password):
 # ---------------------------- ID SYNC FUNCTIONS ----------------------------
 def update_citizen_id_counter(new_value):
     """Updates the citizen_id_counter.txt file with a new value."""
-    try:
-        with open(ID_COUNTER_FILE, "w") as f:
-            f.write(str(new_value))
-    except IOError as e:
-        print(f"Warning: Could not update {ID_COUNTER_FILE}: {e}")
+    _id_sequences[CITIZENS_CSV_FILE].set_next(new_value)
 
 def sync_citizen_id_counter():
     """Synchronizes the counter file with the max ID from citizens_data.csv."""
-    if os.path.exists(CITIZENS_CSV_FILE):
+    _id_sequences[CITIZENS_CSV_FILE].rebuild()
+# ---------------------------- FILE LOCKING ----------------------------
+def _lock_fd(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+
+def _unlock_fd(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+@contextmanager
+def _locked(lock_file):
+    """Holds an exclusive inter-process lock on lock_file for the duration of the block."""
+    os.makedirs(os.path.dirname(lock_file) or ".", exist_ok=True)
+    fd = os.open(lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        _lock_fd(fd)
         try:
-            import pandas as pd
-            df = pd.read_csv(CITIZENS_CSV_FILE)
-            if not df.empty and "id" in df.columns:
-                max_id = df["id"].astype(int).max()
-                update_citizen_id_counter(int(max_id) + 1)
-        except Exception as e:
-            print(f"Warning: Could not sync citizen ID counter: {e}")
+            yield
+        finally:
+            _unlock_fd(fd)
+    finally:
+        os.close(fd)
+
+# ---------------------------- CSV FORMAT DETECTION ----------------------------
+# Legacy data files come in other shapes than the canonical UTF-8 comma CSV we write:
+# aid_history.csv is tab-delimited and messages.csv starts with a UTF-8 BOM. The format
+# of each file is sniffed once and cached until its size or mtime changes.
+CANONICAL_CSV_FORMAT = ("utf-8", ",")
+_CSV_DELIMITERS = (",", "\t", ";", "|")
+_csv_format_cache = {}
+_csv_format_lock = threading.Lock()
+
+def _sniff_csv_format(file_path):
+    with open(file_path, "rb") as f:
+        head = f.read(64 * 1024)
+    if head.startswith(codecs.BOM_UTF8):
+        encoding = "utf-8-sig"
+    elif head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        encoding = "utf-16"
+    else:
+        try:
+            codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+            encoding = "utf-8"
+        except UnicodeDecodeError:
+            encoding = "cp1256"  # Arabic Windows exports
+    try:
+        text = codecs.getincrementaldecoder(encoding)(errors="replace").decode(head, final=False)
+    except LookupError:
+        text = ""
+    header = text.lstrip("\ufeff").splitlines()[0] if text.strip() else ""
+    delimiter = max(_CSV_DELIMITERS, key=header.count) if header else ","
+    if header.count(delimiter) == 0:
+        delimiter = ","
+    return encoding, delimiter
+
+def _detect_csv_format(file_path):
+    """Returns (encoding, delimiter) of a data file, sniffing it only when its size or mtime changed."""
+    st = os.stat(file_path)
+    key = (st.st_size, st.st_mtime_ns)
+    cached = _csv_format_cache.get(file_path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    csv_format = _sniff_csv_format(file_path)
+    with _csv_format_lock:
+        _csv_format_cache[file_path] = (key, csv_format)
+    return csv_format
+
+def _remember_csv_format(file_path, csv_format):
+    """Re-keys the cached format after this process wrote the file, so the next read skips sniffing."""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return
+    with _csv_format_lock:
+        _csv_format_cache[file_path] = ((st.st_size, st.st_mtime_ns), csv_format)
+
+# ---------------------------- READ CACHE ----------------------------
+# Parsed rows of each data file are kept in memory and reused while the file's
+# (inode, size, mtime_ns) signature is unchanged, so screens that re-read the same
+# files every few seconds do not re-parse them. Rows are held as tuples in file
+# column order (one header per file) rather than as dicts. Appends and rewrites
+# made through this module update the cached rows in place. Files are evicted
+# least recently used first once the estimated size of all cached rows passes
+# READ_CACHE_MAX_BYTES.
+READ_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_ROW_OVERHEAD_BYTES = 56
+_FIELD_OVERHEAD_BYTES = 57
+
+def _stat_signature(file_path):
+    """(inode, size, mtime_ns) of a file, or None if it does not exist."""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+def _estimate_row_bytes(values):
+    return _ROW_OVERHEAD_BYTES + sum(_FIELD_OVERHEAD_BYTES + len(value) for value in values)
+
+class _ReadCache:
+    """LRU cache of parsed CSV rows keyed by file path and validated by file signature."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self._entries = OrderedDict()  # file_path -> [signature, header, rows, estimated bytes]
+        self._total_bytes = 0
+
+    def _drop(self, file_path):
+        entry = self._entries.pop(file_path, None)
+        if entry is not None:
+            self._total_bytes -= entry[3]
+
+    def _store(self, file_path, signature, header, rows, size):
+        self._drop(file_path)
+        if signature is None or size > self.max_bytes:
+            return
+        self._entries[file_path] = [signature, header, rows, size]
+        self._total_bytes += size
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+
+    def rows(self, file_path):
+        """Returns (header, rows) of a file, parsing it only if it changed since it was cached.
+
+        Files too large for the cache are streamed instead of being held in memory.
+        """
+        signature = _stat_signature(file_path)
+        if signature is None:
+            raise FileNotFoundError(file_path)
+        with self.lock:
+            entry = self._entries.get(file_path)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(file_path)
+                return entry[1], entry[2]
+        header, rows = _parse_csv_rows(file_path)
+        if signature[1] > self.max_bytes:
+            return header, rows
+        rows = list(rows)
+        with self.lock:
+            self._store(file_path, signature, header, rows, sum(_estimate_row_bytes(row) for row in rows))
+        return header, rows
+
+    def appended(self, file_path, signature_before, rows, bytes_written):
+        """Extends the cached rows after an append, if nobody else wrote to the file meanwhile."""
+        signature = _stat_signature(file_path)
+        with self.lock:
+            entry = self._entries.get(file_path)
+            if entry is None:
+                return
+            if (signature is None or entry[0] != signature_before
+                    or signature[1] - signature_before[1] != bytes_written):
+                self._drop(file_path)
+                return
+            header = entry[1]
+            rows = [tuple(row.get(field, "") for field in header) for row in rows]
+            added = sum(_estimate_row_bytes(row) for row in rows)
+            entry[0] = signature
+            entry[2].extend(rows)
+            entry[3] += added
+            self._total_bytes += added
+            self._entries.move_to_end(file_path)
+            if self._total_bytes > self.max_bytes:
+                self._store(file_path, signature, header, entry[2], entry[3])
+
+    def replaced(self, file_path, fieldnames, rows, size):
+        """Caches the rows a file was just rewritten with (rows is None when they were too many to keep)."""
+        signature = _stat_signature(file_path)
+        with self.lock:
+            if rows is None:
+                self._drop(file_path)
+            else:
+                self._store(file_path, signature, tuple(fieldnames), rows, size)
+
+    def invalidate(self, file_path=None):
+        with self.lock:
+            if file_path is None:
+                self._entries.clear()
+                self._total_bytes = 0
+            else:
+                self._drop(file_path)
+
+_read_cache = _ReadCache(READ_CACHE_MAX_BYTES)
+
 # ---------------------------- CSV FUNCTIONS ----------------------------
+def _parse_csv_rows(file_path):
+    """Returns (header, iterator of row tuples) of a data file; header names are stripped."""
+    encoding, delimiter = _detect_csv_format(file_path)
+    f = open(file_path, "r", newline="", encoding=encoding)
+    reader = csv.reader(f, delimiter=delimiter)
+    header = tuple(name.strip() for name in next(reader, []))
+
+    def iter_rows():
+        with f:
+            for row in reader:
+                if row:  # csv.DictReader skipped empty lines too
+                    yield tuple(row)
+    return header, iter_rows()
+
 def read_csv_dict(file_path, fieldnames):
     try:
-        with open(file_path, "r", newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                yield {field: row.get(field, "") for field in fieldnames}
+        header, rows = _read_cache.rows(file_path)
+        positions = [(field, header.index(field) if field in header else len(header)) for field in fieldnames]
+        for row in rows:
+            size = len(row)
+            yield {field: row[index] if index < size else "" for field, index in positions}
     except FileNotFoundError:
         print(f"Info: File not found {file_path}. Returning empty data.")
         return
@@ -73,15 +333,33 @@ def read_csv_dict(file_path, fieldnames):
         print(f"Error reading CSV {file_path}: {e}")
         return
 
+def _as_written(row, fieldnames):
+    """The row as it reads back from the file after csv.DictWriter wrote it."""
+    return {field: "" if row.get(field) is None else str(row.get(field)) for field in fieldnames}
+
 def append_csv_dict(file_path, data_dict, fieldnames):
-    file_exists = os.path.isfile(file_path) and os.path.getsize(file_path) > 0
+    return append_csv_rows(file_path, [data_dict], fieldnames)
+
+def append_csv_rows(file_path, rows, fieldnames):
+    """Appends many rows with a single open/write of the file, keeping the file's existing format."""
+    signature_before = _stat_signature(file_path)
+    file_exists = signature_before is not None and signature_before[1] > 0
     try:
-        with open(file_path, "a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames, quoting=csv.QUOTE_MINIMAL, extrasaction='ignore')
+        encoding, delimiter = _detect_csv_format(file_path) if file_exists else CANONICAL_CSV_FORMAT
+        written = [_as_written(row, fieldnames) for row in rows]
+        with open(file_path, "a", newline="", encoding=encoding) as f:
+            start = f.tell()
+            writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter=delimiter,
+                                    quoting=csv.QUOTE_MINIMAL, extrasaction='ignore')
             if not file_exists:
                 writer.writeheader()
-            row_to_write = {field: data_dict.get(field, "") for field in fieldnames}
-            writer.writerow(row_to_write)
+            writer.writerows(written)
+            bytes_written = f.tell() - start
+        _remember_csv_format(file_path, (encoding, delimiter))
+        if file_exists:
+            _read_cache.appended(file_path, signature_before, written, bytes_written)
+        else:
+            _read_cache.invalidate(file_path)
         return True
     except IOError as e:
         print(f"Error appending to CSV {file_path}: {e}")
@@ -89,14 +367,32 @@ def append_csv_dict(file_path, data_dict, fieldnames):
 
 def overwrite_csv_dict(file_path, list_of_dicts, fieldnames):
     temp_file_path = None
+    written = []
+    written_bytes = 0
+
+    def remember(rows):
+        # Keep what was written for the read cache, unless it grows past the cache size
+        nonlocal written, written_bytes
+        for row in rows:
+            row = _as_written(row, fieldnames)
+            if written is not None:
+                values = tuple(row.values())
+                written.append(values)
+                written_bytes += _estimate_row_bytes(values)
+                if written_bytes > _read_cache.max_bytes:
+                    written = None
+            yield row
+
     try:
         os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
         temp_fd, temp_file_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or ".", prefix=os.path.basename(file_path) + ".tmp")
         with os.fdopen(temp_fd, "w", newline="", encoding="utf-8") as temp_f:
             writer = csv.DictWriter(temp_f, fieldnames=fieldnames, quoting=csv.QUOTE_MINIMAL, extrasaction='ignore')
             writer.writeheader()
-            writer.writerows([{field: d.get(field, "") for field in fieldnames} for d in list_of_dicts])
+            writer.writerows(remember(list_of_dicts))
         shutil.move(temp_file_path, file_path)
+        _remember_csv_format(file_path, CANONICAL_CSV_FORMAT)
+        _read_cache.replaced(file_path, fieldnames, written, written_bytes)
         return True
     except Exception as e:
         print(f"Error overwriting CSV {file_path}: {e}")
@@ -105,63 +401,637 @@ def overwrite_csv_dict(file_path, list_of_dicts, fieldnames):
                 os.remove(temp_file_path)
             except OSError:
                 pass
+        _read_cache.invalidate(file_path)
         return False
-# ---------------------------- ID GENERATION ----------------------------
-def get_next_citizen_id_csv():
-    max_id = 0
-    try:
-        existing_ids = []
-        for citizen in read_csv_dict(CITIZENS_CSV_FILE, CITIZENS_FIELDNAMES):
-            try:
-                citizen_id = int(citizen.get("id", 0))
-                existing_ids.append(citizen_id)
-            except (ValueError, TypeError):
+
+def _read_header(file_path, csv_format):
+    encoding, delimiter = csv_format
+    with open(file_path, "r", newline="", encoding=encoding) as f:
+        return next(csv.reader(f, delimiter=delimiter), [])
+
+def _renumber_duplicate_ids(rows):
+    """Gives rows whose id is missing or already taken a fresh id past the current maximum."""
+    ids = [int(row["id"]) for row in rows if str(row.get("id", "")).strip().isdigit()]
+    next_id = max(ids, default=0) + 1
+    seen = set()
+    renumbered = 0
+    for row in rows:
+        row_id = str(row.get("id", "")).strip()
+        if row_id.isdigit() and row_id not in seen:
+            seen.add(row_id)
+            continue
+        row["id"] = str(next_id)
+        next_id += 1
+        renumbered += 1
+    return renumbered
+
+def normalize_data_files():
+    """Rewrites legacy data files once as canonical UTF-8 comma CSV with ISO dates
+    (BOM, non UTF-8, tab/semicolon delimited, untidy headers, "27. 04. 2025" style dates,
+    blank rows and duplicate ids),
+    so later reads never need to sniff them and date filters are plain string comparisons.
+
+    Returns the list of files that were rewritten.
+    """
+    compact_citizen_changes()
+    rewritten = []
+    files = dict(DATA_FILES)
+    files[CITIZEN_CHANGES_CSV_FILE] = CITIZEN_CHANGES_FIELDNAMES
+    for file_path, fieldnames in files.items():
+        if not os.path.isfile(file_path) or os.path.getsize(file_path) == 0:
+            continue
+        with _locked(file_path + ".lock"):
+            csv_format = _detect_csv_format(file_path)
+            all_rows = list(read_csv_dict(file_path, fieldnames))
+            rows = [row for row in all_rows if any(str(value).strip() for value in row.values())]
+            ids_changed = _renumber_duplicate_ids(rows) if "id" in fieldnames else 0
+            dates_changed = normalize_rows(rows, DATE_COLUMNS.get(file_path, {}))
+            if (csv_format == CANONICAL_CSV_FORMAT and not dates_changed and not ids_changed
+                    and len(rows) == len(all_rows) and _read_header(file_path, csv_format) == fieldnames):
                 continue
-        if existing_ids:
-            max_id = max(existing_ids)
-        else:
-            if os.path.exists(ID_COUNTER_FILE):
-                with open(ID_COUNTER_FILE, "r") as f:
-                    content = f.read().strip()
-                    if content:
-                        counter_val = int(content)
-                        if counter_val > max_id:
-                            max_id = counter_val - 1
-    except Exception:
-        max_id = 0
+            if overwrite_csv_dict(file_path, rows, fieldnames):
+                rewritten.append(file_path)
+                print(f"Normalized {file_path} (was {csv_format[0]}, delimiter {csv_format[1]!r}, "
+                      f"{dates_changed} dates converted, {ids_changed} duplicate ids renumbered, "
+                      f"{len(all_rows) - len(rows)} blank rows dropped)")
+    if rewritten:
+        rebuild_id_sequences()
+    return rewritten
 
-    next_id = max_id + 1
-    try:
-        os.makedirs(os.path.dirname(ID_COUNTER_FILE) or ".", exist_ok=True)
-        with open(ID_COUNTER_FILE, "w") as f:
-            f.write(str(next_id))
-    except IOError as e:
-        print(f"Warning: Could not update {ID_COUNTER_FILE}: {e}")
-    return next_id
+# ---------------------------- STORAGE BACKEND ----------------------------
+_sqlite_storage = None
+_storage_lock = threading.Lock()
 
-def get_next_id_for_table(csv_file, fieldnames):
-    max_id = 0
-    try:
-        for row in read_csv_dict(csv_file, fieldnames):
+def configure_storage(backend, db_file=None):
+    """Selects the "csv" or "sqlite" storage backend for this process."""
+    global STORAGE_BACKEND, SQLITE_DB_FILE, _sqlite_storage
+    if backend not in ("csv", "sqlite"):
+        raise ValueError(f"Unknown storage backend: {backend}")
+    with _storage_lock:
+        STORAGE_BACKEND = backend
+        if db_file:
+            SQLITE_DB_FILE = db_file
+        _sqlite_storage = None
+    for sequence in _id_sequences.values():
+        sequence.invalidate()
+
+def _sqlite():
+    """Returns the SQLite storage when that backend is selected, otherwise None."""
+    global _sqlite_storage
+    if STORAGE_BACKEND != "sqlite":
+        return None
+    with _storage_lock:
+        if _sqlite_storage is None:
+            from sqlite_storage import SQLiteStorage
+            _sqlite_storage = SQLiteStorage(SQLITE_DB_FILE)
+        return _sqlite_storage
+
+def iter_table(csv_file, fieldnames):
+    """Yields every row of a table from the configured storage backend."""
+    db = _sqlite()
+    if db is not None:
+        return db.iter_rows(TABLE_NAMES[csv_file])
+    if csv_file == CITIZENS_CSV_FILE:
+        return iter_citizens()
+    return read_csv_dict(csv_file, fieldnames)
+
+def _insert_rows(csv_file, rows, fieldnames):
+    db = _sqlite()
+    if db is not None:
+        return db.insert_rows(TABLE_NAMES[csv_file], rows)
+    return append_csv_rows(csv_file, rows, fieldnames)
+
+def _find_citizen_by_id(internal_id):
+    db = _sqlite()
+    if db is not None:
+        return db.find_row("citizens", "id", internal_id)
+    return _citizen_index.get_by_id(internal_id)
+
+def _find_citizen_by_national_id(national_id):
+    db = _sqlite()
+    if db is not None:
+        return db.find_row("citizens", "national_id", national_id)
+    return _citizen_index.get_by_national_id(national_id)
+
+def _find_admins_by_username(username):
+    db = _sqlite()
+    if db is not None:
+        return db.find_rows("admins", "username", username)
+    return [admin for admin in read_csv_dict(ADMINS_CSV_FILE, ADMINS_FIELDNAMES)
+            if admin.get("username") == username]
+
+def migrate_csv_to_sqlite(db_file=None):
+    """One-shot copy of the four CSV tables into a SQLite database.
+
+    Existing rows in the database are replaced. Returns {table name: rows copied}.
+    """
+    from sqlite_storage import SQLiteStorage
+    storage = SQLiteStorage(db_file or SQLITE_DB_FILE)
+    sources = {
+        "citizens": iter_citizens(),
+        "admins": read_csv_dict(ADMINS_CSV_FILE, ADMINS_FIELDNAMES),
+        "aid_history": read_csv_dict(AID_HISTORY_CSV_FILE, AID_HISTORY_FIELDNAMES),
+        "messages": read_csv_dict(MESSAGES_CSV_FILE, MESSAGES_FIELDNAMES)
+    }
+    copied = {}
+    date_columns = {TABLE_NAMES[csv_file]: columns for csv_file, columns in DATE_COLUMNS.items()
+                    if csv_file in TABLE_NAMES}
+    for table, rows in sources.items():
+        valid_rows = [row for row in rows if any(str(value).strip() for value in row.values())]
+        renumbered = _renumber_duplicate_ids(valid_rows)
+        if renumbered:
+            print(f"Warning: {renumbered} {table} rows had a missing or duplicate id and were renumbered.")
+        normalize_rows(valid_rows, date_columns.get(table, {}))
+        storage.clear(table)
+        if not storage.insert_rows(table, valid_rows):
+            print(f"Error: Migration of {table} failed.")
+            copied[table] = 0
+            continue
+        copied[table] = len(valid_rows)
+        print(f"Migrated {len(valid_rows)} rows into {table}")
+    storage.close()
+    return copied
+
+# ---------------------------- CITIZEN CHANGE LOG ----------------------------
+# Citizen updates are appended to citizens_changes.csv as one (citizen_id, field, value)
+# record per changed field. Readers merge the log over citizens_data.csv, and
+# compact_citizen_changes() folds it back into the base file.
+
+def _read_citizen_changes():
+    """Returns {citizen id: {field: value}} for the updates pending in the change log."""
+    changes = {}
+    if not os.path.exists(CITIZEN_CHANGES_CSV_FILE):
+        return changes
+    for change in read_csv_dict(CITIZEN_CHANGES_CSV_FILE, CITIZEN_CHANGES_FIELDNAMES):
+        field = change.get("field")
+        if field in CITIZENS_FIELDNAMES and field != "id":
+            changes.setdefault(change.get("citizen_id"), {})[field] = change.get("value", "")
+    return changes
+
+def iter_citizens():
+    """Yields every citizen row with pending change-log updates applied."""
+    db = _sqlite()
+    if db is not None:
+        yield from db.iter_rows("citizens")
+        return
+    changes = _read_citizen_changes()
+    for citizen in read_csv_dict(CITIZENS_CSV_FILE, CITIZENS_FIELDNAMES):
+        pending = changes.get(citizen.get("id"))
+        if pending:
+            citizen.update(pending)
+        yield citizen
+
+def compact_citizen_changes():
+    """Folds the change log into citizens_data.csv and removes the log."""
+    if _sqlite() is not None:
+        return True
+    with _locked(CITIZENS_LOCK_FILE):
+        if not os.path.exists(CITIZEN_CHANGES_CSV_FILE):
+            return True
+        # The merged citizens do not change, so indexes current before the rewrite stay current
+        signatures_before = {file_path: _stat_signature(file_path)
+                             for file_path in (CITIZENS_CSV_FILE, CITIZEN_CHANGES_CSV_FILE)}
+        if not overwrite_csv_dict(CITIZENS_CSV_FILE, iter_citizens(), CITIZENS_FIELDNAMES):
+            return False
+        # Replaying the log over the new base is idempotent, so a crash before this is harmless.
+        try:
+            os.remove(CITIZEN_CHANGES_CSV_FILE)
+        except OSError as e:
+            print(f"Warning: Could not remove {CITIZEN_CHANGES_CSV_FILE}: {e}")
+        _citizen_index.apply_write(signatures_before)
+        _statistics.apply_write(signatures_before)
+        _search_index.apply_write(signatures_before)
+        return True
+
+# ---------------------------- IN-PROCESS INDEXES ----------------------------
+class _FileIndex:
+    """Base class for in-memory indexes built from CSV files.
+
+    The index is rebuilt lazily whenever one of its files' (inode, size, mtime)
+    signature changes, so edits made by other processes are picked up. Writes made
+    through this module update the index in place through apply_write(), which falls
+    back to a rebuild when another process wrote to the files since the index was built.
+    """
+
+    def __init__(self, *file_paths):
+        self.file_paths = file_paths
+        self.lock = threading.RLock()
+        self._signature = None
+        self._loaded = False
+
+    def _file_signature(self):
+        return tuple(_stat_signature(file_path) for file_path in self.file_paths)
+
+    def _rebuild(self):
+        raise NotImplementedError
+
+    def ensure_fresh(self):
+        with self.lock:
+            signature = self._file_signature()
+            if not self._loaded or signature != self._signature:
+                self._rebuild()
+                self._signature = signature
+                self._loaded = True
+
+    def apply_write(self, signatures_before, update=None):
+        """Brings the index up to date with a write this process just made.
+
+        signatures_before maps each written file to its signature before the write.
+        update() is applied in place, and the new signature recorded, only when the index
+        was current with those signatures and the index's other files are unchanged;
+        otherwise the index is left unloaded and rebuilt on its next use.
+        """
+        with self.lock:
+            if not self._loaded:
+                return
+            signature = self._file_signature()
+            expected = tuple(signatures_before.get(file_path, current)
+                             for file_path, current in zip(self.file_paths, signature))
+            if expected != self._signature:
+                self._loaded = False
+                return
+            if update is not None:
+                update()
+            self._signature = signature
+
+    def invalidate(self):
+        with self.lock:
+            self._loaded = False
+
+
+class _CitizenIndex(_FileIndex):
+    """Citizen rows (with the change log applied) keyed by internal id and by national_id,
+    plus their priority ranking."""
+
+    def __init__(self):
+        super().__init__(CITIZENS_CSV_FILE, CITIZEN_CHANGES_CSV_FILE)
+        self.by_id = {}
+        self.by_national_id = {}
+        self.ranking = PriorityRanking()
+
+    def _rebuild(self):
+        self.by_id = {}
+        self.by_national_id = {}
+        for citizen in iter_citizens():
+            self._add(citizen)
+        self.ranking.rebuild(self.by_id.values())
+
+    def _add(self, row):
+        citizen = row if isinstance(row, CitizenRecord) else CitizenRecord.from_row(row)
+        self.by_id[str(citizen.id)] = citizen
+        # Keep the first registration for a national_id, like the old linear scans did.
+        self.by_national_id.setdefault(citizen.national_id, citizen)
+        return citizen
+
+    def get_by_id(self, internal_id):
+        self.ensure_fresh()
+        return self.by_id.get(str(internal_id))
+
+    def get_by_national_id(self, national_id):
+        self.ensure_fresh()
+        return self.by_national_id.get(national_id)
+
+    def add_many(self, citizens, signature_before):
+        """Adds citizen rows that were just appended to a citizens file of signature_before."""
+        def update():
+            for citizen in citizens:
+                self.ranking.add(self._add(citizen))
+        self.apply_write({CITIZENS_CSV_FILE: signature_before}, update)
+
+    def replace(self, row, signature_before):
+        """Replaces a citizen row whose changes were just appended to a change log of signature_before."""
+        citizen = CitizenRecord.from_row(row)
+
+        def update():
+            old = self.by_id.get(str(citizen.id))
+            if old is not None and self.by_national_id.get(old.national_id) is old:
+                del self.by_national_id[old.national_id]
+            self.by_id[str(citizen.id)] = citizen
+            if self.by_national_id.get(citizen.national_id) is None:
+                self.by_national_id[citizen.national_id] = citizen
+            self.ranking.update(citizen)
+        self.apply_write({CITIZEN_CHANGES_CSV_FILE: signature_before}, update)
+
+
+_citizen_index = _CitizenIndex()
+
+
+class _AidHistoryIndex(_FileIndex):
+    """Aid history entries grouped by citizen_internal_id, built in one pass.
+
+    Also keeps the set of citizens that have received aid (an entry with an empty
+    next_date), so the received status of every citizen is a set lookup, and the
+    open aid schedules ordered by next_date.
+    """
+
+    def __init__(self):
+        super().__init__(AID_HISTORY_CSV_FILE)
+        self.by_citizen = {}
+        self.received = set()
+        self.total_entries = 0
+        self.schedule = AidSchedule()
+
+    def _rebuild(self):
+        self.by_citizen = {}
+        self.received = set()
+        self.total_entries = 0
+        for entry in read_csv_dict(AID_HISTORY_CSV_FILE, AID_HISTORY_FIELDNAMES):
+            self._add(entry)
+        self.schedule.rebuild(entries[-1] for entries in self.by_citizen.values())
+
+    def _add(self, row):
+        entry = AidEntryRecord.from_row(row)
+        citizen_id = entry.citizen_internal_id
+        self.by_citizen.setdefault(citizen_id, []).append(entry)
+        if entry.next_date == "":
+            self.received.add(citizen_id)
+        self.total_entries += 1
+        return entry
+
+    def entries_for(self, citizen_internal_id):
+        self.ensure_fresh()
+        return self.by_citizen.get(str(citizen_internal_id), [])
+
+    def has_received(self, citizen_internal_id):
+        self.ensure_fresh()
+        return str(citizen_internal_id) in self.received
+
+    def add_many(self, entries, signature_before):
+        """Adds aid entries that were just appended to a file of signature_before."""
+        def update():
+            for entry in entries:
+                self.schedule.record(self._add(entry))
+        self.apply_write({AID_HISTORY_CSV_FILE: signature_before}, update)
+
+    def scheduled(self, start=None, end=None, limit=None):
+        with self.lock:
+            self.ensure_fresh()
+            return self.schedule.between(start, end, limit)
+
+
+_aid_history_index = _AidHistoryIndex()
+
+
+class _MessageIndex(_FileIndex):
+    """Byte offsets of the message rows in messages.csv grouped by citizen_internal_id, in
+    file order, so one citizen's messages are read with a seek per row instead of a scan
+    of the whole message log. Files that cannot be read by offset (UTF-16) are scanned."""
+
+    def __init__(self):
+        super().__init__(MESSAGES_CSV_FILE)
+        self.offsets = {}
+        self.seekable = True
+
+    def _rebuild(self):
+        self.offsets = {}
+        self.seekable = True
+        if _stat_signature(MESSAGES_CSV_FILE) is None:
+            return
+        for message, start, _ in _iter_file_rows(MESSAGES_CSV_FILE, MESSAGES_FIELDNAMES, 0):
+            if start is None:
+                self.offsets = {}
+                self.seekable = False
+                return
+            self.offsets.setdefault(message.get("citizen_internal_id"), array("Q")).append(start)
+
+    def messages_for(self, citizen_internal_id, limit=None, newest_first=False):
+        with self.lock:
+            self.ensure_fresh()
+            citizen_internal_id = str(citizen_internal_id)
+            if not self.seekable:
+                messages = [msg for msg in read_csv_dict(MESSAGES_CSV_FILE, MESSAGES_FIELDNAMES)
+                            if msg.get("citizen_internal_id") == citizen_internal_id]
+                offsets = None
+            else:
+                offsets = self.offsets.get(citizen_internal_id, ())
+        if offsets is not None:
+            if limit is not None:
+                offsets = offsets[-limit:] if limit > 0 else ()
+            messages = _read_rows_at(MESSAGES_CSV_FILE, MESSAGES_FIELDNAMES, offsets)
+        elif limit is not None:
+            messages = messages[-limit:] if limit > 0 else []
+        if newest_first:
+            messages.reverse()
+        return messages
+
+    def add(self, message, signature_before):
+        """Records a message row that was just appended to a file of signature_before."""
+        with self.lock:
+            # The row starts at the old end of the file; a new file begins with its header
+            if not self.seekable or signature_before is None or signature_before[1] == 0:
+                self._loaded = False
+                return
+            self.apply_write({MESSAGES_CSV_FILE: signature_before}, lambda: self.offsets.setdefault(
+                str(message["citizen_internal_id"]), array("Q")).append(signature_before[1]))
+
+
+_message_index = _MessageIndex()
+
+
+class _StatisticsIndex(_FileIndex):
+    """System statistics built in one streaming pass and kept current by the write functions."""
+
+    def __init__(self):
+        super().__init__(CITIZENS_CSV_FILE, CITIZEN_CHANGES_CSV_FILE, AID_HISTORY_CSV_FILE, MESSAGES_CSV_FILE)
+        self.stats = StatisticsAccumulator()
+
+    def _rebuild(self):
+        stats = StatisticsAccumulator()
+        for citizen in iter_citizens():
+            stats.add_citizen(citizen)
+        for entry in read_csv_dict(AID_HISTORY_CSV_FILE, AID_HISTORY_FIELDNAMES):
+            stats.add_aid_entry(entry)
+        for message in read_csv_dict(MESSAGES_CSV_FILE, MESSAGES_FIELDNAMES):
+            stats.add_message(message)
+        self.stats = stats
+
+    def snapshot(self):
+        with self.lock:
+            self.ensure_fresh()
+            return self.stats.snapshot()
+
+    # Each write below was just appended to one of the files, which had signature_before
+    # beforehand; apply_write also checks that the other files are unchanged.
+
+    def add_citizens(self, citizens, signature_before):
+        def update():
+            for citizen in citizens:
+                self.stats.add_citizen(citizen)
+        self.apply_write({CITIZENS_CSV_FILE: signature_before}, update)
+
+    def replace_citizen(self, old, new, signature_before):
+        self.apply_write({CITIZEN_CHANGES_CSV_FILE: signature_before},
+                         lambda: self.stats.replace_citizen(old, new))
+
+    def add_aid_entries(self, entries, signature_before):
+        def update():
+            for entry in entries:
+                self.stats.add_aid_entry(entry)
+        self.apply_write({AID_HISTORY_CSV_FILE: signature_before}, update)
+
+    def add_message(self, message, signature_before):
+        self.apply_write({MESSAGES_CSV_FILE: signature_before}, lambda: self.stats.add_message(message))
+
+
+_statistics = _StatisticsIndex()
+
+
+class _CitizenSearchIndex(_FileIndex):
+    """Full-text index of citizen names, addresses and needs, built on the first search
+    and kept current by registration and citizen updates."""
+
+    def __init__(self):
+        super().__init__(CITIZENS_CSV_FILE, CITIZEN_CHANGES_CSV_FILE)
+        self.index = SearchIndex()
+
+    def _rebuild(self):
+        self.index = SearchIndex.build(iter_citizens())
+
+    def search(self, query, limit, predicate=None):
+        with self.lock:
+            self.ensure_fresh()
+            return self.index.search(query, limit, predicate)
+
+    def add_citizens(self, citizens, signature_before):
+        """Indexes citizens just appended to a citizens file of signature_before."""
+        def update():
+            for citizen in citizens:
+                self.index.add(citizen)
+        self.apply_write({CITIZENS_CSV_FILE: signature_before}, update)
+
+    def replace_citizen(self, old, new, signature_before):
+        """Reindexes a citizen whose changes were just appended to a change log of signature_before."""
+        self.apply_write({CITIZEN_CHANGES_CSV_FILE: signature_before}, lambda: self.index.update(old, new))
+
+
+_search_index = _CitizenSearchIndex()
+
+def _public_citizen(citizen):
+    """Returns a typed dict of a citizen (record or row) without the secret code hash."""
+    if not isinstance(citizen, CitizenRecord):
+        citizen = CitizenRecord.from_row(citizen)
+    return citizen.to_public()
+
+def _as_row(record):
+    """String dict of a record or of a row that already is one (SQLite rows)."""
+    return record.to_row() if isinstance(record, Record) else dict(record)
+
+# ---------------------------- ID GENERATION ----------------------------
+class _IdSequence:
+    """Persistent id counter for one table.
+
+    The counter file holds the next id to hand out and is locked with flock/msvcrt
+    around every read-modify-write, so several processes can allocate safely. The
+    data file is only scanned once per process, to repair a missing or stale counter.
+    """
+
+    def __init__(self, csv_file, fieldnames, counter_file):
+        self.csv_file = csv_file
+        self.fieldnames = fieldnames
+        self.counter_file = counter_file
+        self._thread_lock = threading.Lock()
+        self._validated = False
+
+    def _max_id_in_data(self):
+        db = _sqlite()
+        if db is not None:
+            return db.max_id(TABLE_NAMES[self.csv_file])
+        max_id = 0
+        for row in read_csv_dict(self.csv_file, self.fieldnames):
             try:
                 row_id = int(row.get("id", 0))
-                if row_id > max_id:
-                    max_id = row_id
             except (ValueError, TypeError):
                 continue
-    except Exception:
-        pass
-    return max_id + 1
+            if row_id > max_id:
+                max_id = row_id
+        return max_id
+
+    def _update(self, compute_next):
+        """Runs compute_next(current) under the file lock and stores its result."""
+        with self._thread_lock:
+            os.makedirs(os.path.dirname(self.counter_file) or ".", exist_ok=True)
+            fd = os.open(self.counter_file, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                _lock_fd(fd)
+                try:
+                    content = os.read(fd, 64).decode("ascii", "ignore").strip()
+                    try:
+                        current = int(content)
+                    except ValueError:
+                        current = None
+                    if current is None or not self._validated:
+                        floor = self._max_id_in_data() + 1
+                        if current is None or current < floor:
+                            current = floor
+                        self._validated = True
+                    result, next_value = compute_next(current)
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    os.ftruncate(fd, 0)
+                    os.write(fd, str(next_value).encode("ascii"))
+                    return result
+                finally:
+                    _unlock_fd(fd)
+            finally:
+                os.close(fd)
+
+    def reserve(self, count=1):
+        """Reserves `count` consecutive ids and returns them as a range."""
+        if count < 1:
+            return range(0)
+        return self._update(lambda current: (range(current, current + count), current + count))
+
+    def next_id(self):
+        return self.reserve(1)[0]
+
+    def set_next(self, value):
+        self._update(lambda current: (None, max(int(value), 1)))
+
+    def advance_past(self, used_id):
+        """Makes sure an id that was assigned explicitly is never handed out again."""
+        self._update(lambda current: (None, max(current, int(used_id) + 1)))
+
+    def invalidate(self):
+        self._validated = False
+
+    def rebuild(self):
+        """Re-checks the counter against the data file, fixing it if missing or stale."""
+        self.invalidate()
+        self._update(lambda current: (None, current))
+
+
+_id_sequences = {
+    CITIZENS_CSV_FILE: _IdSequence(CITIZENS_CSV_FILE, CITIZENS_FIELDNAMES, ID_COUNTER_FILE),
+    ADMINS_CSV_FILE: _IdSequence(ADMINS_CSV_FILE, ADMINS_FIELDNAMES, ADMINS_ID_COUNTER_FILE),
+    AID_HISTORY_CSV_FILE: _IdSequence(AID_HISTORY_CSV_FILE, AID_HISTORY_FIELDNAMES, AID_HISTORY_ID_COUNTER_FILE),
+    MESSAGES_CSV_FILE: _IdSequence(MESSAGES_CSV_FILE, MESSAGES_FIELDNAMES, MESSAGES_ID_COUNTER_FILE),
+}
+
+def reserve_ids(csv_file, count):
+    """Reserves a block of `count` ids for bulk inserts into csv_file. Returns a range."""
+    return _id_sequences[csv_file].reserve(count)
+
+def get_next_citizen_id_csv():
+    return _id_sequences[CITIZENS_CSV_FILE].next_id()
+
+def get_next_id_for_table(csv_file, fieldnames):
+    return _id_sequences[csv_file].next_id()
+
+def rebuild_id_sequences():
+    """Repairs every table's id counter from its data file if missing or stale."""
+    for sequence in _id_sequences.values():
+        try:
+            sequence.rebuild()
+        except OSError as e:
+            print(f"Warning: Could not rebuild {sequence.counter_file}: {e}")
+
 # ---------------------------- SETUP CSV FILES ----------------------------
 def setup_csv_files():
-    files_to_setup = {
-        CITIZENS_CSV_FILE: CITIZENS_FIELDNAMES,
-        ADMINS_CSV_FILE: ADMINS_FIELDNAMES,
-        AID_HISTORY_CSV_FILE: AID_HISTORY_FIELDNAMES,
-        MESSAGES_CSV_FILE: MESSAGES_FIELDNAMES
-    }
+    if _sqlite() is not None:
+        rebuild_id_sequences()
+        print(f"SQLite storage ready at {SQLITE_DB_FILE}.")
+        return
 
-    for file_path, fieldnames in files_to_setup.items():
+    for file_path, fieldnames in DATA_FILES.items():
         if not os.path.isfile(file_path):
             try:
                 os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
@@ -172,95 +1042,189 @@ def setup_csv_files():
             except IOError as e:
                 print(f"Error creating {file_path}: {e}")
     
-    if not os.path.exists(ID_COUNTER_FILE):
-        try:
-            with open(ID_COUNTER_FILE, "w") as f:
-                f.write("0")
-            print(f"Created and initialized {ID_COUNTER_FILE}")
-        except IOError as e:
-            print(f"Error creating {ID_COUNTER_FILE}: {e}")
-
-    sync_citizen_id_counter()
+    rebuild_id_sequences()
+    compact_citizen_changes()
     print("CSV File setup check complete.")
 
+def warm_indexes():
+    """Builds the in-memory indexes now instead of on the first request that needs them
+    (for long-running processes such as aid_service). Nothing to do with SQLite storage."""
+    if _sqlite() is not None:
+        return
+    for index in (_citizen_index, _aid_history_index, _message_index, _statistics, _search_index):
+        index.ensure_fresh()
+
 # ---------------------------- AUTH FUNCTIONS ----------------------------
 def verify_admin_login_csv(username, password):
     password_hash = _hash_password(password)
-    for admin in read_csv_dict(ADMINS_CSV_FILE, ADMINS_FIELDNAMES):
-        if admin.get("username") == username and admin.get("password_hash") == password_hash:
-            return admin
+    for row in _find_admins_by_username(username):
+        admin = AdminRecord.from_row(row)
+        if admin.password_hash == password_hash:
+            return admin.to_row()
     return None
 
 def verify_citizen_login_csv(national_id, secret_code):
     provided_hash = _hash_password(secret_code)
-    for citizen in read_csv_dict(CITIZENS_CSV_FILE, CITIZENS_FIELDNAMES):
-        is_active = str(citizen.get("is_active", "True")).strip().lower() == "true"
-        if (
-            citizen.get("national_id") == national_id and 
-            citizen.get("secret_code_hash") == provided_hash and
-            is_active
-        ):
-            try:
-                citizen["id"] = int(citizen["id"])
-                citizen["priority_score"] = float(citizen.get("priority_score", 0.0))
-                citizen["household_members"] = int(citizen.get("household_members", 0))
-                citizen["dependents"] = int(citizen.get("dependents", 0))
-                citizen["is_active"] = True
-                if "secret_code_hash" in citizen:
-                    del citizen["secret_code_hash"]
-            except (ValueError, TypeError):
-                pass
-            return citizen
-    return None
+    citizen = _find_citizen_by_national_id(national_id)
+    if citizen is None or citizen.get("secret_code_hash") != provided_hash:
+        return None
+    citizen = _public_citizen(citizen)
+    if not citizen.get("is_active"):
+        return None
+    return citizen
 # ---------------------------- REGISTRATION FUNCTIONS ----------------------------
 def check_citizen_exists_csv(national_id):
-    for citizen in read_csv_dict(CITIZENS_CSV_FILE, CITIZENS_FIELDNAMES):
-        if citizen.get("national_id") == national_id:
-            return True
-    return False
+    return _find_citizen_by_national_id(national_id) is not None
 
-def register_citizen_csv(citizen_data):
-    if "national_id" not in citizen_data or "secret_code" not in citizen_data or "full_name" not in citizen_data:
-        print("Error: Required fields missing.")
-        return None
-    if check_citizen_exists_csv(citizen_data["national_id"]):
-        print("Error: Citizen already exists.")
+def get_citizen_by_national_id_csv(national_id):
+    """Retrieves a single citizen's details by their national ID."""
+    citizen = _find_citizen_by_national_id(national_id)
+    if citizen is None:
         return None
+    return _public_citizen(citizen)
 
-    new_id = get_next_citizen_id_csv()
-    if new_id is None:
-        print("Error: Could not generate citizen ID.")
-        return None
+REQUIRED_CITIZEN_FIELDS = ("national_id", "full_name")
+NUMERIC_CITIZEN_FIELDS = ("id", "priority_score", "household_members", "dependents")
 
-    secret_hash = _hash_password(citizen_data["secret_code"])
-    new_record = {
+def _as_number(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _build_citizen_record(citizen_data, new_id, secret_hash, registration_date):
+    return {
         "id": str(new_id),
         "national_id": citizen_data["national_id"],
         "full_name": citizen_data["full_name"],
-        "date_of_birth": citizen_data.get("date_of_birth", ""),
+        "date_of_birth": to_iso_date(citizen_data.get("date_of_birth", "")),
         "phone_number": citizen_data.get("phone_number", ""),
         "address": citizen_data.get("address", ""),
         "household_members": str(citizen_data.get("household_members", 0)),
         "dependents": str(citizen_data.get("dependents", 0)),
         "needs_description": citizen_data.get("needs_description", ""),
         "priority_score": str(citizen_data.get("priority_score", 0.0)),
-        "is_active": "True",
-        "registration_date": datetime.datetime.now().isoformat(),
+        "is_active": str(citizen_data.get("is_active", True)),
+        "registration_date": citizen_data.get("registration_date") or registration_date,
         "secret_code_hash": secret_hash
     }
 
-    if append_csv_dict(CITIZENS_CSV_FILE, new_record, CITIZENS_FIELDNAMES):
+def _write_citizen_records(records):
+    """Stores new citizen records with a single write and indexes them."""
+    db = _sqlite()
+    if db is not None:
+        return db.insert_rows("citizens", records)
+    with _locked(CITIZENS_LOCK_FILE):
+        signature_before = _stat_signature(CITIZENS_CSV_FILE)
+        if not append_csv_rows(CITIZENS_CSV_FILE, records, CITIZENS_FIELDNAMES):
+            return False
+        _citizen_index.add_many([dict(record) for record in records], signature_before)
+        _statistics.add_citizens(records, signature_before)
+        _search_index.add_citizens(records, signature_before)
+    return True
+
+def _existing_citizen_ids():
+    db = _sqlite()
+    if db is not None:
+        return db.column_values("citizens", "id")
+    _citizen_index.ensure_fresh()
+    return list(_citizen_index.by_id)
+
+def _existing_national_ids():
+    db = _sqlite()
+    if db is not None:
+        return set(db.column_values("citizens", "national_id"))
+    _citizen_index.ensure_fresh()
+    return set(_citizen_index.by_national_id)
+
+def register_citizen_csv(citizen_data):
+    if any(field not in citizen_data for field in REQUIRED_CITIZEN_FIELDS + ("secret_code",)):
+        print("Error: Required fields missing.")
+        return None
+    if check_citizen_exists_csv(citizen_data["national_id"]):
+        print("Error: Citizen already exists.")
+        return None
+
+    new_id = get_next_citizen_id_csv()
+    if new_id is None:
+        print("Error: Could not generate citizen ID.")
+        return None
+
+    secret_hash = _hash_password(citizen_data["secret_code"])
+    new_record = _build_citizen_record(citizen_data, new_id, secret_hash, datetime.datetime.now().isoformat())
+
+    if _write_citizen_records([new_record]):
         print(f"Citizen registered with ID: {new_id}")
         del new_record["secret_code_hash"]
         return new_record
     else:
         return None
 
+def register_citizens_bulk(citizens, keep_ids=False):
+    """Registers many citizens with one duplicate check set, one id block and one write.
+
+    Each row needs national_id, full_name and either a plain secret_code or an
+    already hashed secret_code_hash (an empty hash leaves login disabled). With
+    keep_ids=True a row's own numeric "id" is kept when it is still free.
+
+    Returns one result per input row, in input order:
+    {"national_id": ..., "success": bool, "id": new id or None, "error": message or None}
+    """
+    results = []
+    pending = []
+    known_national_ids = _existing_national_ids()
+    known_ids = set(_existing_citizen_ids()) if keep_ids else set()
+    for citizen_data in citizens:
+        national_id = citizen_data.get("national_id", "")
+        result = {"national_id": national_id, "success": False, "id": None, "error": None}
+        results.append(result)
+        if (any(field not in citizen_data for field in REQUIRED_CITIZEN_FIELDS)
+                or ("secret_code" not in citizen_data and "secret_code_hash" not in citizen_data)):
+            result["error"] = "Required fields missing."
+        elif national_id in known_national_ids:
+            result["error"] = "Citizen already exists."
+        else:
+            known_national_ids.add(national_id)
+            kept_id = None
+            if keep_ids and str(citizen_data.get("id", "")).strip().isdigit():
+                kept_id = str(int(citizen_data["id"]))
+                if kept_id in known_ids:
+                    kept_id = None
+                else:
+                    known_ids.add(kept_id)
+            pending.append((result, citizen_data, kept_id))
+
+    if not pending:
+        return results
+
+    citizen_sequence = _id_sequences[CITIZENS_CSV_FILE]
+    kept_ids = [int(kept_id) for _, _, kept_id in pending if kept_id is not None]
+    if kept_ids:
+        citizen_sequence.advance_past(max(kept_ids))
+    new_ids = iter(citizen_sequence.reserve(len(pending) - len(kept_ids)))
+    registration_date = datetime.datetime.now().isoformat()
+    records = []
+    for _, citizen_data, kept_id in pending:
+        if "secret_code" in citizen_data:
+            secret_hash = _hash_password(citizen_data["secret_code"])
+        else:
+            secret_hash = citizen_data["secret_code_hash"]
+        new_id = kept_id if kept_id is not None else next(new_ids)
+        records.append(_build_citizen_record(citizen_data, new_id, secret_hash, registration_date))
+    written = _write_citizen_records(records)
+    for (result, _, _), record in zip(pending, records):
+        if written:
+            result["success"] = True
+            result["id"] = record["id"]
+        else:
+            result["error"] = "Could not write citizen records."
+    print(f"Bulk registration: {len(records) if written else 0} of {len(results)} citizens registered.")
+    return results
+
 def register_admin_csv(username, password, full_name="", organization_id="", role="admin"):
-    for admin in read_csv_dict(ADMINS_CSV_FILE, ADMINS_FIELDNAMES):
-        if admin.get("username") == username:
-            print(f"Admin '{username}' already exists.")
-            return False
+    if _find_admins_by_username(username):
+        print(f"Admin '{username}' already exists.")
+        return False
 
     new_id = get_next_id_for_table(ADMINS_CSV_FILE, ADMINS_FIELDNAMES)
     password_hash = _hash_password(password)
@@ -272,24 +1236,22 @@ def register_admin_csv(username, password, full_name="", organization_id="", rol
         "organization_id": organization_id,
         "role": role
     }
-    return append_csv_dict(ADMINS_CSV_FILE, new_admin, ADMINS_FIELDNAMES)
+    return _insert_rows(ADMINS_CSV_FILE, [new_admin], ADMINS_FIELDNAMES)
 
-# ---------------------------- MAIN ----------------------------
-if __name__ == "__main__":
-    setup_csv_files()
-    print("Backend is ready and ID counter synced.")
 def get_citizens_list_csv():
     """Returns a list of all citizens from the CSV."""
 def get_citizens_list_csv(filter_type=None, sort_by=None):
     """Returns a list of citizens, optionally filtered and sorted."""
-    all_citizens = list(read_csv_dict(CITIZENS_CSV_FILE, CITIZENS_FIELDNAMES))
-
-    if filter_type == "received":
-        all_citizens = [c for c in all_citizens if float(c.get("priority_score", 0)) > 0]
-    elif filter_type == "not_received":
-        all_citizens = [c for c in all_citizens if float(c.get("priority_score", 0)) == 0]
+    filters = {"received": filter_type == "received"} if filter_type in ("received", "not_received") else None
+    predicate = _citizen_filter(filters)
+    all_citizens = [c for c in iter_citizens() if predicate is None or predicate(c)]
 
-    if sort_by and sort_by in CITIZENS_FIELDNAMES:
+    if sort_by == "priority_score":
+        # Ranking order: highest score first, earlier registration first on ties
+        all_citizens.sort(key=ranking_key)
+    elif sort_by in NUMERIC_CITIZEN_FIELDS:
+        all_citizens.sort(key=lambda x: _as_number(x.get(sort_by)))
+    elif sort_by and sort_by in CITIZENS_FIELDNAMES:
         try:
             all_citizens.sort(key=lambda x: x.get(sort_by))
         except Exception as e:
@@ -297,20 +1259,324 @@ def get_citizens_list_csv(filter_type=None, sort_by=None):
 
     return all_citizens
 
+def get_citizens_page_csv(offset, limit, filter_type=None, sort_by=None, descending=False):
+    """Returns (citizens[offset:offset + limit], total) of the filtered and sorted list, for paged views."""
+    all_citizens = get_citizens_list_csv(filter_type, sort_by)
+    if descending:
+        all_citizens.reverse()
+    offset = max(0, int(offset))
+    return all_citizens[offset:offset + max(0, int(limit))], len(all_citizens)
+
+def _received_citizen_ids():
+    """Ids of citizens with an aid entry that has no next_date: the one definition of "received aid"."""
+    db = _sqlite()
+    if db is not None:
+        return db.received_citizen_ids()
+    _aid_history_index.ensure_fresh()
+    return _aid_history_index.received
+
+def _citizen_filter(filters):
+    """Builds a predicate over citizen rows, or None when nothing is filtered.
+
+    filters is a dict, a callable taking a citizen row, or a list of those. In a dict,
+    "received" (bool) matches on aid history, "min_score"/"max_score" bound priority_score,
+    and every other key must equal the citizen's field (compared as text, so is_active=True
+    matches "True").
+    """
+    if not filters:
+        return None
+    if callable(filters):
+        return filters
+    if isinstance(filters, (list, tuple)):
+        predicates = [p for p in (_citizen_filter(f) for f in filters) if p is not None]
+        return lambda citizen: all(p(citizen) for p in predicates)
+    filters = dict(filters)
+    received = filters.pop("received", None)
+    min_score = filters.pop("min_score", None)
+    max_score = filters.pop("max_score", None)
+    received_ids = _received_citizen_ids() if received is not None else set()
+
+    def predicate(citizen):
+        if received is not None and (str(citizen.get("id")) in received_ids) != bool(received):
+            return False
+        if min_score is not None and _as_number(citizen.get("priority_score")) < float(min_score):
+            return False
+        if max_score is not None and _as_number(citizen.get("priority_score")) > float(max_score):
+            return False
+        return all(str(citizen.get(field, "")) == str(value) for field, value in filters.items())
+    return predicate
+
+class _SortKey:
+    """Multi-column sort key; descending columns compare reversed (works for text too)."""
+
+    __slots__ = ("values", "descending")
+
+    def __init__(self, values, descending):
+        self.values = values
+        self.descending = descending
+
+    def __lt__(self, other):
+        for mine, theirs, descending in zip(self.values, other.values, self.descending):
+            if mine != theirs:
+                return (mine > theirs) if descending else (mine < theirs)
+        return False
+
+def _citizen_sort_key(sort):
+    """Key function for sort specs like "rank", "priority_score" or ["-household_members", "id"]."""
+    specs = [sort] if isinstance(sort, str) else list(sort)
+    if specs == ["rank"]:
+        return ranking_key
+    columns = [(spec[1:], True) if spec.startswith("-") else (spec, False) for spec in specs]
+    descending = tuple(desc for _, desc in columns)
+
+    def key(citizen):
+        return _SortKey(tuple(
+            _as_number(citizen.get(field)) if field in NUMERIC_CITIZEN_FIELDS else str(citizen.get(field) or "")
+            for field, _ in columns
+        ), descending)
+    return key
+
+def query_citizens(filters=None, columns=None, sort=None, limit=None):
+    """Streams the citizens, keeping only the matching rows, and returns typed dicts.
+
+    filters: see _citizen_filter. columns: fields to return (plus "received", answered from
+    aid history); all public fields when None. sort: "rank" or a list of fields, "-field" for
+    descending. limit: maximum rows; with a sort only a heap of `limit` rows is kept, so memory
+    follows the result size rather than the table size.
+    """
+    predicate = _citizen_filter(filters)
+    rows = iter_citizens() if predicate is None else (c for c in iter_citizens() if predicate(c))
+    if sort:
+        key = _citizen_sort_key(sort)
+        rows = heapq.nsmallest(limit, rows, key=key) if limit is not None else sorted(rows, key=key)
+    elif limit is not None:
+        rows = islice(rows, limit)
 
+    received_ids = _received_citizen_ids() if columns and "received" in columns else None
+    results = []
+    for citizen in rows:
+        public = _public_citizen(citizen)
+        if columns:
+            if received_ids is not None:
+                public["received"] = str(public.get("id")) in received_ids
+            public = {column: public.get(column) for column in columns}
+        results.append(public)
+    return results
+
+def top_k_citizens(k, filters=None):
+    """Returns the k highest priority citizens matching filters, in ranking order."""
+    predicate = _citizen_filter(filters)
+    if _sqlite() is not None:
+        return [_public_citizen(c) for c in top_k_heap(iter_citizens(), k, predicate)]
+    with _citizen_index.lock:
+        _citizen_index.ensure_fresh()
+        by_id = _citizen_index.by_id
+        ids = _citizen_index.ranking.top_k(
+            k, None if predicate is None else (lambda citizen_id: predicate(by_id[citizen_id])))
+        return [_public_citizen(by_id[citizen_id]) for citizen_id in ids]
+
+def get_ranked_citizens_page(offset, limit):
+    """Returns (citizens ranked offset+1 .. offset+limit, total ranked citizens)."""
+    offset, limit = max(0, int(offset)), max(0, int(limit))
+    if _sqlite() is not None:
+        citizens = list(iter_citizens())
+        page = top_k_heap(citizens, offset + limit)[offset:]
+        return [_public_citizen(c) for c in page], len(citizens)
+    with _citizen_index.lock:
+        _citizen_index.ensure_fresh()
+        ids = _citizen_index.ranking.ids(offset, limit)
+        return [_public_citizen(_citizen_index.by_id[i]) for i in ids], len(_citizen_index.ranking)
+
+def get_citizen_rank(internal_id):
+    """1-based priority rank of a citizen, or None if the citizen does not exist."""
+    if _sqlite() is not None:
+        citizen = _find_citizen_by_id(internal_id)
+        if citizen is None:
+            return None
+        key = ranking_key(citizen)
+        return 1 + sum(1 for c in iter_citizens() if ranking_key(c) < key)
+    with _citizen_index.lock:
+        _citizen_index.ensure_fresh()
+        return _citizen_index.ranking.rank_of(internal_id)
+
+def search_citizens(query, limit=20, active_only=False):
+    """Full-text search of citizens by (partial) name, address or needs description.
+
+    Arabic spelling variants and diacritics are ignored, words match as prefixes and
+    longer words also fuzzily. Returns up to limit public citizen dicts, best match first,
+    each with a "match_score".
+    """
+    db = _sqlite()
+    if db is not None:
+        # No maintained index for SQLite: index the rows for this one search
+        index = SearchIndex.build(citizen for citizen in iter_citizens()
+                                  if not active_only or CitizenRecord.from_row(citizen).is_active)
+        matches = index.search(query, limit)
+        citizens = [(_find_citizen_by_id(citizen_id), score) for citizen_id, score in matches]
+    else:
+        _citizen_index.ensure_fresh()
+        by_id = _citizen_index.by_id
+        predicate = None
+        if active_only:
+            predicate = lambda citizen_id: getattr(by_id.get(str(citizen_id)), "is_active", False)
+        matches = _search_index.search(query, limit, predicate)
+        citizens = [(by_id.get(citizen_id), score) for citizen_id, score in matches]
+    results = []
+    for citizen, score in citizens:
+        if citizen is not None:
+            public = _public_citizen(citizen)
+            public["match_score"] = score
+            results.append(public)
+    return results
+
+def find_duplicate_citizens(min_score=DEFAULT_MIN_SCORE, workers=None, active_only=False):
+    """Clusters of citizens that look registered more than once (e.g. a typo in the national ID).
+
+    Citizens are compared only within blocks sharing a phone number or a phonetic name key
+    and birth year; pairs scoring at least min_score are clustered. Returns a list of
+    {"citizen_ids", "score", "pairs", "citizens"} dicts, most certain first, where
+    "citizens" holds the public citizen dicts. workers sets the size of the process pool.
+    """
+    if _sqlite() is not None:
+        by_id = {str(c.id): c for c in map(CitizenRecord.from_row, iter_citizens())}
+    else:
+        _citizen_index.ensure_fresh()
+        by_id = dict(_citizen_index.by_id)
+    citizens = by_id.values()
+    if active_only:
+        citizens = [c for c in citizens if c.is_active]
+    clusters = find_duplicates(citizens, min_score, workers)
+    for cluster in clusters:
+        cluster["citizens"] = [_public_citizen(by_id[citizen_id]) for citizen_id in cluster["citizen_ids"]]
+    return clusters
+
+DUPLICATES_REPORT_FIELDNAMES = ["cluster", "score", "id", "national_id", "full_name",
+                                "date_of_birth", "phone_number", "address"]
+
+def write_duplicates_report(clusters, file_path):
+    """Writes find_duplicate_citizens clusters as CSV, one row per citizen."""
+    with open(file_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=DUPLICATES_REPORT_FIELDNAMES, extrasaction="ignore")
+        writer.writeheader()
+        for number, cluster in enumerate(clusters, start=1):
+            for citizen in cluster["citizens"]:
+                writer.writerow({**citizen, "cluster": number, "score": cluster["score"]})
 
 def save_aid_history_entry(citizen_internal_id, entry_type, date_str, next_date_str=""):
     """Saves an aid history entry for a citizen."""
-    new_id = get_next_id_for_table(AID_HISTORY_CSV_FILE, AID_HISTORY_FIELDNAMES)
-    record = {
-        "id": str(new_id),
-        "citizen_internal_id": str(citizen_internal_id),
+    return save_aid_history_entries([{
+        "citizen_internal_id": citizen_internal_id,
         "entry_type": entry_type,
         "date": date_str,
-        "next_date": next_date_str,
-        "timestamp": datetime.datetime.now().isoformat()
-    }
-    return append_csv_dict(AID_HISTORY_CSV_FILE, record, AID_HISTORY_FIELDNAMES)
+        "next_date": next_date_str
+    }])
+
+def save_aid_history_entries(entries):
+    """Saves many aid history entries (dicts of citizen_internal_id, entry_type, date and
+    optional next_date) with one id block and a single write. Dates are stored as ISO when
+    they read unambiguously, otherwise as given (see to_iso_date)."""
+    entries = list(entries)
+    if not entries:
+        return True
+    new_ids = reserve_ids(AID_HISTORY_CSV_FILE, len(entries))
+    timestamp = datetime.datetime.now().isoformat()
+    records = [{
+        "id": str(new_id),
+        "citizen_internal_id": str(entry["citizen_internal_id"]),
+        "entry_type": entry["entry_type"],
+        "date": to_iso_date(entry.get("date", "")),
+        "next_date": to_iso_date(entry.get("next_date", "")),
+        "timestamp": timestamp
+    } for new_id, entry in zip(new_ids, entries)]
+    db = _sqlite()
+    if db is not None:
+        return db.insert_rows("aid_history", records)
+    signature_before = _stat_signature(AID_HISTORY_CSV_FILE)
+    if append_csv_rows(AID_HISTORY_CSV_FILE, records, AID_HISTORY_FIELDNAMES):
+        _aid_history_index.add_many([dict(record) for record in records], signature_before)
+        _statistics.add_aid_entries(records, signature_before)
+        return True
+    return False
+
+def plan_aid_allocation(stock, min_days_between=30, max_per_neighbourhood=None, as_of=None):
+    """Ranked plan for handing out limited stock: {entry_type: number of kits}.
+
+    Active citizens are picked by priority_score, then household_members, then dependents.
+    Citizens who received the same entry_type within min_days_between days of as_of (today
+    by default) are skipped, and each neighbourhood gets at most max_per_neighbourhood kits
+    of a type. Returns one dict per kit, grouped by entry_type in the order of stock and
+    ranked within each type.
+    """
+    db = _sqlite()
+    if db is not None:
+        citizens = (CitizenRecord.from_row(c) for c in iter_citizens())
+        entries = (AidEntryRecord.from_row(e) for e in db.iter_rows("aid_history"))
+    else:
+        _citizen_index.ensure_fresh()
+        _aid_history_index.ensure_fresh()
+        citizens = list(_citizen_index.by_id.values())
+        entries = list(chain.from_iterable(list(_aid_history_index.by_citizen.values())))
+    candidates = Candidates(c for c in citizens if c.is_active)
+    recent = None
+    if min_days_between and min_days_between > 0:
+        as_of_date = datetime.date.fromisoformat(as_iso_day(as_of))
+        cutoff = (as_of_date - datetime.timedelta(days=int(min_days_between) - 1)).isoformat()
+        recent = recent_recipients(entries, set(stock), cutoff)
+    allocation = allocate(candidates, stock, recent, max_per_neighbourhood)
+    plan = []
+    for entry_type, positions in allocation.items():
+        for rank, position in enumerate(positions, start=1):
+            citizen = candidates.records[position]
+            plan.append({
+                "entry_type": entry_type,
+                "rank": rank,
+                "citizen_internal_id": str(citizen.id),
+                "national_id": citizen.national_id,
+                "full_name": citizen.full_name,
+                "neighbourhood": candidates.neighbourhoods[position],
+                "priority_score": citizen.priority_score,
+                "household_members": citizen.household_members,
+                "dependents": citizen.dependents
+            })
+    return plan
+
+def record_aid_allocation(plan, date_str=None, next_date_str=""):
+    """Records every kit of an allocation plan as an aid history entry, in one write."""
+    date_str = date_str or datetime.date.today().isoformat()
+    return save_aid_history_entries({
+        "citizen_internal_id": row["citizen_internal_id"],
+        "entry_type": row["entry_type"],
+        "date": date_str,
+        "next_date": next_date_str
+    } for row in plan)
+
+def _scheduled_aid(start, end, limit=None):
+    """Open scheduled aid entries with next_date from start to end (inclusive), earliest first."""
+    db = _sqlite()
+    if db is not None:
+        return db.open_schedule(start, end, limit)
+    scheduled = []
+    for next_date, entry in _aid_history_index.scheduled(start, end, limit):
+        row = entry.to_row()
+        row["next_date"] = next_date
+        scheduled.append(row)
+    return scheduled
+
+def get_aid_due_between(start_date, end_date, limit=None):
+    """Citizens whose next scheduled aid falls between start_date and end_date (inclusive).
+
+    Returns each citizen's latest aid entry (the one that set the schedule), earliest
+    next_date first. Dates may be ISO strings, legacy date strings or date objects.
+    """
+    return _scheduled_aid(as_iso_day(start_date), as_iso_day(end_date), limit)
+
+def get_overdue_aid(as_of=None, limit=None):
+    """Scheduled aid whose next_date is before as_of (today by default), earliest first."""
+    return _scheduled_aid(None, previous_day(as_iso_day(as_of)), limit)
+
+def get_next_due_aid(n, as_of=None):
+    """The n next scheduled aid entries due on or after as_of (today by default)."""
+    return _scheduled_aid(as_iso_day(as_of), None, max(0, int(n)))
 
 def save_message_entry(citizen_internal_id, message):
     """Saves a message entry for a citizen."""
@@ -321,66 +1587,365 @@ def save_message_entry(citizen_internal_id, message):
         "message": message,
         "timestamp": datetime.datetime.now().isoformat()
     }
-    return append_csv_dict(MESSAGES_CSV_FILE, record, MESSAGES_FIELDNAMES)
+    db = _sqlite()
+    if db is not None:
+        return db.insert_row("messages", record)
+    signature_before = _stat_signature(MESSAGES_CSV_FILE)
+    if not append_csv_dict(MESSAGES_CSV_FILE, record, MESSAGES_FIELDNAMES):
+        return False
+    _message_index.add(record, signature_before)
+    _statistics.add_message(record, signature_before)
+    return True
 
 def check_citizen_received_aid(citizen_internal_id):
     """Checks if a citizen has received aid (i.e., has an aid history entry with no next_date)."""
-    for entry in read_csv_dict(AID_HISTORY_CSV_FILE, AID_HISTORY_FIELDNAMES):
-        if entry.get("citizen_internal_id") == str(citizen_internal_id) and entry.get("next_date") == "":
-            return True
-    return False
+    db = _sqlite()
+    if db is not None:
+        return any(entry.get("next_date") == ""
+                   for entry in db.find_rows("aid_history", "citizen_internal_id", citizen_internal_id))
+    return _aid_history_index.has_received(citizen_internal_id)
+
+def get_received_status_map():
+    """Returns {citizen internal id: received aid?} for every registered citizen in one pass."""
+    db = _sqlite()
+    if db is not None:
+        received = db.received_citizen_ids()
+        return {citizen_id: citizen_id in received for citizen_id in db.column_values("citizens", "id")}
+    _citizen_index.ensure_fresh()
+    received = _received_citizen_ids()
+    return {citizen_id: citizen_id in received for citizen_id in _citizen_index.by_id}
+
+def get_statistics():
+    """Returns the System Statistics aggregates: citizen totals, active/inactive, received/not
+    received, aid operations (also per entry_type), messages and the priority score distribution."""
+    db = _sqlite()
+    if db is not None:
+        return compute_statistics(iter_citizens(), db.iter_rows("aid_history"), db.iter_rows("messages"))
+    return _statistics.snapshot()
 
 def get_citizen_details_csv(internal_id):
     """Retrieves a single citizen's details by their internal ID."""
-    for citizen in read_csv_dict(CITIZENS_CSV_FILE, CITIZENS_FIELDNAMES):
-        if citizen.get("id") == str(internal_id):
-            try:
-                citizen["id"] = int(citizen["id"])
-                citizen["priority_score"] = float(citizen.get("priority_score", 0.0))
-                citizen["household_members"] = int(citizen.get("household_members", 0))
-                citizen["dependents"] = int(citizen.get("dependents", 0))
-                citizen["is_active"] = str(citizen.get("is_active", "True")).strip().lower() == "true"
-                if "secret_code_hash" in citizen:
-                    del citizen["secret_code_hash"]
-            except (ValueError, TypeError):
-                pass
-            return citizen
-    return None
+    citizen = _find_citizen_by_id(internal_id)
+    if citizen is None:
+        return None
+    return _public_citizen(citizen)
 
 def update_citizen_details_csv(internal_id, updated_data):
-    """Updates a citizen's details in the CSV file."""
-    all_citizens = list(read_csv_dict(CITIZENS_CSV_FILE, CITIZENS_FIELDNAMES))
-    updated = False
-    for i, citizen in enumerate(all_citizens):
-        if citizen.get("id") == str(internal_id):
-            for key, value in updated_data.items():
-                if key in CITIZENS_FIELDNAMES and key != "id": # Don't allow changing ID
-                    if key == "priority_score":
-                        all_citizens[i][key] = str(float(value))
-                    elif key in ["household_members", "dependents"]:
-                        all_citizens[i][key] = str(int(value))
-                    else:
-                        all_citizens[i][key] = value
-            updated = True
-            break
-    if updated:
-        return overwrite_csv_dict(CITIZENS_CSV_FILE, all_citizens, CITIZENS_FIELDNAMES)
-    return False
+    """Updates a citizen's details by appending the changed fields to the change log."""
+    with _citizen_index.lock:
+        citizen = _find_citizen_by_id(internal_id)
+        if citizen is None:
+            return False
+        citizen = _as_row(citizen)
+        updated = dict(citizen)
+        for key, value in updated_data.items():
+            if key in CITIZENS_FIELDNAMES and key != "id": # Don't allow changing ID
+                if key == "priority_score":
+                    updated[key] = str(float(value))
+                elif key in ["household_members", "dependents"]:
+                    updated[key] = str(int(value))
+                else:
+                    updated[key] = value
+        changed_fields = [field for field in CITIZENS_FIELDNAMES if updated[field] != citizen.get(field)]
+        if not changed_fields:
+            return True
+        db = _sqlite()
+        if db is not None:
+            return db.update_row("citizens", internal_id, {field: updated[field] for field in changed_fields})
+        timestamp = datetime.datetime.now().isoformat()
+        changes = [
+            {"citizen_id": updated["id"], "field": field, "value": updated[field], "timestamp": timestamp}
+            for field in changed_fields
+        ]
+        with _locked(CITIZENS_LOCK_FILE):
+            signature_before = _stat_signature(CITIZEN_CHANGES_CSV_FILE)
+            if not append_csv_rows(CITIZEN_CHANGES_CSV_FILE, changes, CITIZEN_CHANGES_FIELDNAMES):
+                return False
+            _citizen_index.replace(updated, signature_before)
+            _statistics.replace_citizen(citizen, updated, signature_before)
+            _search_index.replace_citizen(citizen, updated, signature_before)
+    if os.path.exists(CITIZEN_CHANGES_CSV_FILE) and os.path.getsize(CITIZEN_CHANGES_CSV_FILE) > CITIZEN_CHANGES_COMPACT_BYTES:
+        compact_citizen_changes()
+    return True
 
 def read_aid_history(citizen_internal_id=None):
     """Reads aid history, optionally filtered by citizen ID."""
-    history = []
-    for entry in read_csv_dict(AID_HISTORY_CSV_FILE, AID_HISTORY_FIELDNAMES):
-        if citizen_internal_id is None or entry.get("citizen_internal_id") == str(citizen_internal_id):
-            history.append(entry)
-    return history
+    db = _sqlite()
+    if db is not None:
+        if citizen_internal_id is not None:
+            return db.find_rows("aid_history", "citizen_internal_id", citizen_internal_id)
+        return list(db.iter_rows("aid_history"))
+    if citizen_internal_id is not None:
+        return [entry.to_row() for entry in _aid_history_index.entries_for(citizen_internal_id)]
+    return list(read_csv_dict(AID_HISTORY_CSV_FILE, AID_HISTORY_FIELDNAMES))
 
 def read_messages(citizen_internal_id=None):
     """Reads messages, optionally filtered by citizen ID."""
-    messages = []
-    for msg in read_csv_dict(MESSAGES_CSV_FILE, MESSAGES_FIELDNAMES):
-        if citizen_internal_id is None or msg.get("citizen_internal_id") == str(citizen_internal_id):
-            messages.append(msg)
-    return messages
+    db = _sqlite()
+    if db is not None:
+        if citizen_internal_id is not None:
+            return db.find_rows("messages", "citizen_internal_id", citizen_internal_id)
+        return list(db.iter_rows("messages"))
+    if citizen_internal_id is not None:
+        return _message_index.messages_for(citizen_internal_id)
+    return list(read_csv_dict(MESSAGES_CSV_FILE, MESSAGES_FIELDNAMES))
+
+INBOX_SIZE = 20
+
+def get_inbox(citizen_internal_id, limit=INBOX_SIZE):
+    """Returns the latest `limit` messages of a citizen, newest first.
+
+    Reads only those rows (through the per-citizen offset index), however long the
+    message log has grown.
+    """
+    db = _sqlite()
+    if db is not None:
+        return db.latest_rows("messages", "citizen_internal_id", citizen_internal_id, limit)
+    return _message_index.messages_for(citizen_internal_id, max(0, int(limit)), newest_first=True)
+
+# ---------------------------- CURSOR PAGINATION ----------------------------
+# page_citizens / page_aid_history / page_messages return (rows, next_cursor), where
+# next_cursor is an opaque string to pass back for the following page, or None after
+# the last page (a page of exactly `limit` rows may be followed by an empty one).
+# In file order on the CSV backend the cursor holds the byte offset where the page
+# ended, so the next page seeks straight to it instead of re-reading from the top.
+# If the file was rewritten meanwhile (compaction, normalization) the offset is
+# dropped and the file is rescanned past the last id returned. Sorted citizen pages
+# and the SQLite backend use keyset cursors (the last sort key / id returned).
+DEFAULT_PAGE_SIZE = 50
+
+def _encode_cursor(table, **state):
+    state["table"] = table
+    data = json.dumps(state, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+def _decode_cursor(cursor, table):
+    """State stored in a cursor made by _encode_cursor for `table`; {} for the first page."""
+    if not cursor:
+        return {}
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8"))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid page cursor: {cursor!r}") from e
+    if not isinstance(state, dict) or state.get("table") != table:
+        raise ValueError(f"Page cursor does not belong to {table}")
+    return state
+
+def _row_id_number(row):
+    try:
+        return int(row.get("id"))
+    except (TypeError, ValueError):
+        return 0
+
+def _iter_csv_records(file_path, offset, csv_format):
+    """Yields (row tuple, start offset, end offset) of the records from byte offset on."""
+    encoding, delimiter = csv_format
+    if encoding == "utf-8-sig":
+        encoding = "utf-8"  # the BOM only precedes the header
+    position = offset
+    with open(file_path, "rb") as f:
+        f.seek(offset)
+
+        def lines():
+            # csv.reader pulls one line at a time, so after each row `position` is its end
+            nonlocal position
+            for line in f:
+                position += len(line)
+                yield line.decode(encoding, errors="replace")
+
+        start = offset
+        for row in csv.reader(lines(), delimiter=delimiter):
+            if row:
+                yield tuple(row), start, position
+            start = position
+
+def _clean_header(names):
+    header = [name.strip() for name in names]
+    if header:
+        header[0] = header[0].lstrip("\ufeff")
+    return header
+
+def _field_positions(header, fieldnames):
+    return [(field, header.index(field) if field in header else len(header)) for field in fieldnames]
+
+def _as_dict(values, positions):
+    size = len(values)
+    return {field: values[index] if index < size else "" for field, index in positions}
+
+def _iter_file_rows(file_path, fieldnames, offset):
+    """Yields (row dict, start offset, end offset) of a data file from byte offset on
+    (0 = first data row).
+
+    UTF-16 files cannot be split on newline bytes; they are streamed whole with no offsets.
+    """
+    csv_format = _detect_csv_format(file_path)
+    if csv_format[0] == "utf-16":
+        for row in read_csv_dict(file_path, fieldnames):
+            yield row, None, None
+        return
+    records = _iter_csv_records(file_path, offset, csv_format)
+    if offset:
+        header = _clean_header(_read_header(file_path, csv_format))
+    else:
+        first = next(records, None)
+        if first is None:
+            return
+        header = _clean_header(first[0])
+    positions = _field_positions(header, fieldnames)
+    for values, start, end in records:
+        yield _as_dict(values, positions), start, end
+
+def _read_rows_at(file_path, fieldnames, offsets):
+    """Reads the rows that start at the given byte offsets, with one seek each."""
+    csv_format = _detect_csv_format(file_path)
+    positions = _field_positions(_clean_header(_read_header(file_path, csv_format)), fieldnames)
+    rows = []
+    for offset in offsets:
+        record = next(_iter_csv_records(file_path, offset, csv_format), None)
+        if record is not None:
+            rows.append(_as_dict(record[0], positions))
+    return rows
+
+def _page_csv_file(table, file_path, fieldnames, state, limit, predicate=None):
+    """One page of a CSV file in file order, read from the offset stored in the cursor state."""
+    signature = _stat_signature(file_path)
+    if signature is None:
+        return [], None
+    offset, after_id = state.get("offset", 0), None
+    if offset is None or (offset and (state.get("inode") != signature[0] or offset > signature[1])):
+        # The file was rewritten since the cursor was made: rescan past the last id returned
+        offset, after_id = 0, state.get("last_id", 0)
+    rows = []
+    end, last_id = offset, state.get("last_id", 0)
+    for row, _, end in _iter_file_rows(file_path, fieldnames, offset):
+        row_id = _row_id_number(row)
+        if after_id is not None and row_id <= after_id:
+            continue
+        last_id = row_id
+        if predicate is None or predicate(row):
+            rows.append(row)
+            if len(rows) >= limit:
+                return rows, _encode_cursor(table, offset=end, inode=signature[0], last_id=last_id)
+    return rows, None
+
+def _page_sqlite(db, table, state, limit, predicate=None, column=None, value=None):
+    """One page of a SQLite table in id order, resuming after the last id in the cursor state."""
+    rows = []
+    after_id = state.get("last_id", 0)
+    while True:
+        batch = db.page_rows(table, after_id, limit, column, value)
+        for row in batch:
+            after_id = int(row["id"])
+            if predicate is None or predicate(row):
+                rows.append(row)
+                if len(rows) >= limit:
+                    return rows, _encode_cursor(table, last_id=after_id)
+        if len(batch) < limit:
+            return rows, None
+
+def _page_sorted_citizens(state, limit, sort, predicate):
+    """Citizens after the cursor's last sort key, in `sort` order, kept in a heap of `limit` rows."""
+    specs = [sort] if isinstance(sort, str) else list(sort)
+    if specs != ["rank"] and "id" not in {spec.lstrip("-") for spec in specs}:
+        specs.append("id")  # a total order, so no citizen falls between two pages
+    if state and state.get("sort") != specs:
+        raise ValueError("Page cursor was made for a different sort order")
+    key = _citizen_sort_key(specs)
+    after = state.get("after")
+    if specs == ["rank"]:
+        after = None if after is None else tuple(after)
+        if _sqlite() is None:
+            with _citizen_index.lock:
+                _citizen_index.ensure_fresh()
+                by_id = _citizen_index.by_id
+                ids = _citizen_index.ranking.ids_after(
+                    after, limit, None if predicate is None else (lambda citizen_id: predicate(by_id[citizen_id])))
+                page = [by_id[citizen_id] for citizen_id in ids]
+        else:
+            rows = (c for c in iter_citizens() if (after is None or after < key(c))
+                    and (predicate is None or predicate(c)))
+            page = heapq.nsmallest(limit, rows, key=key)
+        last_key = ranking_key(page[-1]) if page else None
+    else:
+        descending = tuple(spec.startswith("-") for spec in specs)
+        after = None if after is None else _SortKey(tuple(after), descending)
+        rows = (c for c in iter_citizens() if (after is None or after < key(c))
+                and (predicate is None or predicate(c)))
+        page = heapq.nsmallest(limit, rows, key=key)
+        last_key = key(page[-1]).values if page else None
+    next_cursor = _encode_cursor("citizens", sort=specs, after=list(last_key)) if len(page) >= limit else None
+    return page, next_cursor
+
+def page_citizens(cursor=None, limit=DEFAULT_PAGE_SIZE, sort=None, filters=None):
+    """Returns (citizens, next_cursor): one page of public citizen dicts.
+
+    sort: None for registration (file) order, "rank", or fields as in query_citizens.
+    filters: as in query_citizens. Pass the same sort and filters with every cursor.
+    """
+    limit = max(1, int(limit))
+    state = _decode_cursor(cursor, "citizens")
+    predicate = _citizen_filter(filters)
+    if sort:
+        page, next_cursor = _page_sorted_citizens(state, limit, sort, predicate)
+        return [_public_citizen(c) for c in page], next_cursor
+    if state.get("sort"):
+        raise ValueError("Page cursor was made for a different sort order")
+    db = _sqlite()
+    if db is not None:
+        page, next_cursor = _page_sqlite(db, "citizens", state, limit, predicate)
+        return [_public_citizen(c) for c in page], next_cursor
+    changes = _read_citizen_changes()
+
+    def merged(citizen):
+        pending = changes.get(citizen.get("id"))
+        if pending:
+            citizen.update(pending)
+        return predicate is None or predicate(citizen)
+    page, next_cursor = _page_csv_file("citizens", CITIZENS_CSV_FILE, CITIZENS_FIELDNAMES, state, limit, merged)
+    return [_public_citizen(c) for c in page], next_cursor
+
+def page_aid_history(cursor=None, limit=DEFAULT_PAGE_SIZE, citizen_internal_id=None):
+    """Returns (entries, next_cursor): one page of aid history in file order, optionally for one citizen."""
+    limit = max(1, int(limit))
+    state = _decode_cursor(cursor, "aid_history")
+    db = _sqlite()
+    if db is not None:
+        column = None if citizen_internal_id is None else "citizen_internal_id"
+        return _page_sqlite(db, "aid_history", state, limit, column=column, value=citizen_internal_id)
+    if citizen_internal_id is None:
+        return _page_csv_file("aid_history", AID_HISTORY_CSV_FILE, AID_HISTORY_FIELDNAMES, state, limit)
+    # One citizen's entries are already grouped in the aid history index
+    after_id = state.get("last_id", 0)
+    entries = [entry for entry in _aid_history_index.entries_for(citizen_internal_id)
+               if _row_id_number(entry) > after_id][:limit]
+    next_cursor = _encode_cursor("aid_history", last_id=_row_id_number(entries[-1])) if len(entries) >= limit else None
+    return [entry.to_row() for entry in entries], next_cursor
 
+def page_messages(cursor=None, limit=DEFAULT_PAGE_SIZE, citizen_internal_id=None):
+    """Returns (messages, next_cursor): one page of messages in file order, optionally for one citizen."""
+    limit = max(1, int(limit))
+    state = _decode_cursor(cursor, "messages")
+    db = _sqlite()
+    if db is not None:
+        column = None if citizen_internal_id is None else "citizen_internal_id"
+        return _page_sqlite(db, "messages", state, limit, column=column, value=citizen_internal_id)
+    if citizen_internal_id is None:
+        return _page_csv_file("messages", MESSAGES_CSV_FILE, MESSAGES_FIELDNAMES, state, limit)
+    # One citizen's messages are read through the message index
+    after_id = state.get("last_id", 0)
+    messages = [msg for msg in _message_index.messages_for(citizen_internal_id)
+                if _row_id_number(msg) > after_id][:limit]
+    next_cursor = _encode_cursor("messages", last_id=_row_id_number(messages[-1])) if len(messages) >= limit else None
+    return messages, next_cursor
 
+# ---------------------------- MAIN ----------------------------
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "normalize":
+        normalize_data_files()
+    setup_csv_files()
+    if len(sys.argv) > 1 and sys.argv[1] == "dedupe":
+        report = sys.argv[2] if len(sys.argv) > 2 else os.path.join(DATA_DIR, "duplicate_citizens.csv")
+        clusters = find_duplicate_citizens()
+        write_duplicates_report(clusters, report)
+        print(f"Found {len(clusters)} groups of possible duplicate registrations, see {report}")
+    print("Backend is ready and ID counter synced.")
@@ -0,0 +1,293 @@
+# benchmark.py - Scaling benchmark of backend_functions over synthetic data sets
+#
+# For each size (1k, 10k, 100k and 1M citizens by default) a seeded data set with
+# proportional aid history and messages is written to a scratch directory by the
+# synthetic generator of create_initial_data.py, and a
+# fresh Python process is pointed at it (CITIZEN_AID_DATA_DIR) to time the public
+# backend functions: logins, lookups, registration and updates, aid and message
+# writes, lists and the dashboard's received-status query, ranking, search, paging,
+# scheduling, allocation, statistics and duplicate detection. Maintenance helpers
+# (normalize_data_files, migrate_csv_to_sqlite, the raw CSV readers/writers) are not
+# timed. Each operation reports latency percentiles, throughput and the peak RSS of
+# its process so far; results are saved as JSON and can be compared with --compare.
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import backend_functions as be
+import create_initial_data as synthetic
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+DEFAULT_SEED = 42
+DEFAULT_SAMPLES = 200  # calls per point operation; scans get 1/40th of that, at least 3
+# An operation stops sampling early once its calls have taken this long (it always runs once)
+OPERATION_TIME_BUDGET_SECONDS = 20.0
+# Outside the source tree by default; pass --output to keep results next to the code
+RESULTS_FILE = os.path.join(tempfile.gettempdir(), "benchmark_results.json")
+
+NEW_NATIONAL_ID_BASE = 800000000  # above every synthetic national ID up to 40M citizens
+BENCH_ADMIN = synthetic.SAMPLE_ADMINS[0][:2]
+
+
+def generate_dataset(data_dir, citizens, seed=DEFAULT_SEED, workers=1):
+    """Writes the seeded synthetic data set of `citizens` citizens into data_dir; returns row counts."""
+    return synthetic.generate_synthetic_data(data_dir, citizens, seed, workers)
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(timings):
+    """Latency percentiles (ms) and throughput of a list of call durations (seconds)."""
+    ordered = sorted(timings)
+    total = sum(ordered)
+    return {
+        "samples": len(ordered),
+        "total_seconds": round(total, 6),
+        "mean_ms": round(1000 * total / len(ordered), 4),
+        "p50_ms": round(1000 * _percentile(ordered, 0.50), 4),
+        "p90_ms": round(1000 * _percentile(ordered, 0.90), 4),
+        "p99_ms": round(1000 * _percentile(ordered, 0.99), 4),
+        "max_ms": round(1000 * ordered[-1], 4),
+        "throughput_per_s": round(len(ordered) / total, 2) if total else None,
+    }
+
+
+def _operations(citizens, samples, rnd):
+    """(name, calls, make_args, function) in run order; arguments are drawn before each timed call."""
+    scans = max(3, samples // 40)
+    new_ids = iter(range(NEW_NATIONAL_ID_BASE, NEW_NATIONAL_ID_BASE + 10 ** 8))
+
+    def citizen():
+        return rnd.randint(1, citizens)
+
+    def new_citizen():
+        number = next(new_ids)
+        return {**synthetic.random_citizen(rnd), "national_id": str(number), "secret_code": f"pw{number}"}
+
+    def national_id():
+        return (synthetic.synthetic_national_id(citizen()),)
+
+    def login():
+        number = citizen()
+        return (synthetic.synthetic_national_id(number), synthetic.synthetic_secret(number))
+
+    def aid_type():
+        return rnd.choice(synthetic.AID_TYPES)
+
+    return [
+        ("warm_indexes", 1, lambda: (), be.warm_indexes),
+        # Point reads
+        ("verify_admin_login_csv", samples, lambda: BENCH_ADMIN, be.verify_admin_login_csv),
+        ("verify_citizen_login_csv", samples, login, be.verify_citizen_login_csv),
+        ("check_citizen_exists_csv", samples, national_id, be.check_citizen_exists_csv),
+        ("get_citizen_by_national_id_csv", samples, national_id, be.get_citizen_by_national_id_csv),
+        ("get_citizen_details_csv", samples, lambda: (citizen(),), be.get_citizen_details_csv),
+        ("get_citizen_rank", samples, lambda: (citizen(),), be.get_citizen_rank),
+        ("check_citizen_received_aid", samples, lambda: (citizen(),), be.check_citizen_received_aid),
+        ("read_aid_history", samples, lambda: (citizen(),), be.read_aid_history),
+        ("read_messages", samples, lambda: (citizen(),), be.read_messages),
+        ("get_inbox", samples, lambda: (citizen(),), be.get_inbox),
+        ("search_citizens", samples,
+         lambda: (f"{rnd.choice(synthetic.MALE_NAMES)} {rnd.choice(synthetic.FAMILY_NAMES)}",), be.search_citizens),
+        ("top_k_citizens", samples, lambda: (20,), be.top_k_citizens),
+        ("get_ranked_citizens_page", samples, lambda: (rnd.randrange(citizens), 50), be.get_ranked_citizens_page),
+        ("get_citizens_page_csv", samples, lambda: (rnd.randrange(citizens), 50), be.get_citizens_page_csv),
+        ("page_citizens", samples, lambda: (None, 50), be.page_citizens),
+        ("page_aid_history", samples, lambda: (None, 50, citizen()), be.page_aid_history),
+        ("page_messages", samples, lambda: (None, 50, citizen()), be.page_messages),
+        ("get_aid_due_between", samples, lambda: ("2025-06-01", "2025-06-30", 50), be.get_aid_due_between),
+        ("get_overdue_aid", samples, lambda: ("2025-06-01", 50), be.get_overdue_aid),
+        ("get_next_due_aid", samples, lambda: (20, "2025-06-01"), be.get_next_due_aid),
+        ("get_statistics", samples, lambda: (), be.get_statistics),
+        # Writes
+        ("register_citizen_csv", samples, lambda: (new_citizen(),), be.register_citizen_csv),
+        ("update_citizen_details_csv", samples,
+         lambda: (citizen(), {"phone_number": f"059{rnd.randint(0, 9999999):07d}"}), be.update_citizen_details_csv),
+        ("save_aid_history_entry", samples, lambda: (citizen(), aid_type(), "2025-06-01"),
+         be.save_aid_history_entry),
+        ("save_message_entry", samples, lambda: (citizen(), "Benchmark message"), be.save_message_entry),
+        ("register_admin_csv", max(1, samples // 10),
+         lambda: (f"admin{next(new_ids)}", "admin123"), be.register_admin_csv),
+        ("register_citizens_bulk[100]", scans, lambda: ([new_citizen() for _ in range(100)],),
+         be.register_citizens_bulk),
+        ("save_aid_history_entries[100]", scans, lambda: ([
+            {"citizen_internal_id": citizen(), "entry_type": aid_type(), "date": "2025-06-01"}
+            for _ in range(100)],), be.save_aid_history_entries),
+        # Full scans
+        ("get_citizens_list_csv", scans, lambda: (), be.get_citizens_list_csv),
+        ("get_citizens_list_csv[received,priority]", scans, lambda: ("received", "priority_score"),
+         be.get_citizens_list_csv),
+        ("get_received_status_map", scans, lambda: (), be.get_received_status_map),
+        # The admin dashboard's citizen table with its received filter
+        ("query_citizens[dashboard]", scans, lambda: (
+            [{"received": rnd.random() < 0.5}], ["id", "national_id", "full_name", "phone_number",
+                                                  "priority_score", "received"], ["id"]),
+         be.query_citizens),
+        ("read_aid_history[all]", scans, lambda: (), be.read_aid_history),
+        ("read_messages[all]", scans, lambda: (), be.read_messages),
+        ("plan_aid_allocation", scans, lambda: ({"FoodAid": 1000, "MedicalAid": 500}, 30, None, "2025-06-01"),
+         be.plan_aid_allocation),
+        ("compact_citizen_changes", 1, lambda: (), be.compact_citizen_changes),
+        ("find_duplicate_citizens", 1, lambda: (), be.find_duplicate_citizens),
+    ]
+
+
+def run_operations(citizens, samples, seed, skip=(), time_budget=OPERATION_TIME_BUDGET_SECONDS):
+    """Times every operation against the data set this process points at; returns {name: summary}."""
+    rnd = random.Random(seed + 1)
+    results = {}
+    for name, calls, make_args, function in _operations(citizens, samples, rnd):
+        if name in skip or name.split("[")[0] in skip:
+            continue
+        timings = []
+        for _ in range(calls):
+            args = make_args()
+            start = time.perf_counter()
+            function(*args)
+            timings.append(time.perf_counter() - start)
+            if sum(timings) > time_budget:
+                break
+        results[name] = summarize(timings)
+        results[name]["peak_rss_mb"] = _peak_rss_mb()
+    return results
+
+
+def _run_size_in_subprocess(data_dir, citizens, samples, seed, skip):
+    """Runs the operations in a fresh process so indexes and peak RSS belong to this size only."""
+    result_path = os.path.join(data_dir, "operations.json")
+    command = [sys.executable, os.path.abspath(__file__), "--worker", "--citizens", str(citizens),
+               "--samples", str(samples), "--seed", str(seed), "--result", result_path]
+    if skip:
+        command += ["--skip", *skip]
+    env = dict(os.environ, CITIZEN_AID_DATA_DIR=data_dir, CITIZEN_AID_STORAGE="csv")
+    # The backend prints progress per registration; only errors are passed through
+    subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL)
+    with open(result_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=be.BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, samples=DEFAULT_SAMPLES, seed=DEFAULT_SEED, output=RESULTS_FILE,
+                  data_root=None, keep_data=False, skip=(), progress=print, workers=1):
+    """Benchmarks every size and writes the results to output (JSON); returns them."""
+    results = {
+        "meta": {"started": datetime.datetime.now().isoformat(timespec="seconds"), "commit": _git_commit(),
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "seed": seed, "samples": samples},
+        "runs": [],
+    }
+    for citizens in sizes:
+        data_dir = tempfile.mkdtemp(prefix=f"bench_{citizens}_", dir=data_root)
+        try:
+            progress(f"... generating {citizens} citizens in {data_dir}")
+            start = time.perf_counter()
+            counts = generate_dataset(data_dir, citizens, seed, workers)
+            generate_seconds = time.perf_counter() - start
+            progress(f"... timing operations at {citizens} citizens")
+            operations = _run_size_in_subprocess(data_dir, citizens, samples, seed, skip)
+        finally:
+            if not keep_data:
+                shutil.rmtree(data_dir, ignore_errors=True)
+        results["runs"].append({
+            **counts, "generate_seconds": round(generate_seconds, 3),
+            "peak_rss_mb": max((op["peak_rss_mb"] or 0 for op in operations.values()), default=None),
+            "operations": operations,
+        })
+        progress(format_run(results["runs"][-1]))
+        # Saved after each size, so a long run keeps the sizes already measured
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+def format_run(run):
+    lines = [f"\n{run['citizens']} citizens, {run['aid_entries']} aid entries, {run['messages']} messages "
+             f"(generated in {run['generate_seconds']:.1f}s, peak RSS {run['peak_rss_mb']} MB)",
+             f"{'operation':44} {'n':>5} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'ops/s':>10}"]
+    for name, op in run["operations"].items():
+        lines.append(f"{name:44} {op['samples']:>5} {op['p50_ms']:>10.3f} {op['p90_ms']:>10.3f} "
+                     f"{op['p99_ms']:>10.3f} {op['throughput_per_s'] or 0:>10.1f}")
+    return "\n".join(lines)
+
+
+def compare(previous, current):
+    """Lines comparing p50 latency of two result files, per size and operation."""
+    previous_runs = {run["citizens"]: run["operations"] for run in previous["runs"]}
+    lines = [f"{'citizens':>9} {'operation':44} {'old p50':>10} {'new p50':>10} {'ratio':>7}"]
+    for run in current["runs"]:
+        old_operations = previous_runs.get(run["citizens"], {})
+        for name, op in run["operations"].items():
+            old = old_operations.get(name)
+            if old and old["p50_ms"]:
+                lines.append(f"{run['citizens']:>9} {name:44} {old['p50_ms']:>10.3f} {op['p50_ms']:>10.3f} "
+                             f"{op['p50_ms'] / old['p50_ms']:>7.2f}")
+    return "\n".join(lines)
+
+
+# ---------------------------- MAIN ----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backend_functions over synthetic data sets.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES, help="calls per point operation")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--output", default=RESULTS_FILE, help=f"results file (default: {RESULTS_FILE})")
+    parser.add_argument("--compare", metavar="RESULTS", help="earlier results file to compare p50 latencies with")
+    parser.add_argument("--data-root", help="directory for the generated data sets (default: system temp)")
+    parser.add_argument("--keep-data", action="store_true")
+    parser.add_argument("--skip", nargs="+", default=[], metavar="OPERATION", help="operations not to run")
+    parser.add_argument("--workers", type=int, default=1, help="processes generating each data set")
+    # Internal: time the operations in this process against CITIZEN_AID_DATA_DIR
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--citizens", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        be.setup_csv_files()
+        operations = run_operations(args.citizens, args.samples, args.seed, set(args.skip))
+        with open(args.result, "w", encoding="utf-8") as f:
+            json.dump(operations, f)
+        return
+
+    results = run_benchmark(args.sizes, args.samples, args.seed, args.output, args.data_root,
+                            args.keep_data, args.skip, workers=args.workers)
+    print(f"\n✓ Results saved to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print(compare(json.load(f), results))
+
+if __name__ == "__main__":
+    main()
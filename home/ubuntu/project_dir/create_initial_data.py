@@ -1,4 +1,19 @@
 # create_initial_data.py - Script to populate initial data
+#
+# Without arguments it registers the sample admins, citizens, aid records and messages
+# below through the backend. With --citizens N it instead generates a large synthetic
+# data set for load testing (generate_synthetic_data): Arabic names, Gaza-area
+# addresses, priority scores drawn from the registration questions, and aid and
+# message histories, written straight into the CSV files. Citizens are generated in
+# fixed-size chunks, each from its own seeded random stream, optionally on a process
+# pool; the chunks are joined in order, so a seed always gives the same files.
+
+import argparse
+import csv
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
 import backend_functions as be
 import datetime
@@ -134,17 +149,16 @@ def create_initial_data():
         }
     ]
     
+    # Register all citizens in one pass; citizen_ids stays aligned with citizens_data (None on failure)
     citizen_ids = []
-    for citizen_data in citizens_data:
-        registered_record = be.register_citizen_csv(citizen_data)
-        if registered_record:
-            citizen_id = registered_record.get("id")
-            citizen_ids.append(citizen_id)
-            print(f"✓ Created citizen: {citizen_data['full_name']} (ID: {citizen_id})")
+    for citizen_data, result in zip(citizens_data, be.register_citizens_bulk(citizens_data)):
+        citizen_ids.append(result["id"])
+        if result["success"]:
+            print(f"✓ Created citizen: {citizen_data['full_name']} (ID: {result['id']})")
         else:
-            print(f"✗ Failed to create citizen: {citizen_data['full_name']}")
+            print(f"✗ Failed to create citizen: {citizen_data['full_name']} ({result['error']})")
     
-    print(f"\nCreated {len(citizen_ids)} citizens successfully.")
+    print(f"\nCreated {len([c for c in citizen_ids if c])} citizens successfully.")
     
     print("\nCreating aid history records...")
     
@@ -209,7 +223,7 @@ def create_initial_data():
     print("Username: manager, Password: manager123") 
     print("Username: supervisor, Password: super123")
     
-    print(f"\nCitizen Accounts Created: {len(citizen_ids)}")
+    print(f"\nCitizen Accounts Created: {len([c for c in citizen_ids if c])}")
     print("Sample Citizen Login:")
     print("National ID: 123456789, Secret Code: ahmed123")
     print("National ID: 234567890, Secret Code: fatima456")
@@ -221,6 +235,281 @@ def create_initial_data():
     print("\nThe system is now ready for testing!")
     print("="*60)
 
+# ========================== SYNTHETIC DATA ==============================
+
+SYNTHETIC_SEED = 2024
+SYNTHETIC_CHUNK_SIZE = 50000
+AID_ENTRIES_PER_CITIZEN = 2.0   # on average; more for higher priority scores
+MESSAGES_PER_CITIZEN = 1.0      # on average
+SYNTHETIC_START_DATE = datetime.date(2023, 10, 7)
+SYNTHETIC_END_DATE = datetime.date(2025, 6, 1)
+
+MALE_NAMES = ["محمد", "أحمد", "محمود", "خالد", "يوسف", "إبراهيم", "عمر", "علي", "حسن", "حسين",
+              "مصطفى", "سامي", "رامي", "ياسر", "طارق", "وليد", "نبيل", "إياد", "باسل", "جمال",
+              "كمال", "سعد", "فهد", "عبدالله", "عبدالرحمن", "عبدالعزيز", "سليمان", "إسماعيل",
+              "أسامة", "هاني", "زياد", "ماهر", "نضال", "رائد", "منير", "عماد", "فادي", "حمزة"]
+FEMALE_NAMES = ["فاطمة", "مريم", "آمنة", "سارة", "نورا", "هبة", "ليلى", "زينب", "عائشة", "منى",
+                "أفنان", "إسراء", "آلاء", "رنا", "سماح", "هالة", "نسرين", "ولاء", "دعاء", "أسماء",
+                "خديجة", "رغد", "شيماء", "لينا", "يسرى", "حنان", "إيمان", "سمر"]
+FAMILY_NAMES = ["أبو وردة", "الشنطي", "أبوغالي", "القطناني", "الشريف", "المصري", "أبو معمر",
+                "النجار", "الشوا", "أبو شمالة", "حلس", "الحلو", "عياد", "الغول", "البطش", "أبو ندى",
+                "السقا", "الخالدي", "شاهين", "الأغا", "الفرا", "قديح", "بركة", "عاشور", "الهندي",
+                "الكرد", "أبو سمرة", "الريس", "صيام", "أبو حصيرة", "الزعانين", "المدهون", "الطويل",
+                "أبو عودة", "الدحدوح", "شراب", "أبو طه", "الكحلوت", "أبو جراد", "حمدان", "البرعي",
+                "أبو سلطان", "العطار", "عوض", "الجعبري", "أبو هاشم", "اللوح", "قشطة", "أبو العمرين"]
+# Area -> neighbourhoods, in the style of the sample addresses
+GAZA_AREAS = {
+    "مدينة غزة": ["حي الرمال", "حي التفاح", "حي الشجاعية", "حي الزيتون", "حي تل الهوى", "حي الصبرة",
+                  "حي الشيخ رضوان", "حي النصر", "حي الدرج", "حي الكرامة"],
+    "شمال غزة": ["مخيم جباليا", "بيت لاهيا", "بيت حانون", "جباليا البلد", "مشروع بيت لاهيا"],
+    "دير البلح": ["مخيم النصيرات", "مخيم البريج", "مخيم المغازي", "الزوايدة", "وسط البلد"],
+    "خانيونس": ["حي الأمل", "بلدة القرارة", "بني سهيلا", "عبسان", "خزاعة", "مخيم خانيونس"],
+    "رفح": ["حي البرازيل", "حي الجنينة", "تل السلطان", "الشابورة", "حي السلام"],
+}
+STREET_NAMES = ["شارع السلام", "شارع الكنز", "شارع يافا", "شارع عمر المختار", "شارع الجلاء",
+                "شارع صلاح الدين", "شارع البحر", "شارع النصر", "شارع الوحدة"]
+NEEDS_DESCRIPTIONS = ["عائل أسرة من ذوي الاحتياجات الخاصة، يحتاج مساعدة عاجلة", "أم عزباء مع أطفال، دخل محدود",
+                      "عامل بناء، دخل غير منتظم", "أسرة كبيرة، الأب مريض مزمن", "خريج جامعي، يبحث عن عمل",
+                      "معلمة، راتب محدود مع التزامات عائلية", "موظف حكومي، وضع مالي مستقر نسبياً",
+                      "أرملة مع أطفال، تحتاج دعم مالي", "نازح، فقد منزله", "صياد، توقف عمله"]
+AID_TYPES = ["FoodAid", "CashAid", "MedicalAid", "HygieneKit", "Blankets"]
+AID_TYPE_WEIGHTS = [45, 20, 15, 12, 8]
+SCHEDULED_ENTRY_TYPE = "AdminEntry"
+MESSAGE_TEXTS = ["تم استلام طلبكم للمساعدة الغذائية. سيتم التواصل معكم قريباً.",
+                 "تم الموافقة على طلب المساعدة المالية. يرجى مراجعة المكتب لاستلام المبلغ.",
+                 "نأسف لتأخير الرد. طلبكم قيد المراجعة وسيتم الرد خلال أسبوع.",
+                 "تم ترتيب موعد للفحص الطبي يوم الأحد القادم في المستشفى العام.",
+                 "يرجى تحديث بياناتكم الشخصية في أقرب وقت ممكن.",
+                 "شكراً لكم على التواصل. سيتم مراجعة حالتكم والرد قريباً.",
+                 "تم توزيع المساعدات الغذائية. يرجى استلامها من نقطة التوزيع المحددة."]
+SAMPLE_ADMINS = [("admin", "admin123", "System Administrator", "ORG001", "admin"),
+                 ("manager", "manager123", "Aid Manager", "ORG001", "manager"),
+                 ("supervisor", "super123", "Field Supervisor", "ORG002", "supervisor")]
+# Household sizes 1..12, weighted towards the large families of the Gaza Strip
+HOUSEHOLD_SIZES = list(range(1, 13))
+HOUSEHOLD_WEIGHTS = [3, 6, 9, 12, 14, 14, 12, 10, 8, 5, 4, 3]
+# Chance of "Yes" to each registration question, scored 3/2/1/1 like calculate_score() in the app
+QUESTION_WEIGHTS = (3, 2, 1, 1)
+QUESTION_YES_RATES = (0.25, 0.4, 0.55, 0.5)
+_MEAN_SCORE = sum(weight * rate for weight, rate in zip(QUESTION_WEIGHTS, QUESTION_YES_RATES))
+
+
+def synthetic_national_id(citizen_id):
+    """9-digit national ID of a synthetic citizen: an 8-digit serial plus a Luhn check digit."""
+    body = str(40000000 + citizen_id)
+    total = 0
+    for position, digit in enumerate(int(char) for char in reversed(body)):
+        doubled = digit * 2 if position % 2 == 0 else digit
+        total += doubled - 9 if doubled > 9 else doubled
+    return body + str((10 - total % 10) % 10)
+
+
+def synthetic_secret(citizen_id):
+    """Login secret code of a synthetic citizen."""
+    return f"pw{citizen_id}"
+
+
+def random_citizen(rnd):
+    """Citizen fields (no id, national_id or secret) drawn from the synthetic distributions."""
+    female = rnd.random() < 0.45
+    first = rnd.choice(FEMALE_NAMES if female else MALE_NAMES)
+    names = [first, rnd.choice(MALE_NAMES)]
+    if rnd.random() < 0.3:
+        names.append(rnd.choice(MALE_NAMES))  # grandfather's name
+    names.append(rnd.choice(FAMILY_NAMES))
+    area = rnd.choice(list(GAZA_AREAS))
+    address = [area, rnd.choice(GAZA_AREAS[area])]
+    if rnd.random() < 0.4:
+        address.append(rnd.choice(STREET_NAMES))
+    household = rnd.choices(HOUSEHOLD_SIZES, HOUSEHOLD_WEIGHTS)[0]
+    dependents = min(household - 1, max(0, int(rnd.gauss(household * 0.55, 1))))
+    # Larger households answer "Yes" more often
+    boost = 1.0 + (household - 6) * 0.05
+    score = sum(weight for weight, rate in zip(QUESTION_WEIGHTS, QUESTION_YES_RATES) if rnd.random() < rate * boost)
+    age = min(80, max(18, int(rnd.gauss(40, 11))))
+    born = SYNTHETIC_END_DATE.replace(year=SYNTHETIC_END_DATE.year - age) - datetime.timedelta(days=rnd.randrange(365))
+    return {
+        "full_name": " ".join(names),
+        "date_of_birth": born.isoformat(),
+        "phone_number": f"{rnd.choice(('059', '056'))}{rnd.randrange(10 ** 7):07d}",
+        "address": " ، ".join(address),
+        "household_members": household,
+        "dependents": dependents,
+        "needs_description": rnd.choice(NEEDS_DESCRIPTIONS),
+        "priority_score": float(score),
+    }
+
+
+def _random_day(rnd, start, end):
+    return datetime.date.fromordinal(rnd.randint(start.toordinal(), end.toordinal()))
+
+
+def _random_time(rnd, day):
+    return datetime.datetime.combine(day, datetime.time(rnd.randint(8, 17), rnd.randrange(60), rnd.randrange(60)))
+
+
+def _generate_chunk(parts_dir, seed, chunk_index, first_id, last_id, aid_per_citizen, messages_per_citizen):
+    """Writes one chunk's citizens, aid entries and messages (the last two without ids) to part files.
+
+    Returns (aid entries, messages) written.
+    """
+    rnd = random.Random(f"{seed}:{chunk_index}")
+    paths = [os.path.join(parts_dir, f"{table}.{chunk_index:06d}") for table in ("citizens", "aid", "messages")]
+    files = [open(path, "w", newline="", encoding="utf-8") for path in paths]
+    citizens_out, aid_out, messages_out = (csv.writer(f) for f in files)
+    aid_count = message_count = 0
+    registration_span = (SYNTHETIC_END_DATE - SYNTHETIC_START_DATE).days
+    try:
+        for citizen_id in range(first_id, last_id + 1):
+            citizen = random_citizen(rnd)
+            registered = SYNTHETIC_START_DATE + datetime.timedelta(days=rnd.randrange(registration_span))
+            citizens_out.writerow([
+                citizen_id, synthetic_national_id(citizen_id), citizen["full_name"], citizen["date_of_birth"],
+                citizen["phone_number"], citizen["address"], citizen["household_members"], citizen["dependents"],
+                citizen["needs_description"], citizen["priority_score"], rnd.random() < 0.97,
+                _random_time(rnd, registered).isoformat(), be._hash_password(synthetic_secret(citizen_id))
+            ])
+            # Citizens in more need are served more often (the factor averages 1 over all citizens)
+            mean_entries = aid_per_citizen * (1.0 + citizen["priority_score"]) / (1.0 + _MEAN_SCORE)
+            days = sorted(_random_day(rnd, registered, SYNTHETIC_END_DATE)
+                          for _ in range(int(rnd.expovariate(1.0 / mean_entries) + 0.5) if mean_entries else 0))
+            for number, day in enumerate(days, start=1):
+                if number == len(days) and rnd.random() < 0.2:
+                    next_date = (day + datetime.timedelta(days=rnd.choice((14, 30, 60)))).isoformat()
+                    aid_out.writerow([citizen_id, SCHEDULED_ENTRY_TYPE, day.isoformat(), next_date,
+                                      _random_time(rnd, day).isoformat()])
+                else:
+                    aid_out.writerow([citizen_id, rnd.choices(AID_TYPES, AID_TYPE_WEIGHTS)[0], day.isoformat(), "",
+                                      _random_time(rnd, day).isoformat()])
+            aid_count += len(days)
+            messages = int(rnd.expovariate(1.0 / messages_per_citizen) + 0.5) if messages_per_citizen else 0
+            for day in sorted(_random_day(rnd, registered, SYNTHETIC_END_DATE) for _ in range(messages)):
+                messages_out.writerow([citizen_id, rnd.choice(MESSAGE_TEXTS), _random_time(rnd, day).isoformat()])
+            message_count += messages
+    finally:
+        for f in files:
+            f.close()
+    return aid_count, message_count
+
+
+def _join_parts(part_paths, file_path, fieldnames, numbered):
+    """Concatenates part files under a header; numbered parts get ids 1, 2, ... prepended."""
+    with open(file_path, "w", newline="", encoding="utf-8") as out:
+        csv.writer(out).writerow(fieldnames)
+        next_id = 1
+        for part_path in part_paths:
+            with open(part_path, newline="", encoding="utf-8") as part:
+                if not numbered:
+                    shutil.copyfileobj(part, out, 1024 * 1024)
+                    continue
+                for line in part:  # generated fields contain no line breaks
+                    out.write(f"{next_id},{line}")
+                    next_id += 1
+
+
+# Left by an earlier data set in the same directory; the change log would otherwise be
+# replayed over the new citizens, who reuse its ids
+STALE_DATA_FILES = [be.CITIZEN_CHANGES_CSV_FILE, be.ID_COUNTER_FILE, be.ADMINS_ID_COUNTER_FILE,
+                    be.AID_HISTORY_ID_COUNTER_FILE, be.MESSAGES_ID_COUNTER_FILE]
+
+
+def _remove_stale_files(data_dir):
+    """Removes the change log, id counters and chunk directories of an earlier run from data_dir."""
+    for file_path in STALE_DATA_FILES:
+        try:
+            os.remove(os.path.join(data_dir, os.path.basename(file_path)))
+        except FileNotFoundError:
+            pass
+    for name in os.listdir(data_dir):
+        if name.startswith(".parts_"):
+            shutil.rmtree(os.path.join(data_dir, name), ignore_errors=True)
+
+
+def generate_synthetic_data(data_dir, citizens, seed=SYNTHETIC_SEED, workers=1, chunk_size=SYNTHETIC_CHUNK_SIZE,
+                            aid_per_citizen=AID_ENTRIES_PER_CITIZEN, messages_per_citizen=MESSAGES_PER_CITIZEN,
+                            progress=None):
+    """Writes a synthetic data set (admins, citizens, aid history, messages) into data_dir.
+
+    Citizens get ids 1..citizens, national IDs from synthetic_national_id() and the secret
+    code synthetic_secret(id); the sample admins keep their passwords. The files are the
+    same for a given seed and chunk_size whatever the number of workers. A citizen change
+    log and id counters already in data_dir are removed; setup_csv_files() recreates the
+    counters. Returns the number of rows per table.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    _remove_stale_files(data_dir)
+    parts_dir = tempfile.mkdtemp(prefix=".parts_", dir=data_dir)
+    chunks = [(parts_dir, seed, index, first_id, min(first_id + chunk_size - 1, citizens),
+               aid_per_citizen, messages_per_citizen)
+              for index, first_id in enumerate(range(1, citizens + 1, chunk_size))]
+    try:
+        if workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_generate_chunk, *chunk) for chunk in chunks]
+                counts = []
+                for chunk, future in zip(chunks, futures):
+                    counts.append(future.result())
+                    if progress:
+                        progress(chunk[4], citizens)
+        else:
+            counts = []
+            for chunk in chunks:
+                counts.append(_generate_chunk(*chunk))
+                if progress:
+                    progress(chunk[4], citizens)
+
+        def parts(table):
+            return [os.path.join(parts_dir, f"{table}.{index:06d}") for index in range(len(chunks))]
+        _join_parts(parts("citizens"), os.path.join(data_dir, os.path.basename(be.CITIZENS_CSV_FILE)),
+                    be.CITIZENS_FIELDNAMES, numbered=False)
+        _join_parts(parts("aid"), os.path.join(data_dir, os.path.basename(be.AID_HISTORY_CSV_FILE)),
+                    be.AID_HISTORY_FIELDNAMES, numbered=True)
+        _join_parts(parts("messages"), os.path.join(data_dir, os.path.basename(be.MESSAGES_CSV_FILE)),
+                    be.MESSAGES_FIELDNAMES, numbered=True)
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    with open(os.path.join(data_dir, os.path.basename(be.ADMINS_CSV_FILE)), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(be.ADMINS_FIELDNAMES)
+        for admin_id, (username, password, full_name, organization_id, role) in enumerate(SAMPLE_ADMINS, start=1):
+            writer.writerow([admin_id, username, be._hash_password(password), full_name, organization_id, role])
+    return {"citizens": citizens, "aid_entries": sum(aid for aid, _ in counts),
+            "messages": sum(messages for _, messages in counts), "admins": len(SAMPLE_ADMINS)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Populate the data files with sample or synthetic data.")
+    parser.add_argument("--citizens", type=int,
+                        help="generate this many synthetic citizens instead of the sample data")
+    parser.add_argument("--output-dir", default=be.DATA_DIR, help="directory for the synthetic data files")
+    parser.add_argument("--seed", type=int, default=SYNTHETIC_SEED)
+    parser.add_argument("--workers", type=int, default=1, help="processes generating chunks in parallel")
+    parser.add_argument("--chunk-size", type=int, default=SYNTHETIC_CHUNK_SIZE)
+    parser.add_argument("--force", action="store_true",
+                        help="overwrite existing data files; also deletes the citizen change log and id counters")
+    args = parser.parse_args()
+
+    if args.citizens is None:
+        create_initial_data()
+        return
+
+    data_files = [be.CITIZENS_CSV_FILE, be.AID_HISTORY_CSV_FILE, be.MESSAGES_CSV_FILE, be.ADMINS_CSV_FILE,
+                  be.CITIZEN_CHANGES_CSV_FILE]
+    existing = [os.path.basename(file_path) for file_path in data_files
+                if os.path.exists(os.path.join(args.output_dir, os.path.basename(file_path)))]
+    if existing and not args.force:
+        print(f"✗ {args.output_dir} already has {', '.join(existing)}; use --force to overwrite them.")
+        return
+    counts = generate_synthetic_data(
+        args.output_dir, args.citizens, args.seed, args.workers, args.chunk_size,
+        progress=lambda done, total: print(f"... {done} of {total} citizens generated")
+    )
+    print(f"✓ Generated {counts['citizens']} citizens, {counts['aid_entries']} aid entries and "
+          f"{counts['messages']} messages in {args.output_dir}")
+    print(f"Citizen logins: national ID from synthetic_national_id(id), secret code pw<id> "
+          f"(e.g. {synthetic_national_id(1)} / {synthetic_secret(1)}).")
+
 if __name__ == "__main__":
-    create_initial_data()
+    main()
 
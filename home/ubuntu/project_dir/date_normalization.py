@@ -0,0 +1,212 @@
+# date_normalization.py - Column-wise normalization of the mixed date formats in the data files
+#
+# The legacy files mix day-first dates ("27. 04. 2025"), month-first dates ("06. 15. 2025"),
+# month-first timestamps ("04. 27. 2025  12:00:00 AM") and ISO values written by the backend.
+# The format of a column is detected once from a sample and the whole column is converted in
+# one batch (pandas when installed, otherwise stdlib strptime memoized per distinct value).
+# Canonical values are ISO 8601 ("2025-04-27" / "2025-04-27T00:00:00"), so date filters are
+# plain string comparisons, or integer ones through date_key().
+
+import datetime
+import re
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+CANONICAL_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+CANONICAL_TIMESTAMP_RE = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?$")
+
+# Candidates in tie-break order: when every sampled value fits several formats
+# (e.g. "03. 04. 2025") the earlier one wins.
+DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%m. %d. %Y",
+    "%d. %m. %Y",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+)
+TIMESTAMP_FORMATS = (
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%m. %d. %Y %I:%M:%S %p",
+    "%d. %m. %Y %I:%M:%S %p",
+    "%m. %d. %Y %H:%M:%S",
+    "%d. %m. %Y %H:%M:%S",
+    "%m/%d/%Y %I:%M:%S %p",
+    "%d/%m/%Y %H:%M:%S",
+) + DATE_FORMATS
+
+SAMPLE_SIZE = 500
+_DOT_SEPARATOR_RE = re.compile(r"\s*\.\s*")
+
+
+def _clean(value):
+    """Collapses whitespace and dot separators ("06. 01.2025  12:00:00" -> "06. 01. 2025 12:00:00")."""
+    return _DOT_SEPARATOR_RE.sub(". ", " ".join(str(value).split()))
+
+
+def _is_canonical(value, kind):
+    pattern = CANONICAL_TIMESTAMP_RE if kind == "timestamp" else CANONICAL_DATE_RE
+    return bool(pattern.match(value))
+
+
+def _formats_for(kind):
+    return TIMESTAMP_FORMATS if kind == "timestamp" else DATE_FORMATS
+
+
+def _format_value(parsed, kind):
+    if kind == "timestamp":
+        return parsed.isoformat(timespec="seconds")
+    return parsed.date().isoformat()
+
+
+def _try_parse(value, formats):
+    for fmt in formats:
+        try:
+            return datetime.datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def detect_format(values, kind="date"):
+    """Returns the candidate format that parses the most of a sample of values (None if none do)."""
+    sample = []
+    for value in values:
+        value = _clean(value)
+        if value and not _is_canonical(value, kind):
+            sample.append(value)
+            if len(sample) >= SAMPLE_SIZE:
+                break
+    if not sample:
+        return None
+    best_format, best_hits = None, 0
+    for fmt in _formats_for(kind):
+        hits = 0
+        for value in sample:
+            try:
+                datetime.datetime.strptime(value, fmt)
+                hits += 1
+            except ValueError:
+                pass
+        if hits > best_hits:
+            best_format, best_hits = fmt, hits
+            if hits == len(sample):
+                break
+    return best_format
+
+
+def _convert_stdlib(values, fmt, kind):
+    converted = {}
+    fallback_formats = _formats_for(kind)
+    for value in set(values):
+        parsed = None
+        if fmt is not None:
+            try:
+                parsed = datetime.datetime.strptime(value, fmt)
+            except ValueError:
+                parsed = None
+        if parsed is None:
+            parsed = _try_parse(value, fallback_formats)
+        converted[value] = _format_value(parsed, kind) if parsed is not None else value
+    return [converted[value] for value in values]
+
+
+def _convert_pandas(values, fmt, kind):
+    parsed = pd.to_datetime(pd.Series(values, dtype="object"), format=fmt, errors="coerce")
+    iso_format = "%Y-%m-%dT%H:%M:%S" if kind == "timestamp" else "%Y-%m-%d"
+    formatted = parsed.dt.strftime(iso_format)
+    result = []
+    leftovers = []
+    for index, (value, iso_value) in enumerate(zip(values, formatted)):
+        if isinstance(iso_value, str):
+            result.append(iso_value)
+        else:
+            result.append(None)
+            leftovers.append(index)
+    if leftovers:
+        # Rows the dominant format did not fit are parsed one by one against every candidate
+        for index, iso_value in zip(leftovers, _convert_stdlib([values[i] for i in leftovers], None, kind)):
+            result[index] = iso_value
+    return result
+
+
+def normalize_column(values, kind="date", fmt=None):
+    """Converts a whole column to canonical ISO strings.
+
+    kind is "date" (-> YYYY-MM-DD) or "timestamp" (-> YYYY-MM-DDTHH:MM:SS). Empty and already
+    canonical values are kept as they are; values no candidate format can parse are left untouched.
+    fmt is the column's format when it was already detected (e.g. from an earlier batch of the
+    same column); by default it is detected from these values.
+    """
+    values = list(values)
+    pending_index = []
+    pending_values = []
+    for index, value in enumerate(values):
+        stripped = str(value).strip()
+        if not stripped or _is_canonical(stripped, kind):
+            continue
+        if kind == "date" and CANONICAL_TIMESTAMP_RE.match(stripped):
+            values[index] = stripped[:10]
+            continue
+        pending_index.append(index)
+        pending_values.append(_clean(stripped))
+    if not pending_values:
+        return values
+    fmt = fmt or detect_format(pending_values, kind)
+    if pd is not None and fmt is not None:
+        converted = _convert_pandas(pending_values, fmt, kind)
+    else:
+        converted = _convert_stdlib(pending_values, fmt, kind)
+    for index, iso_value in zip(pending_index, converted):
+        values[index] = iso_value
+    return values
+
+
+def normalize_rows(rows, columns):
+    """Normalizes the given {column: kind} of a list of row dicts in place.
+
+    Returns the number of values that changed.
+    """
+    changed = 0
+    for column, kind in columns.items():
+        original = [row.get(column, "") for row in rows]
+        for row, before, after in zip(rows, original, normalize_column(original, kind)):
+            if after != before:
+                row[column] = after
+                changed += 1
+    return changed
+
+
+def to_iso_date(value, kind="date"):
+    """Normalizes a single value (e.g. a date typed into a form).
+
+    A lone value gives no column to detect the format from, so it is only converted when
+    every candidate format that parses it reads the same date; ambiguous values
+    ("05. 03. 2025") and unparseable ones are returned unchanged, for normalize_data_files()
+    to resolve with the rest of their column.
+    """
+    stripped = str(value).strip()
+    if not stripped or _is_canonical(stripped, kind):
+        return value
+    if kind == "date" and CANONICAL_TIMESTAMP_RE.match(stripped):
+        return stripped[:10]
+    cleaned = _clean(stripped)
+    readings = set()
+    for fmt in _formats_for(kind):
+        try:
+            readings.add(_format_value(datetime.datetime.strptime(cleaned, fmt), kind))
+        except ValueError:
+            continue
+    return readings.pop() if len(readings) == 1 else value
+
+
+def date_key(value):
+    """Integer YYYYMMDD key of a canonical date or timestamp (0 when empty or not canonical)."""
+    digits = str(value)[:10]
+    if not CANONICAL_DATE_RE.match(digits):
+        return 0
+    return int(digits.replace("-", ""))
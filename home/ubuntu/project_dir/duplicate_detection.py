@@ -0,0 +1,278 @@
+# duplicate_detection.py - Finds citizens registered more than once
+#
+# The same household is sometimes registered twice with a typo in the national ID.
+# Comparing every pair of citizens is O(n^2), so citizens are first grouped into
+# blocks that share a blocking key: the phone number, or a phonetic key of the first
+# and family name together with the birth year. Only citizens in the same block are
+# compared (blocks too large to compare fully fall back to a sliding window over
+# their members sorted by name). Each pair is scored by a weighted similarity of
+# name, national ID, date of birth, phone and address, and pairs above the threshold
+# are joined into clusters. Large inputs are scored in a process pool across blocks.
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations, repeat
+from operator import ne
+
+from date_normalization import normalize_column
+from text_search import normalize_text, trigrams
+
+DEFAULT_MIN_SCORE = 0.75
+# Weight of each compared field; fields blank on either side are left out of the score
+FIELD_WEIGHTS = {"full_name": 0.35, "national_id": 0.25, "date_of_birth": 0.2,
+                 "phone_number": 0.15, "address": 0.05}
+# Blocks larger than this are compared through a sliding window of WINDOW_SIZE
+MAX_BLOCK_SIZE = 200
+WINDOW_SIZE = 20
+PHONE_DIGITS = 9  # local number without the country / trunk prefix
+# Below this many blocked citizens the pool costs more than it saves
+PARALLEL_MIN_RECORDS = 50000
+TASK_RECORDS = 20000
+
+# Letters that are commonly confused in spelling a name share a code; vowels,
+# weak letters and ain/hamza are dropped.
+_PHONETIC_CODES = str.maketrans({
+    **dict.fromkeys("بپ", "B"), **dict.fromkeys("تطث", "T"), **dict.fromkeys("جچ", "J"),
+    **dict.fromkeys("حهخ", "H"), **dict.fromkeys("دضذظ", "D"), "ر": "R", "ز": "Z",
+    **dict.fromkeys("سصش", "S"), **dict.fromkeys("فڤ", "F"), **dict.fromkeys("قكگ", "K"),
+    "ل": "L", "م": "M", "ن": "N", "غ": "G",
+    **dict.fromkeys("bfpv", "B"), **dict.fromkeys("cgjkqxz", "K"), "s": "S",
+    **dict.fromkeys("dt", "T"), "l": "L", **dict.fromkeys("mn", "N"), "r": "R",
+    **dict.fromkeys("اويىءعaeiouyhw", None),
+})
+_NON_DIGITS = re.compile(r"\D+")
+_REPEATS = re.compile(r"(.)\1+")
+
+
+def _word_code(word):
+    if word.startswith("ال") and len(word) > 3:
+        word = word[2:]
+    return _REPEATS.sub(r"\1", word.translate(_PHONETIC_CODES))[:4]
+
+
+def phonetic_key(name):
+    """Spelling-tolerant key of a name: phonetic codes of its first and last word."""
+    words = normalize_text(name).split()
+    if not words:
+        return ""
+    return f"{_word_code(words[0])}|{_word_code(words[-1])}" if len(words) > 1 else _word_code(words[0])
+
+
+def normalize_phone(phone):
+    """Last PHONE_DIGITS digits of a phone number ("+970 59-123 4567" -> "591234567")."""
+    digits = _NON_DIGITS.sub("", str(phone or ""))
+    return digits[-PHONE_DIGITS:] if len(digits) >= 7 else ""
+
+
+def _id_similarity(first, second):
+    """1 for the same ID, 0.9 for one wrong or two swapped digits, 0.8 for one digit missing."""
+    if first == second:
+        return 1.0
+    if len(first) == len(second):
+        differing = sum(map(ne, first, second))
+        if differing == 1:
+            return 0.9
+        if differing == 2:
+            i = next(i for i, (a, b) in enumerate(zip(first, second)) if a != b)
+            if first[i] == second[i + 1] and first[i + 1] == second[i]:
+                return 0.9
+        return 0.0
+    shorter, longer = sorted((first, second), key=len)
+    if len(longer) - len(shorter) == 1:
+        for i in range(len(longer)):
+            if longer[:i] + longer[i + 1:] == shorter:
+                return 0.8
+    return 0.0
+
+
+def _date_similarity(first, second):
+    """Dates are ISO; day and month swapped counts as nearly the same, the same year as some."""
+    if first == second:
+        return 1.0
+    if first[:4] != second[:4]:
+        return 0.0
+    if first[5:7] == second[8:10] and first[8:10] == second[5:7]:
+        return 0.8
+    return 0.4
+
+
+def _dice(first, second):
+    return 2.0 * len(first & second) / (len(first) + len(second)) if first and second else 0.0
+
+
+class _Features:
+    """Comparison form of one citizen; built in the worker from a compact tuple."""
+
+    __slots__ = ("id", "national_id", "name", "name_grams", "date_of_birth", "phone", "address_grams")
+
+    def __init__(self, values):
+        self.id, self.national_id, self.name, self.date_of_birth, self.phone, address = values
+        self.name_grams = trigrams(self.name) if self.name else set()
+        address = " ".join(normalize_text(address).split())
+        self.address_grams = trigrams(address) if address else set()
+
+
+def score_pair(first, second, min_score=0.0):
+    """Weighted similarity (0..1) of two citizens' _Features.
+
+    The name and national ID are compared first; once the pair can no longer reach
+    min_score the remaining fields are skipped and 0 is returned.
+    """
+    has_name = bool(first.name and second.name)
+    has_id = bool(first.national_id and second.national_id)
+    has_birth = bool(first.date_of_birth and second.date_of_birth)
+    has_phone = bool(first.phone and second.phone)
+    has_address = bool(first.address_grams and second.address_grams)
+    weights = FIELD_WEIGHTS
+    rest = has_birth * weights["date_of_birth"] + has_phone * weights["phone_number"] + has_address * weights["address"]
+    weight_sum = has_name * weights["full_name"] + has_id * weights["national_id"] + rest
+    if not weight_sum:
+        return 0.0
+    needed = min_score * weight_sum
+    total = 0.0
+    if has_name:
+        total += weights["full_name"] * _dice(first.name_grams, second.name_grams)
+        if total + has_id * weights["national_id"] + rest < needed:
+            return 0.0
+    if has_id:
+        total += weights["national_id"] * _id_similarity(first.national_id, second.national_id)
+        if total + rest < needed:
+            return 0.0
+    if has_birth:
+        total += weights["date_of_birth"] * _date_similarity(first.date_of_birth, second.date_of_birth)
+    if has_phone:
+        total += weights["phone_number"] * (first.phone == second.phone)
+    if has_address:
+        total += weights["address"] * _dice(first.address_grams, second.address_grams)
+    return total / weight_sum
+
+
+def _block_pairs(members):
+    if len(members) <= MAX_BLOCK_SIZE:
+        return combinations(members, 2)
+    # Sorted neighbourhood: only citizens with nearby names are compared
+    members = sorted(members, key=lambda features: (features.name, features.id))
+    return ((first, second) for i, first in enumerate(members)
+            for second in members[i + 1:i + WINDOW_SIZE])
+
+
+def _score_blocks(blocks, min_score):
+    """[(id, id, score)] of the pairs within each block of compact tuples scoring min_score or more."""
+    features = {}
+    matches = []
+    for block in blocks:
+        members = []
+        for values in block:
+            member = features.get(values[0])
+            if member is None:
+                member = features[values[0]] = _Features(values)
+            members.append(member)
+        for first, second in _block_pairs(members):
+            score = score_pair(first, second, min_score)
+            if score >= min_score:
+                matches.append((first.id, second.id, round(score, 4)))
+    return matches
+
+
+def _compact(citizens):
+    """Compact tuples (id, national_id, name, ISO date of birth, phone, address) of CitizenRecords.
+
+    Names are normalized here since the blocking keys need them; addresses in the workers.
+    """
+    citizens = list(citizens)
+    births = normalize_column([str(citizen.date_of_birth or "").strip() for citizen in citizens])
+    return [
+        (str(citizen.id), str(citizen.national_id or "").strip(), " ".join(normalize_text(citizen.full_name).split()),
+         birth if birth[4:5] == "-" else "", normalize_phone(citizen.phone_number), str(citizen.address or ""))
+        for citizen, birth in zip(citizens, births)
+    ]
+
+
+def blocking_keys(values):
+    """Blocks a compact citizen tuple belongs to: its phone, and its name key with birth year."""
+    keys = []
+    if values[4]:
+        keys.append(("phone", values[4]))
+    name_key = phonetic_key(values[2])
+    if name_key:
+        keys.append(("name", name_key, values[3][:4]))
+    return keys
+
+
+def _tasks(blocks, task_records):
+    task, size = [], 0
+    for block in blocks:
+        task.append(block)
+        size += len(block)
+        if size >= task_records:
+            yield task
+            task, size = [], 0
+    if task:
+        yield task
+
+
+def _clusters(pairs):
+    """Connected groups of the matched pairs (union-find), largest score first."""
+    parent = {}
+
+    def root(item):
+        parent.setdefault(item, item)
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    for first, second in pairs:
+        first_root, second_root = root(first), root(second)
+        if first_root != second_root:
+            parent[max(first_root, second_root)] = min(first_root, second_root)
+    groups = {}
+    for (first, second), score in pairs.items():
+        group = groups.setdefault(root(first), {"citizen_ids": set(), "pairs": []})
+        group["citizen_ids"].update((first, second))
+        group["pairs"].append((first, second, score))
+    clusters = []
+    for group in groups.values():
+        group["pairs"].sort(key=lambda pair: -pair[2])
+        clusters.append({"citizen_ids": sorted(group["citizen_ids"], key=_id_order),
+                         "score": group["pairs"][0][2], "pairs": group["pairs"]})
+    clusters.sort(key=lambda cluster: (-cluster["score"], _id_order(cluster["citizen_ids"][0])))
+    return clusters
+
+
+def _id_order(citizen_id):
+    return (0, int(citizen_id), "") if citizen_id.isdigit() else (1, 0, citizen_id)
+
+
+def find_duplicates(citizens, min_score=DEFAULT_MIN_SCORE, workers=None):
+    """Clusters of likely duplicate registrations among CitizenRecords.
+
+    Returns [{"citizen_ids": [...], "score": best pair score, "pairs": [(id, id, score)]}],
+    most certain first. workers: processes to score blocks with (None: one per CPU,
+    1: in this process).
+    """
+    records = _compact(citizens)
+    blocks = {}
+    for values in records:
+        for key in blocking_keys(values):
+            blocks.setdefault(key, []).append(values)
+    blocks = [block for block in blocks.values() if len(block) > 1]
+    blocked = sum(map(len, blocks))
+    workers = workers or os.cpu_count() or 1
+    results = None
+    if workers > 1 and blocked >= PARALLEL_MIN_RECORDS:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_score_blocks, _tasks(blocks, TASK_RECORDS), repeat(min_score)))
+        except (OSError, NotImplementedError):
+            results = None  # no process support here; score in this process
+    if results is None:
+        results = [_score_blocks(blocks, min_score)]
+    # A pair can share several blocks (phone and name); it is kept once
+    pairs = {}
+    for matches in results:
+        for first, second, score in matches:
+            key = (first, second) if _id_order(first) <= _id_order(second) else (second, first)
+            pairs[key] = score
+    return _clusters(pairs)
@@ -3,7 +3,15 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import datetime
+import queue
+import threading
+import os
 import backend_functions as be
+from aid_service import RemoteBackend
+from virtual_treeview import VirtualTreeview
+
+# When set (e.g. http://127.0.0.1:8765), the app talks to aid_service instead of opening the data files
+SERVICE_URL = os.environ.get("CITIZEN_AID_SERVICE_URL", "").strip()
 
 # Global variable to store the internal ID of the currently logged-in citizen
 current_user_internal_id = None
@@ -19,6 +27,58 @@ def calculate_score(q1_var, q2_var, q3_var, q4_var):
     score += 1 if q4_var.get() == "Yes" else 0
     return float(score)
 
+# Citizens listed for a name/address search on the edit citizen screen
+SEARCH_RESULTS_LIMIT = 50
+
+# Rows inserted into a Treeview per main-loop turn, and how often worker results are polled
+TREE_INSERT_CHUNK_SIZE = 500
+BACKGROUND_POLL_MS = 50
+
+def run_in_background(widget, work, on_done, on_error=None):
+    """Runs work() on a worker thread and hands its result to on_done (or the exception to
+    on_error) on the Tk thread, by polling with widget.after(). Tk itself is never touched
+    from the worker."""
+    results = queue.Queue(maxsize=1)
+
+    def worker():
+        try:
+            results.put((True, work()))
+        except Exception as e:
+            results.put((False, e))
+
+    def poll():
+        if not widget.winfo_exists():
+            return
+        try:
+            ok, value = results.get_nowait()
+        except queue.Empty:
+            widget.after(BACKGROUND_POLL_MS, poll)
+            return
+        if ok:
+            on_done(value)
+        elif on_error is not None:
+            on_error(value)
+
+    threading.Thread(target=worker, daemon=True).start()
+    widget.after(BACKGROUND_POLL_MS, poll)
+
+def insert_rows_in_chunks(tree, rows, is_current, on_progress=None, on_finished=None):
+    """Inserts value tuples into a Treeview TREE_INSERT_CHUNK_SIZE at a time, yielding to the
+    event loop between chunks. Stops as soon as is_current() returns False."""
+    def insert_chunk(start):
+        if not is_current() or not tree.winfo_exists():
+            return
+        end = min(start + TREE_INSERT_CHUNK_SIZE, len(rows))
+        for values in rows[start:end]:
+            tree.insert("", tk.END, values=values)
+        if on_progress is not None:
+            on_progress(end, len(rows))
+        if end < len(rows):
+            tree.after(1, insert_chunk, end)
+        elif on_finished is not None:
+            on_finished()
+    insert_chunk(0)
+
 # ============================ ADMIN SCREENS ============================
 
 def open_add_admin_screen():
@@ -72,13 +132,17 @@ def open_add_admin_screen():
 def open_edit_citizen_screen():
     win = tk.Toplevel()
     win.title("Edit Citizen Info / Add Aid Record")
-    win.geometry("500x500")
-    tk.Label(win, text="Search Citizen by National ID (9 digits)", 
+    win.geometry("500x650")
+    tk.Label(win, text="Search Citizen by National ID (9 digits) or Name / Address", 
              font=("Helvetica", 14, "bold")).pack(pady=10)
     
-    search_entry = tk.Entry(win, width=20, font=("Helvetica", 12))
+    search_entry = tk.Entry(win, width=30, font=("Helvetica", 12))
     search_entry.pack(pady=5)
     
+    # Matches of a name/address search (hidden until a text search returns several)
+    matches_list = tk.Listbox(win, width=60, height=6)
+    matches = []
+    
     result_label = tk.Label(win, text="", wraplength=450, justify="left")
     result_label.pack(pady=10)
     
@@ -97,35 +161,60 @@ def open_edit_citizen_screen():
     # Store the found citizen's internal ID
     found_citizen_internal_id = None
 
+    def show_citizen(found_citizen):
+        nonlocal found_citizen_internal_id
+        if found_citizen:
+            found_citizen_internal_id = found_citizen.get("id")
+            result_text = f"Found: {found_citizen.get('full_name')} (ID: {found_citizen_internal_id})\n"
+            result_text += f"Phone: {found_citizen.get('phone_number')}\n"
+            result_text += f"Priority Score: {found_citizen.get('priority_score', 0.0)}"
+            result_label.config(text=result_text, fg="green")
+            edit_frame.pack(pady=10, padx=20, fill="x")
+        else:
+            result_label.config(text="Citizen not found or is inactive.", fg="red")
+            edit_frame.pack_forget()
+            found_citizen_internal_id = None
+
+    def on_match_selected(event):
+        selection = matches_list.curselection()
+        if selection:
+            show_citizen(matches[selection[0]])
+
+    matches_list.bind("<<ListboxSelect>>", on_match_selected)
+
     def search_citizen():
         nonlocal found_citizen_internal_id
-        national_id_search = search_entry.get().strip()
-        if not national_id_search.isdigit() or len(national_id_search) != 9:
-            result_label.config(text="Invalid National ID format (must be 9 digits).", fg="red")
+        search_text = search_entry.get().strip()
+        matches_list.pack_forget()
+        if not search_text:
+            result_label.config(text="Enter a National ID (9 digits) or a name / address.", fg="red")
             edit_frame.pack_forget()
             found_citizen_internal_id = None
             return
-            
-        found_citizen = None
+
         try:
-            for citizen in be.read_csv_dict(be.CITIZENS_CSV_FILE, be.CITIZENS_FIELDNAMES):
-                if citizen.get("national_id") == national_id_search:
-                    is_active = citizen.get("is_active", "True").strip().lower() == "true"
-                    if is_active:
-                        found_citizen = citizen
-                        break
-            
-            if found_citizen:
-                found_citizen_internal_id = found_citizen.get("id")
-                result_text = f"Found: {found_citizen.get('full_name')} (ID: {found_citizen_internal_id})\n"
-                result_text += f"Phone: {found_citizen.get('phone_number')}\n"
-                result_text += f"Priority Score: {found_citizen.get('priority_score', 0.0)}"
-                result_label.config(text=result_text, fg="green")
-                edit_frame.pack(pady=10, padx=20, fill="x")
-            else:
-                result_label.config(text="Citizen not found or is inactive.", fg="red")
-                edit_frame.pack_forget()
-                found_citizen_internal_id = None
+            if search_text.isdigit():
+                if len(search_text) != 9:
+                    result_label.config(text="Invalid National ID format (must be 9 digits).", fg="red")
+                    edit_frame.pack_forget()
+                    found_citizen_internal_id = None
+                    return
+                citizen = be.get_citizen_by_national_id_csv(search_text)
+                show_citizen(citizen if citizen and citizen.get("is_active") else None)
+                return
+
+            matches[:] = be.search_citizens(search_text, limit=SEARCH_RESULTS_LIMIT, active_only=True)
+            if len(matches) == 1:
+                show_citizen(matches[0])
+                return
+            show_citizen(None)
+            if matches:
+                result_label.config(text=f"{len(matches)} matches - select a citizen:", fg="black")
+                matches_list.delete(0, tk.END)
+                for citizen in matches:
+                    matches_list.insert(tk.END, f"{citizen.get('full_name')} - {citizen.get('address')} "
+                                                f"(National ID: {citizen.get('national_id')})")
+                matches_list.pack(before=result_label, pady=5)
         except Exception as e:
             result_label.config(text=f"Error reading citizen data: {e}", fg="red")
             edit_frame.pack_forget()
@@ -180,12 +269,32 @@ def open_sorted_citizens_screen():
     tk.Label(win, text="Citizens Sorted by Highest Priority Score", 
              font=("Helvetica", 16, "bold")).pack(pady=10)
 
-    # Create frame for the treeview and scrollbar
-    tree_frame = tk.Frame(win)
-    tree_frame.pack(expand=True, fill="both", padx=20, pady=10)
+    # Jump to a rank
+    jump_frame = tk.Frame(win)
+    jump_frame.pack(padx=20, fill="x")
+    tk.Label(jump_frame, text="Go to rank:", font=("Helvetica", 11, "bold")).pack(side="left", padx=5)
+    rank_entry = tk.Entry(jump_frame, width=10)
+    rank_entry.pack(side="left", padx=5)
+    total_label = tk.Label(jump_frame, text="", font=("Helvetica", 10))
+    total_label.pack(side="right", padx=5)
 
     columns = ("internal_id", "national_id", "full_name", "phone_number", "priority_score")
-    tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
+
+    def fetch_page(offset, limit):
+        citizens, total = be.get_ranked_citizens_page(offset, limit)
+        total_label.config(text=f"{total} citizens")
+        return [(
+            citizen.get("id", "N/A"),
+            citizen.get("national_id", "N/A"),
+            citizen.get("full_name", "N/A"),
+            citizen.get("phone_number", "N/A"),
+            f"{float(citizen.get('priority_score') or 0.0):.1f}"
+        ) for citizen in citizens], total
+
+    # Only the visible rows live in the Treeview; pages are fetched as the user scrolls
+    virtual_tree = VirtualTreeview(win, columns, fetch_page)
+    virtual_tree.pack(expand=True, fill="both", padx=20, pady=10)
+    tree = virtual_tree.tree
     
     tree.heading("internal_id", text="Internal ID")
     tree.heading("national_id", text="National ID")
@@ -199,27 +308,25 @@ def open_sorted_citizens_screen():
     tree.column("phone_number", width=120)
     tree.column("priority_score", width=80, anchor="e")
 
-    # Add scrollbar
-    scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
-    tree.configure(yscrollcommand=scrollbar.set)
-    scrollbar.pack(side="right", fill="y")
-    tree.pack(expand=True, fill="both")
+    def jump_to_rank(event=None):
+        rank = rank_entry.get().strip()
+        if not rank.isdigit() or int(rank) < 1:
+            messagebox.showerror("Error", "Rank must be a positive number.", parent=win)
+            return
+        if int(rank) > virtual_tree.total:
+            messagebox.showerror("Error", f"There are only {virtual_tree.total} ranked citizens.", parent=win)
+            return
+        virtual_tree.scroll_to(int(rank) - 1, select=True)
 
-    try:
-        sorted_citizens = be.get_citizens_list_csv(sort_by="priority_score")
+    tk.Button(jump_frame, text="Go", command=jump_to_rank,
+              bg="#2196F3", fg="white", font=("Helvetica", 10, "bold")).pack(side="left", padx=5)
+    rank_entry.bind("<Return>", jump_to_rank)
 
-        if not sorted_citizens:
+    try:
+        virtual_tree.refresh()
+        if virtual_tree.total == 0:
             tk.Label(win, text="No active citizens found.", fg="orange", 
                     font=("Helvetica", 12)).pack()
-        else:
-            for citizen in sorted_citizens:
-                tree.insert("", tk.END, values=(
-                    citizen.get("id", "N/A"),
-                    citizen.get("national_id", "N/A"),
-                    citizen.get("full_name", "N/A"),
-                    citizen.get("phone_number", "N/A"),
-                    f"{citizen.get('priority_score', 0.0):.1f}"
-                ))
 
     except Exception as e:
         tk.Label(win, text=f"Error loading citizen data: {e}", fg="red",
@@ -265,6 +372,11 @@ def open_admin_panel():
                               state="readonly", width=15)
     filter_menu.pack(side="left", padx=5)
 
+    load_status_label = tk.Label(filter_frame, text="", font=("Helvetica", 10))
+    load_status_label.pack(side="right", padx=5)
+    load_progress = ttk.Progressbar(filter_frame, length=200)
+    load_progress.pack(side="right", padx=5)
+
     # Citizen Table Frame
     table_frame = tk.Frame(win)
     table_frame.pack(pady=10, padx=10, expand=True, fill="both")
@@ -292,38 +404,68 @@ def open_admin_panel():
     scrollbar.pack(side="right", fill="y")
     citizen_tree.pack(expand=True, fill="both")
 
+    # Incremented on every load; a load whose generation is no longer current is abandoned
+    load_generation = [0]
+
     def load_citizen_data(filter_status="All users"):
-        for item in citizen_tree.get_children():
-            citizen_tree.delete(item)
-            
-        try:
-            all_citizens = be.get_citizens_list_csv(sort_by="id")
-            
-            if not all_citizens:
+        load_generation[0] += 1
+        generation = load_generation[0]
+
+        def is_current():
+            return generation == load_generation[0]
+
+        citizen_tree.delete(*citizen_tree.get_children())
+        load_progress.config(mode="indeterminate")
+        load_progress.start(10)
+        load_status_label.config(text="Loading citizens...")
+
+        def fetch_rows():
+            # Runs on a worker thread: reads and filters, but never touches Tk
+            if be.get_statistics()["total_citizens"] == 0:
+                return None
+            # Only plain dict filters, which can also be sent to the service (CITIZEN_AID_SERVICE_URL)
+            filters = []
+            if filter_status != "All users":
+                filters.append({"received": filter_status == "Received"})
+            citizens = be.query_citizens(
+                filters=filters, sort=["id"],
+                columns=["id", "national_id", "full_name", "phone_number", "priority_score", "received"])
+            if not is_current():
+                return []  # superseded while querying; show_rows drops it
+            return [(
+                citizen["id"],
+                citizen.get("national_id") or "N/A",
+                citizen.get("full_name") or "N/A",
+                citizen.get("phone_number") or "N/A",
+                f"{float(citizen.get('priority_score') or 0.0):.1f}",
+                "Yes" if citizen["received"] else "No"
+            ) for citizen in citizens]
+
+        def show_progress(inserted, total):
+            load_progress["value"] = inserted
+            load_status_label.config(text=f"Loaded {inserted} of {total}")
+
+        def show_rows(rows):
+            if not is_current():
+                return
+            load_progress.stop()
+            load_progress.config(mode="determinate", maximum=max(len(rows or []), 1), value=0)
+            if rows is None:
                 citizen_tree.insert("", tk.END, values=("", "", "No active citizens found.", "", "", ""))
+                load_status_label.config(text="")
                 return
+            insert_rows_in_chunks(citizen_tree, rows, is_current, show_progress)
 
-            for citizen in all_citizens:
-                citizen_internal_id = citizen.get("id")
-                received_status = "Yes" if be.check_citizen_received_aid(citizen_internal_id) else "No"
-                
-                if (filter_status == "All users" or 
-                   (filter_status == "Received" and received_status == "Yes") or 
-                   (filter_status == "Not Received" and received_status == "No")):
-                    
-                    citizen_tree.insert("", tk.END, values=(
-                        citizen_internal_id,
-                        citizen.get("national_id", "N/A"),
-                        citizen.get("full_name", "N/A"),
-                        citizen.get("phone_number", "N/A"),
-                        f"{citizen.get('priority_score', 0.0):.1f}",
-                        received_status
-                    ))
-
-        except Exception as e:
+        def show_error(e):
+            if not is_current():
+                return
+            load_progress.stop()
+            load_status_label.config(text="")
             messagebox.showerror("Error", f"Failed to load citizen data: {e}", parent=win)
             citizen_tree.insert("", tk.END, values=("", "", f"Error: {e}", "", "", ""))
 
+        run_in_background(win, fetch_rows, show_rows, show_error)
+
     load_citizen_data()
 
     def on_filter_change(event):
@@ -345,30 +487,23 @@ def open_admin_panel():
     stats_tree.pack(pady=5)
 
     def update_stats():
-        for item in stats_tree.get_children():
-            stats_tree.delete(item)
-            
-        try:
-            all_citizens = list(be.read_csv_dict(be.CITIZENS_CSV_FILE, be.CITIZENS_FIELDNAMES))
-            total_citizens = len(all_citizens)
-            
-            aid_history = be.read_aid_history()
-            total_aid_ops = len(aid_history)
-            
-            received_ids = set()
-            for citizen in all_citizens:
-                internal_id = citizen.get("id")
-                if internal_id and be.check_citizen_received_aid(internal_id):
-                    received_ids.add(internal_id)
-            received_count = len(received_ids)
-            
-            not_received = total_citizens - received_count 
-            
-            stats_tree.insert("", tk.END, values=(total_citizens, received_count, 
-                                                 not_received, total_aid_ops))
-            
-        except Exception as e:
-            stats_tree.insert("", tk.END, values=(f"Error: {e}", "", "", ""))
+        stats_tree.delete(*stats_tree.get_children())
+        stats_tree.insert("", tk.END, values=("Loading...", "", "", ""))
+
+        def compute_stats():
+            # Runs on a worker thread; the backend keeps the aggregates current on every write
+            stats = be.get_statistics()
+            return (stats["total_citizens"], stats["received_aid"],
+                    stats["not_received"], stats["aid_operations"])
+
+        def show_stats(values):
+            stats_tree.delete(*stats_tree.get_children())
+            stats_tree.insert("", tk.END, values=values)
+
+        def show_error(e):
+            show_stats((f"Error: {e}", "", "", ""))
+
+        run_in_background(win, compute_stats, show_stats, show_error)
 
     update_stats()
     tk.Button(stats_frame, text="Refresh Stats", command=update_stats,
@@ -696,7 +831,7 @@ def open_citizen_dashboard():
     aid_text.pack(pady=5, padx=10, fill="both", expand=True)
     aid_text.config(state="disabled")
 
-    tk.Label(content_frame, text="Messages from Admin", font=("Helvetica", 14, "bold")).pack(pady=(10, 5))
+    tk.Label(content_frame, text="Messages from Admin (latest first)", font=("Helvetica", 14, "bold")).pack(pady=(10, 5))
     msg_text = scrolledtext.ScrolledText(content_frame, height=8, width=70, wrap=tk.WORD,
                                         font=("Helvetica", 10))
     msg_text.pack(pady=5, padx=10, fill="both", expand=True)
@@ -704,7 +839,7 @@ def open_citizen_dashboard():
 
     def load_info():
         aid_history = be.read_aid_history(current_user_internal_id)
-        messages = be.read_messages(current_user_internal_id)
+        messages = be.get_inbox(current_user_internal_id)  # newest first
         
         aid_text.config(state="normal")
         aid_text.delete(1.0, tk.END)
@@ -850,7 +985,9 @@ def create_main_window():
 # ========================== MAIN EXECUTION ==============================
 
 if __name__ == "__main__":
-    # Initialize backend
+    # Initialize backend (or use the shared service, which keeps the data files itself)
+    if SERVICE_URL:
+        be = RemoteBackend(SERVICE_URL)
     be.setup_csv_files()
     
     # Create and run the main application
@@ -0,0 +1,15 @@
+# migrate_to_sqlite.py - One-shot migration of the CSV data files into SQLite
+
+import sys
+import backend_functions as be
+
+def main():
+    db_file = sys.argv[1] if len(sys.argv) > 1 else be.SQLITE_DB_FILE
+    print(f"Migrating CSV data into {db_file}...")
+    copied = be.migrate_csv_to_sqlite(db_file)
+    for table, count in copied.items():
+        print(f"✓ {table}: {count} rows")
+    print("\nSet CITIZEN_AID_STORAGE=sqlite (and CITIZEN_AID_DB if you used a custom path) to run on SQLite.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# priority_ranking.py - Citizens ordered by numeric priority score
+#
+# Ranking order is highest priority_score first; ties go to the citizen who registered
+# earlier, then to the lower id. PriorityRanking keeps that order as a sorted list of
+# keys that is updated incrementally (bisect) as citizens are registered or edited,
+# so top-k and paging never re-sort. top_k_heap() answers the same query from any
+# iterable of rows in O(n log k) when no maintained index is available.
+
+import bisect
+import heapq
+
+# Citizens without a registration date rank after those with one on equal score
+MISSING_REGISTRATION_DATE = "9999-12-31"
+
+
+def parse_score(value):
+    try:
+        return float(value or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def ranking_key(citizen):
+    """Sort key of a citizen row: smaller keys rank higher.
+
+    Ends with the id as the indexes key it (str of the row's id), so a blank or
+    non-numeric id, which orders as 0, still leads back to its own row.
+    """
+    raw_id = citizen.get("id")
+    try:
+        citizen_id = int(raw_id)
+    except (TypeError, ValueError):
+        citizen_id = 0
+    registration_date = str(citizen.get("registration_date") or "").strip() or MISSING_REGISTRATION_DATE
+    return (-parse_score(citizen.get("priority_score")), registration_date, citizen_id, str(raw_id))
+
+
+def top_k_heap(citizens, k, predicate=None):
+    """Returns the k highest ranked rows of an iterable (in ranking order) with a bounded heap."""
+    rows = citizens if predicate is None else (c for c in citizens if predicate(c))
+    return heapq.nsmallest(k, rows, key=ranking_key)
+
+
+class PriorityRanking:
+    """Sorted index of citizen ids in ranking order, maintained incrementally."""
+
+    def __init__(self):
+        self._keys = []
+        self._key_by_id = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def rebuild(self, citizens):
+        self._key_by_id = {str(c.get("id")): ranking_key(c) for c in citizens}
+        self._keys = sorted(self._key_by_id.values())
+
+    def add(self, citizen):
+        """Adds or re-ranks one citizen."""
+        citizen_id = str(citizen.get("id"))
+        key = ranking_key(citizen)
+        old_key = self._key_by_id.get(citizen_id)
+        if old_key == key:
+            return
+        if old_key is not None:
+            self._remove_key(old_key)
+        self._key_by_id[citizen_id] = key
+        bisect.insort(self._keys, key)
+
+    update = add
+
+    def _remove_key(self, key):
+        index = bisect.bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            del self._keys[index]
+
+    def rank_of(self, citizen_id):
+        """1-based rank of a citizen, or None if unknown."""
+        key = self._key_by_id.get(str(citizen_id))
+        if key is None:
+            return None
+        return bisect.bisect_left(self._keys, key) + 1
+
+    def ids(self, offset=0, limit=None):
+        """Citizen ids in ranking order, from offset (0-based rank) for limit entries."""
+        end = len(self._keys) if limit is None else offset + limit
+        return [key[-1] for key in self._keys[offset:end]]
+
+    def top_k(self, k, predicate=None):
+        """Ids of the k highest ranked citizens for which predicate(citizen_id) is true."""
+        if predicate is None:
+            return self.ids(0, k)
+        return self.ids_after(None, k, predicate)
+
+    def ids_after(self, key, limit, predicate=None):
+        """Ids of up to limit citizens ranked after ranking key `key` (None starts at the top)."""
+        start = 0 if key is None else bisect.bisect_right(self._keys, tuple(key))
+        result = []
+        for index in range(start, len(self._keys)):
+            if len(result) >= limit:
+                break
+            citizen_id = self._keys[index][-1]
+            if predicate is None or predicate(citizen_id):
+                result.append(citizen_id)
+        return result
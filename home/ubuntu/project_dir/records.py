@@ -0,0 +1,126 @@
+# records.py - Compact typed records for the rows held in memory by backend_functions
+#
+# Each table held in memory gets a __slots__ class, so an indexed row costs one small object
+# instead of a dict of strings. Rows are parsed in exactly one place
+# (Record.from_row) through converters resolved once per class; the converters
+# for low-cardinality values (scores, flags, counts) are memoized. Records keep
+# the dict-style get()/[] access used by the indexes, and to_row() returns the
+# plain string dict stored in the CSV files.
+
+from functools import lru_cache
+
+
+def _to_id(value):
+    # Ids are unique per row, so they are not memoized; blank ids stay blank
+    text = "" if value is None else str(value).strip()
+    return int(text) if text.isdigit() else text
+
+
+# Unparseable numbers read as 0, so a column never mixes numbers and text (the ranking
+# and the sorts compare them)
+@lru_cache(maxsize=4096)
+def _to_int(value):
+    try:
+        return int(float(value)) if value not in ("", None) else 0
+    except (TypeError, ValueError, OverflowError):
+        return 0
+
+
+@lru_cache(maxsize=4096)
+def _to_float(value):
+    try:
+        return float(value) if value not in ("", None) else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+@lru_cache(maxsize=64)
+def _to_bool(value):
+    return str(value).strip().lower() == "true"
+
+
+def _to_str(value):
+    return "" if value is None else str(value)
+
+
+CONVERTERS = {"id": _to_id, "int": _to_int, "float": _to_float, "bool": _to_bool, "str": _to_str}
+
+
+def _format_value(value):
+    """Inverse of the converters: the text form written to the CSV files."""
+    return "" if value is None else str(value)
+
+
+class Record:
+    """Base class: subclasses set FIELDS (column order) and TYPES (field -> converter name)."""
+
+    __slots__ = ()
+    FIELDS = ()
+    TYPES = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._CONVERTERS = tuple((field, CONVERTERS[cls.TYPES.get(field, "str")]) for field in cls.FIELDS)
+
+    def __init__(self, **values):
+        for field, convert in self._CONVERTERS:
+            setattr(self, field, convert(values.get(field, "")))
+
+    @classmethod
+    def from_row(cls, row):
+        """Parses a string row (as read from CSV or SQLite) into a typed record."""
+        record = cls.__new__(cls)
+        for field, convert in cls._CONVERTERS:
+            setattr(record, field, convert(row.get(field, "")))
+        return record
+
+    def get(self, field, default=None):
+        return getattr(self, field, default) if field in self.FIELDS else default
+
+    def __getitem__(self, field):
+        if field not in self.FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def keys(self):
+        return self.FIELDS
+
+    def to_row(self):
+        """Plain string dict, exactly as stored in the data files."""
+        return {field: _format_value(getattr(self, field)) for field in self.FIELDS}
+
+    def to_dict(self):
+        """Typed dict of all fields."""
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class CitizenRecord(Record):
+    __slots__ = (
+        "id", "national_id", "full_name", "date_of_birth", "phone_number",
+        "address", "household_members", "dependents", "needs_description",
+        "priority_score", "is_active", "registration_date", "secret_code_hash"
+    )
+    FIELDS = __slots__
+    TYPES = {"id": "id", "household_members": "int", "dependents": "int",
+             "priority_score": "float", "is_active": "bool"}
+
+    def to_public(self):
+        """Typed dict without the secret code hash, as returned by the public citizen functions."""
+        citizen = self.to_dict()
+        citizen.pop("secret_code_hash", None)
+        return citizen
+
+
+class AdminRecord(Record):
+    __slots__ = ("id", "username", "password_hash", "full_name", "organization_id", "role")
+    FIELDS = __slots__
+    TYPES = {"id": "id"}
+
+
+class AidEntryRecord(Record):
+    __slots__ = ("id", "citizen_internal_id", "entry_type", "date", "next_date", "timestamp")
+    FIELDS = __slots__
+    TYPES = {"id": "id"}
@@ -0,0 +1,378 @@
+# spreadsheet_import.py - Streaming import of citizen spreadsheets (.xlsx / .csv)
+#
+# Rows are read one at a time (openpyxl in read-only mode when installed, otherwise a
+# small zipfile + iterparse reader), mapped onto CITIZENS_FIELDNAMES, validated and
+# type-coerced, then loaded in batches through backend_functions.register_citizens_bulk.
+# Dates of birth are normalized per batch by date_normalization, with the column's format
+# detected from the first batch that needs it.
+
+import argparse
+import csv
+import datetime
+import os
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+import backend_functions as be
+from date_normalization import CANONICAL_DATE_RE, detect_format, normalize_column
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Alternative header spellings seen in field office sheets -> CITIZENS_FIELDNAMES
+COLUMN_ALIASES = {
+    "name": "full_name",
+    "fullname": "full_name",
+    "national_id_number": "national_id",
+    "nid": "national_id",
+    "id_number": "national_id",
+    "phone": "phone_number",
+    "mobile": "phone_number",
+    "dob": "date_of_birth",
+    "birth_date": "date_of_birth",
+    "family_members": "household_members",
+    "members": "household_members",
+    "needs": "needs_description",
+    "score": "priority_score",
+    "active": "is_active",
+    "secret": "secret_code",
+    "password": "secret_code",
+}
+
+IMPORTABLE_FIELDS = set(be.CITIZENS_FIELDNAMES) | {"secret_code"}
+
+ERROR_REPORT_FIELDNAMES = ["row_number", "national_id", "full_name", "error"]
+
+_SHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# Built-in Excel number formats that display a date
+_BUILTIN_DATE_FORMATS = set(range(14, 23)) | {45, 46, 47}
+
+
+class SpreadsheetImportError(Exception):
+    """Raised when a spreadsheet cannot be read at all (as opposed to a bad row)."""
+
+
+# ---------------------------- SPREADSHEET READERS ----------------------------
+def _column_index(cell_ref):
+    """'C12' -> 2"""
+    index = 0
+    for char in cell_ref:
+        if not char.isalpha():
+            break
+        index = index * 26 + (ord(char.upper()) - ord("A") + 1)
+    return index - 1
+
+def _excel_serial_to_iso(value):
+    try:
+        serial = float(value)
+    except ValueError:
+        return value
+    return (datetime.datetime(1899, 12, 30) + datetime.timedelta(days=serial)).date().isoformat()
+
+def _first_sheet_path(archive):
+    workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+    sheet = workbook.find(f"{_SHEET_NS}sheets/{_SHEET_NS}sheet")
+    rel_id = sheet.get(f"{_REL_NS}id") if sheet is not None else None
+    if rel_id and "xl/_rels/workbook.xml.rels" in archive.namelist():
+        rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+        for rel in rels.iter(f"{_PKG_REL_NS}Relationship"):
+            if rel.get("Id") == rel_id:
+                target = rel.get("Target").lstrip("/")
+                return target if target.startswith("xl/") else "xl/" + target
+    return "xl/worksheets/sheet1.xml"
+
+def _shared_strings(archive):
+    strings = []
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return strings
+    with archive.open("xl/sharedStrings.xml") as f:
+        for _, elem in ET.iterparse(f):
+            if elem.tag == f"{_SHEET_NS}si":
+                # Plain text or rich-text runs; phonetic hints (rPh) are skipped
+                parts = []
+                for child in elem:
+                    if child.tag == f"{_SHEET_NS}t":
+                        parts.append(child.text or "")
+                    elif child.tag == f"{_SHEET_NS}r":
+                        run_text = child.find(f"{_SHEET_NS}t")
+                        parts.append(run_text.text or "" if run_text is not None else "")
+                strings.append("".join(parts))
+                elem.clear()
+    return strings
+
+def _date_styles(archive):
+    """Returns the set of cell style indexes whose number format is a date."""
+    if "xl/styles.xml" not in archive.namelist():
+        return set()
+    styles = ET.fromstring(archive.read("xl/styles.xml"))
+    custom_date_formats = set()
+    for num_fmt in styles.iter(f"{_SHEET_NS}numFmt"):
+        code = re.sub(r'"[^"]*"|\[[^\]]*\]', "", num_fmt.get("formatCode", "")).lower()
+        if re.search(r"[dy]", code) or ("m" in code and not re.search(r"[hs]", code)):
+            custom_date_formats.add(int(num_fmt.get("numFmtId")))
+    date_styles = set()
+    cell_xfs = styles.find(f"{_SHEET_NS}cellXfs")
+    if cell_xfs is not None:
+        for index, xf in enumerate(cell_xfs.iter(f"{_SHEET_NS}xf")):
+            num_fmt_id = int(xf.get("numFmtId", 0))
+            if num_fmt_id in _BUILTIN_DATE_FORMATS or num_fmt_id in custom_date_formats:
+                date_styles.add(index)
+    return date_styles
+
+def _iter_xlsx_rows_stdlib(path):
+    with zipfile.ZipFile(path) as archive:
+        shared = _shared_strings(archive)
+        date_styles = _date_styles(archive)
+        with archive.open(_first_sheet_path(archive)) as f:
+            row = {}
+            sheet_data = None
+            for event, elem in ET.iterparse(f, events=("start", "end")):
+                if event == "start":
+                    if elem.tag == f"{_SHEET_NS}sheetData":
+                        sheet_data = elem
+                    continue
+                if elem.tag == f"{_SHEET_NS}c":
+                    cell_type = elem.get("t")
+                    value_elem = elem.find(f"{_SHEET_NS}v")
+                    value = value_elem.text if value_elem is not None and value_elem.text else ""
+                    if cell_type == "s" and value:
+                        value = shared[int(value)]
+                    elif cell_type == "inlineStr":
+                        value = "".join(t.text or "" for t in elem.iter(f"{_SHEET_NS}t"))
+                    elif cell_type == "b":
+                        value = "True" if value == "1" else "False"
+                    elif cell_type in (None, "n") and value and int(elem.get("s", 0)) in date_styles:
+                        value = _excel_serial_to_iso(value)
+                    row[_column_index(elem.get("r", "A"))] = value
+                elif elem.tag == f"{_SHEET_NS}row":
+                    width = max(row) + 1 if row else 0
+                    yield [row.get(i, "") for i in range(width)]
+                    row = {}
+                    # Drop parsed rows so memory stays constant however long the sheet is
+                    if sheet_data is not None:
+                        sheet_data.clear()
+
+def _iter_xlsx_rows_openpyxl(path):
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for values in workbook.worksheets[0].iter_rows(values_only=True):
+            row = []
+            for value in values:
+                if value is None:
+                    value = ""
+                elif isinstance(value, datetime.datetime):
+                    value = value.date().isoformat()
+                elif isinstance(value, float) and value.is_integer():
+                    value = str(int(value))
+                row.append(str(value))
+            yield row
+    finally:
+        workbook.close()
+
+def _iter_csv_rows(path):
+    # Same encoding/delimiter detection as the data files (UTF-8, UTF-16, cp1256)
+    encoding, delimiter = be._detect_csv_format(path)
+    with open(path, "r", newline="", encoding=encoding) as f:
+        yield from csv.reader(f, delimiter=delimiter)
+
+def iter_spreadsheet_rows(path):
+    """Yields each row of the first sheet of an .xlsx/.xlsm file or a CSV/TSV file as a list of strings."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".xlsx", ".xlsm"):
+        if openpyxl is not None:
+            return _iter_xlsx_rows_openpyxl(path)
+        return _iter_xlsx_rows_stdlib(path)
+    if extension in (".csv", ".tsv", ".txt"):
+        return _iter_csv_rows(path)
+    raise SpreadsheetImportError(f"Unsupported spreadsheet type: {extension}")
+
+# ---------------------------- MAPPING AND VALIDATION ----------------------------
+def map_columns(header):
+    """Maps header cells to citizen fields. Returns ({column index: field}, [unmapped headers])."""
+    mapping = {}
+    unmapped = []
+    for index, title in enumerate(header):
+        key = re.sub(r"[\s\-]+", "_", str(title).strip().lower())
+        field = COLUMN_ALIASES.get(key, key)
+        if field in IMPORTABLE_FIELDS and field not in mapping.values():
+            mapping[index] = field
+        elif key:
+            unmapped.append(str(title).strip())
+    return mapping, unmapped
+
+def _digits(value):
+    return re.sub(r"[\s\-./]", "", value)
+
+def _parse_int(value, field):
+    try:
+        return int(float(value)) if value else 0
+    except ValueError:
+        raise ValueError(f"Invalid {field}: {value!r}")
+
+def coerce_citizen_row(raw):
+    """Validates and type-coerces one mapped row. Returns citizen_data for register_citizens_bulk.
+
+    Raises ValueError with a readable message when the row must be rejected.
+    """
+    raw = {field: str(value).strip() for field, value in raw.items()}
+
+    national_id = _digits(raw.get("national_id", ""))
+    if not national_id.isdigit() or len(national_id) != 9:
+        raise ValueError(f"Invalid national_id: {raw.get('national_id', '')!r}")
+    full_name = " ".join(raw.get("full_name", "").split())
+    if not full_name:
+        raise ValueError("Missing full_name")
+
+    phone = _digits(raw.get("phone_number", ""))
+    if len(phone) == 9 and phone.isdigit():
+        phone = "0" + phone  # leading zero dropped by Excel
+    if phone and (not phone.isdigit() or len(phone) != 10):
+        raise ValueError(f"Invalid phone_number: {raw.get('phone_number', '')!r}")
+
+    household_members = _parse_int(raw.get("household_members", ""), "household_members")
+    dependents = _parse_int(raw.get("dependents", ""), "dependents")
+    if household_members < 0 or dependents < 0:
+        raise ValueError("household_members and dependents must not be negative")
+    try:
+        priority_score = float(raw.get("priority_score") or 0.0)
+    except ValueError:
+        raise ValueError(f"Invalid priority_score: {raw.get('priority_score')!r}")
+
+    is_active = raw.get("is_active", "").lower() not in ("false", "no", "0", "inactive")
+
+    citizen_data = {
+        "id": raw.get("id", ""),
+        "national_id": national_id,
+        "full_name": full_name,
+        "date_of_birth": raw.get("date_of_birth", ""),  # normalized with its column in import_citizens
+        "phone_number": phone,
+        "address": " ".join(raw.get("address", "").split()),
+        "household_members": household_members,
+        "dependents": dependents,
+        "needs_description": raw.get("needs_description", ""),
+        "priority_score": priority_score,
+        "is_active": is_active,
+        "registration_date": raw.get("registration_date", ""),
+    }
+    if raw.get("secret_code"):
+        citizen_data["secret_code"] = raw["secret_code"]
+    else:
+        # No secret code in the sheet: import the record with login disabled
+        citizen_data["secret_code_hash"] = raw.get("secret_code_hash", "")
+    return citizen_data
+
+# ---------------------------- IMPORT PIPELINE ----------------------------
+def import_citizens(path, keep_ids=False, batch_size=DEFAULT_BATCH_SIZE, progress=None, error_report_path=None):
+    """Streams a spreadsheet into the citizens table.
+
+    progress(rows_read, imported, rejected) is called after every batch. Rejected rows
+    are written to error_report_path (default: <path>.errors.csv) when there are any.
+    Returns a summary dict.
+    """
+    rows = iter_spreadsheet_rows(path)
+    header = next(rows, None)
+    if header is None:
+        raise SpreadsheetImportError(f"{path} is empty")
+    mapping, unmapped = map_columns(header)
+    missing = [field for field in ("national_id", "full_name") if field not in mapping.values()]
+    if missing:
+        raise SpreadsheetImportError(f"Required columns not found: {', '.join(missing)}")
+
+    if error_report_path is None:
+        error_report_path = os.path.splitext(path)[0] + ".errors.csv"
+    summary = {"rows_read": 0, "imported": 0, "rejected": 0,
+               "unmapped_columns": unmapped, "error_report": None}
+    errors = []
+    batch = []
+    date_format = None
+
+    def report(row_number, raw, error):
+        errors.append({"row_number": row_number, "national_id": raw.get("national_id", ""),
+                       "full_name": raw.get("full_name", ""), "error": error})
+        summary["rejected"] += 1
+
+    def normalize_dates():
+        nonlocal date_format
+        births = [citizen["date_of_birth"] for _, _, citizen in batch]
+        date_format = date_format or detect_format(births)
+        valid = []
+        for (row_number, raw, citizen), birth in zip(batch, normalize_column(births, fmt=date_format)):
+            if birth and not CANONICAL_DATE_RE.match(birth):
+                report(row_number, raw, f"Invalid date_of_birth: {raw.get('date_of_birth', '')!r}")
+                continue
+            citizen["date_of_birth"] = birth
+            valid.append((row_number, raw, citizen))
+        batch[:] = valid
+
+    def flush():
+        normalize_dates()
+        if not batch:
+            return
+        results = be.register_citizens_bulk([citizen for _, _, citizen in batch], keep_ids=keep_ids)
+        for (row_number, raw, _), result in zip(batch, results):
+            if result["success"]:
+                summary["imported"] += 1
+            else:
+                report(row_number, raw, result["error"])
+        batch.clear()
+        if errors:
+            _write_error_report(error_report_path, errors, append=summary["error_report"] is not None)
+            summary["error_report"] = error_report_path
+            errors.clear()
+        if progress is not None:
+            progress(summary["rows_read"], summary["imported"], summary["rejected"])
+
+    for row_number, cells in enumerate(rows, start=2):
+        if not any(str(cell).strip() for cell in cells):
+            continue
+        summary["rows_read"] += 1
+        raw = {field: cells[index] if index < len(cells) else "" for index, field in mapping.items()}
+        try:
+            batch.append((row_number, raw, coerce_citizen_row(raw)))
+        except ValueError as e:
+            report(row_number, raw, str(e))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    if errors:
+        _write_error_report(error_report_path, errors, append=summary["error_report"] is not None)
+        summary["error_report"] = error_report_path
+    return summary
+
+def _write_error_report(path, errors, append):
+    with open(path, "a" if append else "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=ERROR_REPORT_FIELDNAMES)
+        if not append:
+            writer.writeheader()
+        writer.writerows(errors)
+
+# ---------------------------- MAIN ----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Import citizens from an .xlsx or .csv spreadsheet.")
+    parser.add_argument("path", nargs="?", default=os.path.join(be.BASE_DIR, "citizens_data.xlsx"))
+    parser.add_argument("--keep-ids", action="store_true",
+                        help="keep the sheet's id column (needed when aid history already refers to it)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    be.setup_csv_files()
+    summary = import_citizens(
+        args.path, keep_ids=args.keep_ids, batch_size=args.batch_size,
+        progress=lambda read, imported, rejected: print(f"... {read} rows read, {imported} imported, {rejected} rejected")
+    )
+    print(f"✓ Imported {summary['imported']} of {summary['rows_read']} rows.")
+    if summary["unmapped_columns"]:
+        print(f"Ignored columns: {', '.join(summary['unmapped_columns'])}")
+    if summary["error_report"]:
+        print(f"✗ {summary['rejected']} rows rejected, see {summary['error_report']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# sqlite_storage.py - Optional SQLite storage backend for backend_functions
+#
+# Tables mirror the CSV files column for column and rows come back as dicts of
+# strings, exactly like read_csv_dict, so backend_functions can swap storage
+# without changing what its public functions return.
+
+import os
+import sqlite3
+import threading
+
+TABLE_COLUMNS = {
+    "citizens": [
+        "id", "national_id", "full_name", "date_of_birth", "phone_number",
+        "address", "household_members", "dependents", "needs_description",
+        "priority_score", "is_active", "registration_date", "secret_code_hash"
+    ],
+    "admins": [
+        "id", "username", "password_hash", "full_name", "organization_id", "role"
+    ],
+    "aid_history": [
+        "id", "citizen_internal_id", "entry_type", "date", "next_date", "timestamp"
+    ],
+    "messages": [
+        "id", "citizen_internal_id", "message", "timestamp"
+    ],
+}
+
+# Every lookup column used by backend_functions gets an index on each table that has it
+INDEXED_COLUMNS = ["national_id", "citizen_internal_id", "username", "next_date"]
+
+
+def _row_to_dict(cursor, row):
+    return {column[0]: ("" if value is None else str(value))
+            for column, value in zip(cursor.description, row)}
+
+
+class SQLiteStorage:
+    """Row storage for the four system tables in a single SQLite database file."""
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._local = threading.local()
+        self.create_schema()
+
+    def connection(self):
+        """Returns this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_file, timeout=30)
+            conn.row_factory = _row_to_dict
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def create_schema(self):
+        conn = self.connection()
+        with conn:
+            for table, columns in TABLE_COLUMNS.items():
+                column_defs = ", ".join(
+                    "id INTEGER PRIMARY KEY" if column == "id" else f"{column} TEXT NOT NULL DEFAULT ''"
+                    for column in columns
+                )
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({column_defs})")
+                for column in INDEXED_COLUMNS:
+                    if column in columns:
+                        unique = "UNIQUE " if (table, column) == ("admins", "username") else ""
+                        conn.execute(f"CREATE {unique}INDEX IF NOT EXISTS idx_{table}_{column} "
+                                     f"ON {table} ({column})")
+
+    def _check_column(self, table, column):
+        if column not in TABLE_COLUMNS[table]:
+            raise ValueError(f"Unknown column {column!r} for table {table!r}")
+
+    def iter_rows(self, table):
+        """Yields every row of a table in id order."""
+        yield from self.connection().execute(f"SELECT * FROM {table} ORDER BY id")
+
+    def find_rows(self, table, column, value):
+        self._check_column(table, column)
+        return self.connection().execute(
+            f"SELECT * FROM {table} WHERE {column} = ? ORDER BY id", (str(value),)
+        ).fetchall()
+
+    def find_row(self, table, column, value):
+        self._check_column(table, column)
+        return self.connection().execute(
+            f"SELECT * FROM {table} WHERE {column} = ? ORDER BY id LIMIT 1", (str(value),)
+        ).fetchone()
+
+    def insert_rows(self, table, rows):
+        """Inserts rows in a single transaction. Returns True on success."""
+        columns = TABLE_COLUMNS[table]
+        placeholders = ", ".join("?" for _ in columns)
+        conn = self.connection()
+        try:
+            with conn:
+                conn.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                    ([row.get(column, "") for column in columns] for row in rows)
+                )
+            return True
+        except sqlite3.Error as e:
+            print(f"Error inserting into {table}: {e}")
+            return False
+
+    def insert_row(self, table, row):
+        return self.insert_rows(table, [row])
+
+    def update_row(self, table, row_id, changes):
+        """Updates the given columns of one row. Returns True if the row exists."""
+        changes = {column: value for column, value in changes.items()
+                   if column in TABLE_COLUMNS[table] and column != "id"}
+        if not changes:
+            return self.find_row(table, "id", row_id) is not None
+        assignments = ", ".join(f"{column} = ?" for column in changes)
+        conn = self.connection()
+        try:
+            with conn:
+                cursor = conn.execute(f"UPDATE {table} SET {assignments} WHERE id = ?",
+                                      [str(value) for value in changes.values()] + [int(row_id)])
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            print(f"Error updating {table}: {e}")
+            return False
+
+    def page_rows(self, table, after_id, limit, column=None, value=None):
+        """Up to limit rows with id > after_id in id order, optionally where column = value."""
+        where, params = "id > ?", [int(after_id)]
+        if column is not None:
+            self._check_column(table, column)
+            where += f" AND {column} = ?"
+            params.append(str(value))
+        return self.connection().execute(
+            f"SELECT * FROM {table} WHERE {where} ORDER BY id LIMIT ?", params + [int(limit)]
+        ).fetchall()
+
+    def latest_rows(self, table, column, value, limit):
+        """The last `limit` rows where column = value, newest (highest id) first."""
+        self._check_column(table, column)
+        return self.connection().execute(
+            f"SELECT * FROM {table} WHERE {column} = ? ORDER BY id DESC LIMIT ?", (str(value), int(limit))
+        ).fetchall()
+
+    def max_id(self, table):
+        row = self.connection().execute(f"SELECT MAX(id) AS max_id FROM {table}").fetchone()
+        return int(row["max_id"] or 0)
+
+    def column_values(self, table, column):
+        """Returns one column of every row, in id order."""
+        self._check_column(table, column)
+        rows = self.connection().execute(f"SELECT {column} FROM {table} ORDER BY id")
+        return [row[column] for row in rows]
+
+    def received_citizen_ids(self):
+        """Ids of citizens with at least one aid entry that has no next_date."""
+        rows = self.connection().execute(
+            "SELECT DISTINCT citizen_internal_id FROM aid_history WHERE next_date = ''"
+        )
+        return {row["citizen_internal_id"] for row in rows}
+
+    def open_schedule(self, start=None, end=None, limit=None):
+        """Latest aid entry of each citizen whose next_date is set and between start and end
+        (inclusive), earliest next_date first."""
+        rows = self.connection().execute(
+            "SELECT * FROM aid_history a WHERE a.next_date != '' AND a.next_date >= ? AND a.next_date <= ? "
+            "AND a.id = (SELECT MAX(b.id) FROM aid_history b WHERE b.citizen_internal_id = a.citizen_internal_id) "
+            "ORDER BY a.next_date, a.citizen_internal_id LIMIT ?",
+            (start or "", end or "9999-12-31", -1 if limit is None else int(limit))
+        )
+        return rows.fetchall()
+
+    def clear(self, table):
+        conn = self.connection()
+        with conn:
+            conn.execute(f"DELETE FROM {table}")
@@ -14,6 +14,7 @@ def test_backend_functions():
     print("\n1. Testing CSV file setup...")
     try:
         be.setup_csv_files()
+        initial_stats = be.get_statistics()  # loaded now, so later writes update it incrementally
         print("✓ CSV files setup successful")
     except Exception as e:
         print(f"✗ CSV files setup failed: {e}")
@@ -99,6 +100,19 @@ def test_backend_functions():
             print("✗ Duplicate citizen registration was incorrectly allowed")
             return False
             
+        # Test bulk registration (one new row, one duplicate, one missing fields)
+        bulk_results = be.register_citizens_bulk([
+            {"national_id": "999888666", "full_name": "Bulk Citizen", "secret_code": "bulk1234"},
+            {"national_id": "999888777", "full_name": "Duplicate Citizen", "secret_code": "dup12345"},
+            {"national_id": "999888555", "full_name": "No Secret"}
+        ])
+        if ([r["success"] for r in bulk_results] == [True, False, False]
+                and be.verify_citizen_login_csv("999888666", "bulk1234")):
+            print(f"✓ Bulk citizen registration successful (ID: {bulk_results[0]['id']})")
+        else:
+            print(f"✗ Bulk citizen registration failed: {bulk_results}")
+            return False
+            
     except Exception as e:
         print(f"✗ Citizen testing failed: {e}")
         return False
@@ -134,6 +148,37 @@ def test_backend_functions():
         else:
             print("✗ Citizen aid status check failed")
             return False
+
+        # A scheduled entry shows up as due; a later entry supersedes it
+        be.save_aid_history_entry(citizen_id, "TestAid", "2024-03-16", "2099-01-02")
+        due = be.get_aid_due_between("2099-01-01", "2099-01-31")
+        be.save_aid_history_entry(citizen_id, "TestAid", "2024-03-17", "")
+        if ([e.get("citizen_internal_id") for e in due] == [str(citizen_id)]
+                and not be.get_aid_due_between("2099-01-01", "2099-01-31")):
+            print("✓ Aid schedule index successful")
+        else:
+            print(f"✗ Aid schedule index failed: {due}")
+            return False
+
+        # Bulk received status map
+        status_map = be.get_received_status_map()
+        if status_map.get(str(citizen_id)) is True:
+            print("✓ Received status map successful")
+        else:
+            print("✗ Received status map failed")
+            return False
+
+        # An entry another process appended just before our own write is not lost
+        outside_id = str(be.reserve_ids(be.AID_HISTORY_CSV_FILE, 1)[0])
+        be.append_csv_dict(be.AID_HISTORY_CSV_FILE, {"id": outside_id, "citizen_internal_id": citizen_id,
+                                                     "entry_type": "TestAid", "date": "2024-03-18"},
+                           be.AID_HISTORY_FIELDNAMES)
+        be.save_aid_history_entry(citizen_id, "TestAid", "2024-03-18", "")
+        if outside_id in [entry.get("id") for entry in be.read_aid_history(citizen_id)]:
+            print("✓ Aid entry written by another process is indexed")
+        else:
+            print("✗ Aid entry written by another process was lost")
+            return False
             
     except Exception as e:
         print(f"✗ Aid history testing failed: {e}")
@@ -160,6 +205,49 @@ def test_backend_functions():
         else:
             print("✗ Messages read failed")
             return False
+
+        # Inbox returns the latest messages first
+        be.save_message_entry(citizen_id, "Newer test message")
+        inbox = be.get_inbox(citizen_id, 2)
+        if [m.get("message") for m in inbox] == ["Newer test message", "Test message for citizen"]:
+            print("✓ Inbox returned newest messages first")
+        else:
+            print(f"✗ Inbox failed: {inbox}")
+            return False
+
+        # Cursor pagination reads the same messages page by page
+        paged, cursor = be.page_messages(limit=2)
+        while cursor:
+            page, cursor = be.page_messages(cursor, 2)
+            paged.extend(page)
+        citizen_paged, cursor = be.page_messages(limit=1, citizen_internal_id=citizen_id)
+        while cursor:
+            page, cursor = be.page_messages(cursor, 1, citizen_internal_id=citizen_id)
+            citizen_paged.extend(page)
+        if paged == be.read_messages() and len(citizen_paged) == 2 and citizen_paged == be.read_messages(citizen_id):
+            print(f"✓ Messages paged successfully ({len(paged)} messages, {len(citizen_paged)} for one citizen)")
+        else:
+            print("✗ Message pagination failed")
+            return False
+
+        # Reserve a block of ids for bulk inserts
+        block = be.reserve_ids(be.MESSAGES_CSV_FILE, 5)
+        next_id = be.get_next_id_for_table(be.MESSAGES_CSV_FILE, be.MESSAGES_FIELDNAMES)
+        if len(block) == 5 and next_id == block[-1] + 1:
+            print(f"✓ Id block reserved successfully ({block[0]}-{block[-1]})")
+        else:
+            print("✗ Id block reservation failed")
+            return False
+
+        # Statistics kept up to date by the writes above match a full recount
+        import aid_statistics
+        stats = be.get_statistics()
+        recount = aid_statistics.compute_statistics(be.iter_citizens(), be.read_aid_history(), be.read_messages())
+        if stats == recount and stats["aid_operations"] == initial_stats["aid_operations"] + 5:
+            print(f"✓ Incremental statistics match a full recount ({stats['total_citizens']} citizens)")
+        else:
+            print(f"✗ Incremental statistics mismatch: {stats} != {recount}")
+            return False
             
     except Exception as e:
         print(f"✗ Message testing failed: {e}")
@@ -176,6 +264,26 @@ def test_backend_functions():
             print("✗ Citizens list retrieval failed")
             return False
             
+        # Query with pushed-down filters, projection, sort and limit
+        queried = be.query_citizens(filters={"received": True}, columns=["id", "received"],
+                                    sort=["-priority_score", "id"], limit=1)
+        received_list = be.get_citizens_list_csv(filter_type="received")
+        if (len(queried) == 1 and queried[0]["received"] is True and set(queried[0]) == {"id", "received"}
+                and str(citizen_id) in {c.get("id") for c in received_list}):
+            print("✓ Citizen query with filters, projection and limit successful")
+        else:
+            print(f"✗ Citizen query failed: {queried}")
+            return False
+
+        # Ranked citizens paged with a cursor match the top-k query
+        first_page, cursor = be.page_citizens(limit=1, sort="rank")
+        second_page, _ = be.page_citizens(cursor, 1, sort="rank")
+        if [c["id"] for c in first_page + second_page] == [c["id"] for c in be.top_k_citizens(2)]:
+            print("✓ Citizens paged by rank successfully")
+        else:
+            print("✗ Citizen pagination failed")
+            return False
+
         # Get citizen details
         details = be.get_citizen_details_csv(citizen_id)
         if details:
@@ -183,6 +291,94 @@ def test_backend_functions():
         else:
             print("✗ Citizen details retrieval failed")
             return False
+
+        # Get citizen by national ID
+        by_national_id = be.get_citizen_by_national_id_csv("999888777")
+        if by_national_id and str(by_national_id.get("id")) == str(citizen_id):
+            print("✓ Citizen lookup by national ID successful")
+        else:
+            print("✗ Citizen lookup by national ID failed")
+            return False
+
+        # Full-text search by partial name, with Arabic spelling variants unified
+        import text_search
+        found = be.search_citizens("test citiz")
+        if (str(citizen_id) in {str(c["id"]) for c in found}
+                and text_search.tokenize("إبراهيمُ مدرسة") == text_search.tokenize("ابراهيم مدرسه")):
+            print("✓ Citizen full-text search successful")
+        else:
+            print(f"✗ Citizen full-text search failed: {found}")
+            return False
+
+        # Update citizen details (written to the change log)
+        updated = be.update_citizen_details_csv(citizen_id, {"phone_number": "0501111111"})
+        details = be.get_citizen_details_csv(citizen_id)
+        if updated and details and details.get("phone_number") == "0501111111":
+            print("✓ Citizen details updated successfully")
+        else:
+            print("✗ Citizen details update failed")
+            return False
+
+        # Ranking is numeric and follows score updates
+        be.update_citizen_details_csv(citizen_id, {"priority_score": 100.0})
+        top = be.top_k_citizens(1)
+        if top and str(top[0]["id"]) == str(citizen_id) and be.get_citizen_rank(citizen_id) == 1:
+            print("✓ Priority ranking updated successfully")
+        else:
+            print("✗ Priority ranking update failed")
+            return False
+
+        # Rows with a blank or non-numeric id are ranked under their own id
+        from priority_ranking import PriorityRanking
+        from records import CitizenRecord
+        malformed = {str(c.id): c for c in map(CitizenRecord.from_row, [
+            {"id": "", "priority_score": "9"}, {"id": "A12", "priority_score": "8"}, {"id": "5", "priority_score": "7"}])}
+        ranking = PriorityRanking()
+        ranking.rebuild(malformed.values())
+        if ranking.ids() == ["", "A12", "5"] and all(citizen_id in malformed for citizen_id in ranking.top_k(3)):
+            print("✓ Malformed citizen ids ranked without breaking the lookup")
+        else:
+            print(f"✗ Malformed citizen ids ranked as {ranking.ids()}")
+            return False
+
+        # Unreadable numbers read as 0, so score and size columns stay comparable
+        garbled = CitizenRecord.from_row({"id": "1", "priority_score": "n/a", "household_members": "many"})
+        if garbled.priority_score == 0.0 and garbled.household_members == 0:
+            print("✓ Unreadable numeric fields read as 0")
+        else:
+            print(f"✗ Unreadable numeric fields kept as text: {garbled.to_dict()}")
+            return False
+
+        # Limited stock goes to the most in need; recent recipients are skipped next time
+        plan = be.plan_aid_allocation({"blankets": 1}, min_days_between=30)
+        recorded = be.record_aid_allocation(plan)
+        next_plan = be.plan_aid_allocation({"blankets": 1}, min_days_between=30)
+        if (recorded and [p["citizen_internal_id"] for p in plan] == [str(citizen_id)]
+                and str(citizen_id) not in {p["citizen_internal_id"] for p in next_plan}):
+            print("✓ Aid allocation planned and recorded successfully")
+        else:
+            print(f"✗ Aid allocation failed: {plan} / {next_plan}")
+            return False
+
+        # The same person registered again under a mistyped national ID is clustered
+        retyped = be.register_citizen_csv({**citizen_data, "national_id": "999888778",
+                                           "phone_number": "+970 50 999 9999", "priority_score": 0})
+        clusters = be.find_duplicate_citizens()
+        if retyped and any({str(citizen_id), str(retyped["id"])} <= set(c["citizen_ids"]) for c in clusters):
+            print("✓ Duplicate registrations detected successfully")
+        else:
+            print(f"✗ Duplicate detection failed: {clusters}")
+            return False
+
+        # Fold the change log back into the citizens file
+        compacted = be.compact_citizen_changes()
+        base_row = next((c for c in be.read_csv_dict(be.CITIZENS_CSV_FILE, be.CITIZENS_FIELDNAMES)
+                         if c.get("id") == str(citizen_id)), None)
+        if compacted and not os.path.exists(be.CITIZEN_CHANGES_CSV_FILE) and base_row and base_row.get("phone_number") == "0501111111":
+            print("✓ Citizen change log compacted successfully")
+        else:
+            print("✗ Citizen change log compaction failed")
+            return False
             
     except Exception as e:
         print(f"✗ Citizens list testing failed: {e}")
@@ -216,7 +412,7 @@ def test_data_integrity():
                 return False
         
         # Check data consistency
-        citizens = list(be.read_csv_dict(be.CITIZENS_CSV_FILE, be.CITIZENS_FIELDNAMES))
+        citizens = list(be.iter_citizens())
         admins = list(be.read_csv_dict(be.ADMINS_CSV_FILE, be.ADMINS_FIELDNAMES))
         aid_history = list(be.read_csv_dict(be.AID_HISTORY_CSV_FILE, be.AID_HISTORY_FIELDNAMES))
         messages = list(be.read_csv_dict(be.MESSAGES_CSV_FILE, be.MESSAGES_FIELDNAMES))
@@ -253,6 +449,336 @@ def test_data_integrity():
         print(f"✗ Data integrity testing failed: {e}")
         return False
 
+def test_sqlite_backend():
+    """Test the SQLite storage backend, including migration from the CSV files."""
+    print("\n" + "="*60)
+    print("TESTING SQLITE BACKEND")
+    print("="*60)
+
+    import tempfile
+    db_file = os.path.join(tempfile.mkdtemp(), "citizen_aid_test.db")
+    try:
+        copied = be.migrate_csv_to_sqlite(db_file)
+        if copied.get("admins", 0) > 0:
+            print(f"✓ CSV data migrated to SQLite ({copied})")
+        else:
+            print("✗ CSV migration to SQLite failed")
+            return False
+
+        be.configure_storage("sqlite", db_file)
+        be.setup_csv_files()
+
+        citizen_data = {
+            "national_id": "111222333",
+            "full_name": "SQLite Citizen",
+            "phone_number": "0501112223",
+            "secret_code": "sqlite123",
+            "priority_score": 4.0
+        }
+        registered_record = be.register_citizen_csv(citizen_data)
+        if not registered_record or not be.verify_citizen_login_csv("111222333", "sqlite123"):
+            print("✗ SQLite citizen registration/login failed")
+            return False
+        citizen_id = registered_record.get("id")
+        print(f"✓ SQLite citizen registration and login successful (ID: {citizen_id})")
+
+        be.update_citizen_details_csv(citizen_id, {"full_name": "SQLite Citizen Updated"})
+        details = be.get_citizen_details_csv(citizen_id)
+        if details and details.get("full_name") == "SQLite Citizen Updated":
+            print("✓ SQLite citizen update successful")
+        else:
+            print("✗ SQLite citizen update failed")
+            return False
+
+        be.save_aid_history_entry(citizen_id, "TestAid", "2024-03-15", "")
+        be.save_message_entry(citizen_id, "SQLite message")
+        if (be.check_citizen_received_aid(citizen_id) and be.get_received_status_map().get(str(citizen_id))
+                and len(be.read_messages(citizen_id)) == 1):
+            print("✓ SQLite aid history and messages successful")
+        else:
+            print("✗ SQLite aid history or messages failed")
+            return False
+    except Exception as e:
+        print(f"✗ SQLite backend testing failed: {e}")
+        return False
+    finally:
+        be.configure_storage("csv")
+
+    print("\n" + "="*60)
+    print("SQLITE BACKEND TESTS PASSED!")
+    print("="*60)
+    return True
+
+def test_spreadsheet_import():
+    """Test the streaming spreadsheet importer with a small field office sheet."""
+    print("\n" + "="*60)
+    print("TESTING SPREADSHEET IMPORT")
+    print("="*60)
+
+    import tempfile
+    import spreadsheet_import
+    sheet_path = os.path.join(tempfile.mkdtemp(), "field_office.csv")
+    try:
+        with open(sheet_path, "w", encoding="utf-8") as f:
+            f.write("National ID,Name,Phone,Family Members,Score,Secret,DOB\n")
+            f.write("777 666 555,Imported Citizen,059 111 2222,5,6,import123,27. 04. 1985\n")
+            f.write("777666444,Second Import,0591113333,2,1,import789,05. 03. 1980\n")
+            f.write("12345,Bad National ID,0591112222,3,2,import456,\n")
+            f.write("777666333,Bad Birth Date,0591114444,3,2,import000,someday\n")
+
+        progress_calls = []
+        summary = spreadsheet_import.import_citizens(
+            sheet_path, progress=lambda *counts: progress_calls.append(counts))
+        # The column is day-first, so the ambiguous date is read day-first too
+        second = be.get_citizen_by_national_id_csv("777666444")
+        if (summary["imported"] == 2 and summary["rejected"] == 2 and progress_calls
+                and os.path.exists(summary["error_report"])
+                and be.verify_citizen_login_csv("777666555", "import123")
+                and second and second["date_of_birth"] == "1980-03-05"):
+            print(f"✓ Spreadsheet imported ({summary['imported']} imported, {summary['rejected']} rejected)")
+        else:
+            print(f"✗ Spreadsheet import failed: {summary}")
+            return False
+
+        # Office exports saved as Arabic Windows or UTF-16 text are read like the data files
+        rows = [["National ID", "Name"], ["777666222", "محمد أحمد"]]
+        for encoding, delimiter in (("cp1256", ","), ("utf-16", "\t")):
+            export_path = os.path.join(tempfile.mkdtemp(), "export.csv")
+            with open(export_path, "w", encoding=encoding, newline="") as f:
+                f.write("\r\n".join(delimiter.join(row) for row in rows) + "\r\n")
+            if list(spreadsheet_import.iter_spreadsheet_rows(export_path)) != rows:
+                print(f"✗ {encoding} CSV export misread")
+                return False
+        print("✓ cp1256 and UTF-16 CSV exports read")
+    except Exception as e:
+        print(f"✗ Spreadsheet import testing failed: {e}")
+        return False
+
+    print("\n" + "="*60)
+    print("SPREADSHEET IMPORT TESTS PASSED!")
+    print("="*60)
+    return True
+
+def test_csv_formats():
+    """Test reading, appending to and normalizing legacy (BOM, tab-delimited, mixed date) data files."""
+    print("\n" + "="*60)
+    print("TESTING CSV FORMAT HANDLING")
+    print("="*60)
+
+    import tempfile
+    legacy_path = os.path.join(tempfile.mkdtemp(), "legacy_messages.csv")
+    try:
+        with open(legacy_path, "w", encoding="utf-8-sig", newline="") as f:
+            f.write("id\tcitizen_internal_id \tmessage\ttimestamp\r\n")
+            f.write("1\t5\tرسالة قديمة\t03. 24. 2025  4:28:00 PM\r\n")
+
+        rows = list(be.read_csv_dict(legacy_path, be.MESSAGES_FIELDNAMES))
+        if be._detect_csv_format(legacy_path) == ("utf-8-sig", "\t") and rows[0]["citizen_internal_id"] == "5":
+            print("✓ BOM and tab-delimited file read successfully")
+        else:
+            print(f"✗ Legacy file read failed: {rows}")
+            return False
+
+        be.append_csv_dict(legacy_path, {"id": "2", "citizen_internal_id": "6", "message": "new",
+                                         "timestamp": "2025-03-25 10:00:00"}, be.MESSAGES_FIELDNAMES)
+        header, cached_rows = be._read_cache.rows(legacy_path)
+        if len(cached_rows) == 2 and be._read_cache.rows(legacy_path)[1] is cached_rows:
+            print("✓ Read cache updated in place by append")
+        else:
+            print("✗ Read cache was not updated by append")
+            return False
+
+        be.overwrite_csv_dict(legacy_path, list(be.read_csv_dict(legacy_path, be.MESSAGES_FIELDNAMES)),
+                              be.MESSAGES_FIELDNAMES)
+        rows = list(be.read_csv_dict(legacy_path, be.MESSAGES_FIELDNAMES))
+        if len(rows) == 2 and be._detect_csv_format(legacy_path) == be.CANONICAL_CSV_FORMAT:
+            print("✓ Legacy file appended and rewritten as canonical CSV")
+        else:
+            print(f"✗ Legacy file append/rewrite failed: {rows}")
+            return False
+
+        import date_normalization
+        dates = date_normalization.normalize_column(["27. 04. 2025", "2. 03. 2025", "2025-05-01"])
+        timestamps = date_normalization.normalize_column(
+            ["04. 27. 2025  12:00:00 AM", "03. 24. 2025  4:28:00 PM"], kind="timestamp")
+        if (dates == ["2025-04-27", "2025-03-02", "2025-05-01"]
+                and timestamps == ["2025-04-27T00:00:00", "2025-03-24T16:28:00"]):
+            print("✓ Mixed date formats normalized")
+        else:
+            print(f"✗ Date normalization failed: {dates} {timestamps}")
+            return False
+
+        # A single typed value is only converted when it can be read one way
+        single = [date_normalization.to_iso_date(value) for value in ("27. 04. 2025", "05. 03. 2025", "2025-05-01")]
+        if single == ["2025-04-27", "05. 03. 2025", "2025-05-01"]:
+            print("✓ Ambiguous single dates kept as entered")
+        else:
+            print(f"✗ Single date normalization failed: {single}")
+            return False
+
+        # Normalize copies of the shipped data files, in a backend process pointed at them
+        import shutil
+        import subprocess
+        data_dir = tempfile.mkdtemp()
+        for path in be.DATA_FILES:
+            if os.path.exists(path):
+                shutil.copy(path, data_dir)
+        subprocess.run([sys.executable, os.path.join(be.BASE_DIR, "backend_functions.py"), "normalize"],
+                       env=dict(os.environ, CITIZEN_AID_DATA_DIR=data_dir, CITIZEN_AID_STORAGE="csv"),
+                       check=True, stdout=subprocess.DEVNULL)
+        copies = [os.path.join(data_dir, os.path.basename(path)) for path in be.DATA_FILES]
+        history = be.read_csv_dict(os.path.join(data_dir, os.path.basename(be.AID_HISTORY_CSV_FILE)),
+                                   be.AID_HISTORY_FIELDNAMES)
+        if (all(be._detect_csv_format(path) == be.CANONICAL_CSV_FORMAT for path in copies if os.path.exists(path))
+                and all(date_normalization.date_key(entry["date"]) for entry in history if entry["date"])):
+            print("✓ Data files normalized")
+        else:
+            print("✗ Data file normalization failed")
+            return False
+    except Exception as e:
+        print(f"✗ CSV format testing failed: {e}")
+        return False
+
+    print("\n" + "="*60)
+    print("CSV FORMAT TESTS PASSED!")
+    print("="*60)
+    return True
+
+def test_http_service():
+    """Test the HTTP/JSON service through its client, RemoteBackend."""
+    print("\n" + "="*60)
+    print("TESTING HTTP SERVICE")
+    print("="*60)
+
+    import threading
+    import aid_service
+    server = aid_service.create_server(port=0, workers=4)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        remote = aid_service.RemoteBackend("http://%s:%d" % server.server_address)
+        registered = remote.register_citizen_csv({"national_id": "555444333", "full_name": "Service Citizen",
+                                                  "secret_code": "service123", "priority_score": 2})
+        logged_in = remote.verify_citizen_login_csv("555444333", "service123")
+        saved = remote.save_aid_history_entry(registered["id"], "food", "2025-05-01")
+        history = remote.read_aid_history(registered["id"])
+        if (logged_in and str(logged_in["id"]) == str(registered["id"]) and saved
+                and [entry["entry_type"] for entry in history] == ["food"]
+                and remote.get_statistics()["total_citizens"] == be.get_statistics()["total_citizens"]):
+            print("✓ Service registration, login, aid recording and statistics successful")
+        else:
+            print(f"✗ Service calls failed: {registered} / {history}")
+            return False
+
+        # The admin dashboard's citizen query, with a filter, gives the same rows remotely
+        query = {"filters": [{"received": True}], "sort": ["id"],
+                 "columns": ["id", "national_id", "full_name", "phone_number", "priority_score", "received"]}
+        remote_rows = remote.query_citizens(**query)
+        if remote_rows and remote_rows == be.query_citizens(**query):
+            print(f"✓ Service citizen query with filters successful ({len(remote_rows)} citizens)")
+        else:
+            print(f"✗ Service citizen query failed: {remote_rows}")
+            return False
+        try:
+            remote.query_citizens(filters=[lambda citizen: True])
+            print("✗ Client sent a filter the service cannot receive")
+            return False
+        except TypeError:
+            print("✓ Client refuses filters that cannot be sent to the service")
+
+        try:
+            remote.call("overwrite_csv_dict", be.CITIZENS_CSV_FILE, [], [])
+            print("✗ Service accepted a function it does not expose")
+            return False
+        except aid_service.ServiceError as e:
+            if e.status != 404:
+                print(f"✗ Service rejected an unexposed function with status {e.status}")
+                return False
+        print("✓ Service only exposes the listed functions")
+    except Exception as e:
+        print(f"✗ HTTP service testing failed: {e}")
+        return False
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print("\n" + "="*60)
+    print("HTTP SERVICE TESTS PASSED!")
+    print("="*60)
+    return True
+
+def test_synthetic_data():
+    """Test that the synthetic data generator is seeded and independent of the number of workers."""
+    print("\n" + "="*60)
+    print("TESTING SYNTHETIC DATA GENERATION")
+    print("="*60)
+
+    import filecmp
+    import tempfile
+    import create_initial_data
+    serial_dir, parallel_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+    try:
+        counts = create_initial_data.generate_synthetic_data(serial_dir, 500, seed=7, chunk_size=200)
+        # Leftovers of an earlier data set must not be replayed over the new one
+        changes_file = os.path.join(parallel_dir, "citizens_changes.csv")
+        with open(changes_file, "w", encoding="utf-8") as f:
+            f.write("citizen_id,field,value,timestamp\n1,full_name,Stale Name,\n")
+        os.mkdir(os.path.join(parallel_dir, ".parts_stale"))
+        create_initial_data.generate_synthetic_data(parallel_dir, 500, seed=7, workers=2, chunk_size=200)
+        file_names = ["citizens_data.csv", "aid_history.csv", "messages.csv", "admins_data.csv"]
+        _, mismatched, errors = filecmp.cmpfiles(serial_dir, parallel_dir, file_names, shallow=False)
+        if os.path.exists(changes_file) or os.path.exists(os.path.join(parallel_dir, ".parts_stale")):
+            mismatched.append("stale citizens_changes.csv / .parts_ directory")
+        citizens = list(be.read_csv_dict(os.path.join(serial_dir, "citizens_data.csv"), be.CITIZENS_FIELDNAMES))
+        national_ids = {c["national_id"] for c in citizens}
+        if (not mismatched and not errors and len(citizens) == counts["citizens"] == 500
+                and len(national_ids) == 500 and all(len(n) == 9 and n.isdigit() for n in national_ids)
+                and counts["aid_entries"] > 0 and counts["messages"] > 0):
+            print(f"✓ Synthetic data generated ({counts['citizens']} citizens, {counts['aid_entries']} aid entries, "
+                  f"{counts['messages']} messages), same with 2 workers")
+        else:
+            print(f"✗ Synthetic data generation failed: {counts}, mismatched files {mismatched + errors}")
+            return False
+    except Exception as e:
+        print(f"✗ Synthetic data testing failed: {e}")
+        return False
+
+    print("\n" + "="*60)
+    print("SYNTHETIC DATA TESTS PASSED!")
+    print("="*60)
+    return True
+
+def test_benchmark():
+    """Test the benchmark harness on a small generated data set."""
+    print("\n" + "="*60)
+    print("TESTING BENCHMARK HARNESS")
+    print("="*60)
+
+    import json
+    import tempfile
+    import benchmark
+    output = os.path.join(tempfile.mkdtemp(), "benchmark_results.json")
+    try:
+        results = benchmark.run_benchmark(sizes=[300], samples=3, output=output, progress=lambda message: None)
+        with open(output, encoding="utf-8") as f:
+            saved = json.load(f)
+        operations = saved["runs"][0]["operations"]
+        expected = {"verify_citizen_login_csv", "register_citizen_csv", "update_citizen_details_csv",
+                    "get_citizens_list_csv", "read_aid_history", "read_messages", "query_citizens[dashboard]"}
+        if (saved == results and expected <= set(operations)
+                and all(op["samples"] > 0 and op["p50_ms"] <= op["p99_ms"] for op in operations.values())):
+            print(f"✓ Benchmark ran {len(operations)} operations on 300 citizens")
+        else:
+            print(f"✗ Benchmark results incomplete: {sorted(operations)}")
+            return False
+    except Exception as e:
+        print(f"✗ Benchmark testing failed: {e}")
+        return False
+
+    print("\n" + "="*60)
+    print("BENCHMARK TESTS PASSED!")
+    print("="*60)
+    return True
+
 def generate_test_report():
     """Generate a comprehensive test report."""
     print("\n" + "="*60)
@@ -261,23 +787,20 @@ def generate_test_report():
     
     try:
         # Count records in each file
-        citizens = list(be.read_csv_dict(be.CITIZENS_CSV_FILE, be.CITIZENS_FIELDNAMES))
         admins = list(be.read_csv_dict(be.ADMINS_CSV_FILE, be.ADMINS_FIELDNAMES))
-        aid_history = list(be.read_csv_dict(be.AID_HISTORY_CSV_FILE, be.AID_HISTORY_FIELDNAMES))
-        messages = list(be.read_csv_dict(be.MESSAGES_CSV_FILE, be.MESSAGES_FIELDNAMES))
+        stats = be.get_statistics()
         
         # Calculate statistics
-        total_citizens = len(citizens)
-        active_citizens = len([c for c in citizens if c.get("is_active", "True").lower() == "true"])
-        total_aid_records = len(aid_history)
-        received_aid_count = len([r for r in aid_history if r.get("next_date", "").strip() == ""])
-        total_messages = len(messages)
+        total_citizens = stats["total_citizens"]
+        active_citizens = stats["active_citizens"]
+        total_aid_records = stats["aid_operations"]
+        received_aid_count = stats["received_aid"]
+        total_messages = stats["total_messages"]
         
         # Priority score distribution
-        scores = [float(c.get("priority_score", 0)) for c in citizens]
-        avg_score = sum(scores) / len(scores) if scores else 0
-        max_score = max(scores) if scores else 0
-        min_score = min(scores) if scores else 0
+        avg_score = stats["score_average"]
+        max_score = stats["score_max"]
+        min_score = stats["score_min"]
         
         report = f"""
 CITIZEN AID MANAGEMENT SYSTEM - TEST REPORT
@@ -304,8 +827,7 @@ Admin Accounts:
             report += f"- Username: {admin.get('username')}, Role: {admin.get('role')}\n"
         
         report += "\nCitizen Accounts (Top 5 by Priority):\n"
-        sorted_citizens = sorted(citizens, key=lambda x: float(x.get("priority_score", 0)), reverse=True)
-        for citizen in sorted_citizens[:5]:
+        for citizen in be.top_k_citizens(5):
             report += f"- {citizen.get('full_name')} (ID: {citizen.get('national_id')}, Score: {citizen.get('priority_score')})\n"
         
         report += f"\nSYSTEM STATUS: ✓ FULLY OPERATIONAL\n"
@@ -334,6 +856,12 @@ def main():
     # Run all tests
     backend_test_passed = test_backend_functions()
     integrity_test_passed = test_data_integrity()
+    sqlite_test_passed = test_sqlite_backend()
+    import_test_passed = test_spreadsheet_import()
+    format_test_passed = test_csv_formats()
+    service_test_passed = test_http_service()
+    synthetic_test_passed = test_synthetic_data()
+    benchmark_test_passed = test_benchmark()
     report_generated = generate_test_report()
     
     print("\n" + "="*60)
@@ -341,9 +869,17 @@ def main():
     print("="*60)
     print(f"Backend Functions Test: {'PASSED' if backend_test_passed else 'FAILED'}")
     print(f"Data Integrity Test: {'PASSED' if integrity_test_passed else 'FAILED'}")
+    print(f"SQLite Backend Test: {'PASSED' if sqlite_test_passed else 'FAILED'}")
+    print(f"Spreadsheet Import Test: {'PASSED' if import_test_passed else 'FAILED'}")
+    print(f"CSV Format Test: {'PASSED' if format_test_passed else 'FAILED'}")
+    print(f"HTTP Service Test: {'PASSED' if service_test_passed else 'FAILED'}")
+    print(f"Synthetic Data Test: {'PASSED' if synthetic_test_passed else 'FAILED'}")
+    print(f"Benchmark Test: {'PASSED' if benchmark_test_passed else 'FAILED'}")
     print(f"Test Report Generated: {'YES' if report_generated else 'NO'}")
     
-    if backend_test_passed and integrity_test_passed:
+    if (backend_test_passed and integrity_test_passed and sqlite_test_passed and import_test_passed
+            and format_test_passed and service_test_passed and synthetic_test_passed
+            and benchmark_test_passed):
         print("\n🎉 ALL TESTS PASSED! SYSTEM IS READY FOR USE! 🎉")
         return True
     else:
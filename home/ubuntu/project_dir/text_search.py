@@ -0,0 +1,183 @@
+# text_search.py - Arabic-aware full-text search over citizen names, addresses and needs
+#
+# Text is normalized before indexing and querying: diacritics and tatweel are stripped,
+# alef/hamza forms are unified, taa marbuta becomes haa, alef maqsura becomes yaa and
+# Arabic-Indic digits become ASCII. SearchIndex is a two-level inverted index: word ->
+# postings (an array of citizen id * 4 + field), and character trigram -> the words that
+# contain it. A query term matches a word exactly, as a prefix (bisect over the sorted
+# vocabulary) or fuzzily (trigram similarity), so only the vocabulary is searched and the
+# postings of the matching words are read. Postings are append-only; a citizen edited
+# after indexing keeps its current words aside so stale postings are skipped.
+
+import bisect
+import heapq
+import re
+from array import array
+
+SEARCH_FIELDS = ("full_name", "address", "needs_description")
+FIELD_WEIGHTS = (3.0, 2.0, 1.0)  # by position in SEARCH_FIELDS
+
+EXACT_WEIGHT = 1.0
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHT = 0.6
+# Fuzzy matching needs this trigram similarity (Dice) and a term of at least this length
+FUZZY_MIN_SIMILARITY = 0.6
+FUZZY_MIN_TERM_LENGTH = 4
+MAX_PREFIX_WORDS = 200
+
+# Harakat, Quranic marks, superscript alef and tatweel
+_DIACRITICS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+_CHAR_MAP = str.maketrans({
+    # alef with hamza above/below, madda and wasla -> alef
+    "\u0623": "\u0627", "\u0625": "\u0627", "\u0622": "\u0627", "\u0671": "\u0627",
+    "\u0624": "\u0648",  # waw with hamza -> waw
+    "\u0626": "\u064a", "\u0649": "\u064a",  # yaa with hamza, alef maqsura -> yaa
+    "\u0629": "\u0647",  # taa marbuta -> haa
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+    **{chr(0x06f0 + digit): str(digit) for digit in range(10)},
+})
+_WORD = re.compile(r"[^\W_]+")
+
+
+def normalize_text(text):
+    """Search form of a text: Arabic letter variants unified, diacritics removed, case folded."""
+    return _DIACRITICS.sub("", str(text or "")).translate(_CHAR_MAP).casefold()
+
+
+def tokenize(text):
+    """Normalized words of a text."""
+    return _WORD.findall(normalize_text(text))
+
+
+def trigrams(word):
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _similarity(grams, other_grams):
+    return 2.0 * len(grams & other_grams) / (len(grams) + len(other_grams))
+
+
+class SearchIndex:
+    """Inverted n-gram index of citizen text fields, updated as citizens are added or edited."""
+
+    def __init__(self):
+        self._postings = {}    # word -> array of citizen id * 4 + field position
+        self._vocabulary = []  # sorted words, for prefix ranges
+        self._grams = {}       # trigram -> set of words
+        self._current = {}     # citizen id -> {(word, field position)} for citizens edited after indexing
+        self.documents = 0
+
+    @staticmethod
+    def _words(citizen):
+        return {(word, position) for position, field in enumerate(SEARCH_FIELDS)
+                for word in tokenize(citizen.get(field))}
+
+    @classmethod
+    def build(cls, citizens):
+        """Indexes many citizen rows at once, sorting the vocabulary once at the end."""
+        index = cls()
+        for citizen in citizens:
+            index._add(citizen, sort_vocabulary=False)
+        index._vocabulary = sorted(index._postings)
+        return index
+
+    def _post(self, citizen_id, words, sort_vocabulary=True):
+        for word, position in words:
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = array("Q")
+                if sort_vocabulary:
+                    bisect.insort(self._vocabulary, word)
+                for gram in trigrams(word):
+                    self._grams.setdefault(gram, set()).add(word)
+            postings.append(citizen_id * 4 + position)
+
+    def _add(self, citizen, sort_vocabulary):
+        try:
+            citizen_id = int(citizen.get("id"))
+        except (TypeError, ValueError):
+            return
+        self._post(citizen_id, self._words(citizen), sort_vocabulary)
+        self.documents += 1
+
+    def add(self, citizen):
+        """Indexes a citizen row (rows without a numeric id are skipped)."""
+        self._add(citizen, sort_vocabulary=True)
+
+    def update(self, old, new):
+        """Re-indexes a citizen whose text fields changed from row `old` to row `new`."""
+        try:
+            citizen_id = int(new.get("id"))
+        except (TypeError, ValueError):
+            return
+        words = self._words(new)
+        old_words = self._current.get(citizen_id)
+        if old_words is None:
+            old_words = self._words(old) if old is not None else set()
+        if words == old_words:
+            return
+        self._current[citizen_id] = words
+        self._post(citizen_id, words - old_words)
+
+    def _matching_words(self, term):
+        """{word: match weight} of the vocabulary words a query term matches."""
+        matches = {}
+        start = bisect.bisect_left(self._vocabulary, term)
+        for word in self._vocabulary[start:start + MAX_PREFIX_WORDS]:
+            if not word.startswith(term):
+                break
+            matches[word] = EXACT_WEIGHT if word == term else PREFIX_WEIGHT * (0.5 + 0.5 * len(term) / len(word))
+        if len(term) >= FUZZY_MIN_TERM_LENGTH:
+            grams = trigrams(term)
+            shared = {}
+            for gram in grams:
+                for word in self._grams.get(gram, ()):
+                    shared[word] = shared.get(word, 0) + 1
+            for word, count in shared.items():
+                # Dice similarity can only reach the threshold if enough trigrams are shared
+                if word in matches or 2.0 * count < FUZZY_MIN_SIMILARITY * len(grams):
+                    continue
+                similarity = _similarity(grams, trigrams(word))
+                if similarity >= FUZZY_MIN_SIMILARITY:
+                    matches[word] = FUZZY_WEIGHT * similarity
+        return matches
+
+    def _term_scores(self, term):
+        """{citizen id: best weighted score} of the citizens matching one query term."""
+        scores = {}
+        current = self._current
+        for word, weight in self._matching_words(term).items():
+            for code in self._postings[word]:
+                citizen_id, position = code >> 2, code & 3
+                if current and citizen_id in current and (word, position) not in current[citizen_id]:
+                    continue  # posting left over from before an edit
+                score = weight * FIELD_WEIGHTS[position]
+                if score > scores.get(citizen_id, 0.0):
+                    scores[citizen_id] = score
+        return scores
+
+    def search(self, query, limit=20, predicate=None):
+        """Returns [(citizen id, score)] best first; every query word must match some field.
+
+        predicate(citizen_id) can exclude citizens (e.g. inactive ones).
+        """
+        terms = sorted(set(tokenize(query)), key=len, reverse=True)
+        if not terms:
+            return []
+        totals = None
+        for term in terms:
+            scores = self._term_scores(term)
+            if totals is None:
+                totals = scores
+            else:
+                totals = {citizen_id: total + scores[citizen_id]
+                          for citizen_id, total in totals.items() if citizen_id in scores}
+            if not totals:
+                return []
+        candidates = totals.items()
+        if predicate is not None:
+            candidates = ((citizen_id, score) for citizen_id, score in candidates if predicate(citizen_id))
+        best = heapq.nsmallest(limit, candidates, key=lambda item: (-item[1], item[0]))
+        return [(str(citizen_id), round(score, 4)) for citizen_id, score in best]
+
@@ -0,0 +1,149 @@
+# virtual_treeview.py - Virtualized, paged Treeview for very long lists
+#
+# A normal ttk.Treeview holds one Tk item per row, which becomes unusable at
+# 100k+ rows. VirtualTreeview only ever holds the rows that fit in the window:
+# rows are fetched a page at a time through a fetch_page(offset, limit) callback,
+# the pages around the visible window are kept as a buffer, and the scrollbar is
+# driven by the total row count instead of by the Treeview itself.
+
+import tkinter as tk
+from tkinter import ttk
+
+DEFAULT_PAGE_SIZE = 200
+DEFAULT_BUFFER_PAGES = 2
+HEADER_HEIGHT = 25
+DEFAULT_ROW_HEIGHT = 20
+
+
+class VirtualTreeview(tk.Frame):
+    """Frame with a Treeview and scrollbar that shows rows fetched on demand.
+
+    fetch_page(offset, limit) must return (list of value tuples, total row count).
+    Configure headings and columns on the .tree attribute as with a normal Treeview.
+    """
+
+    def __init__(self, parent, columns, fetch_page, page_size=DEFAULT_PAGE_SIZE,
+                 buffer_pages=DEFAULT_BUFFER_PAGES, **tree_options):
+        super().__init__(parent)
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.buffer_pages = buffer_pages
+        self.total = 0
+        self.first = 0
+        self.selected_index = None
+        self._pages = {}
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", **tree_options)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(expand=True, fill="both")
+
+        self.tree.bind("<Configure>", lambda event: self._render())
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll_by(3))
+        self.tree.bind("<Up>", lambda event: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda event: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda event: self._move_selection(-self.visible_rows()))
+        self.tree.bind("<Next>", lambda event: self._move_selection(self.visible_rows()))
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+
+    # ---------------------------- DATA ----------------------------
+    def refresh(self):
+        """Drops every fetched page and reloads the current window (e.g. after the data changed)."""
+        self._pages.clear()
+        self._load_page(self.first // self.page_size)
+        self.first = max(0, min(self.first, self.total - 1))
+        self._render()
+
+    def _load_page(self, page_number):
+        if page_number not in self._pages:
+            rows, self.total = self.fetch_page(page_number * self.page_size, self.page_size)
+            self._pages[page_number] = rows
+        return self._pages[page_number]
+
+    def _row(self, index):
+        page = self._load_page(index // self.page_size)
+        offset = index % self.page_size
+        return page[offset] if offset < len(page) else None
+
+    def _evict_pages(self, first_page, last_page):
+        keep = range(first_page - self.buffer_pages, last_page + self.buffer_pages + 1)
+        for page_number in [p for p in self._pages if p not in keep]:
+            del self._pages[page_number]
+
+    # ---------------------------- VIEW ----------------------------
+    def visible_rows(self):
+        row_height = ttk.Style().lookup("Treeview", "rowheight") or DEFAULT_ROW_HEIGHT
+        height = self.tree.winfo_height()
+        if height <= 1:  # not mapped yet
+            return int(self.tree.cget("height") or 10)
+        return max(1, (height - HEADER_HEIGHT) // int(row_height))
+
+    def _render(self):
+        visible = self.visible_rows()
+        self.first = max(0, min(self.first, self.total - visible))
+        last = min(self.first + visible, self.total)
+
+        self.tree.delete(*self.tree.get_children())
+        for index in range(self.first, last):
+            values = self._row(index)
+            if values is None:
+                break
+            self.tree.insert("", tk.END, iid=str(index), values=values)
+        if self.selected_index is not None and self.first <= self.selected_index < last:
+            self.tree.selection_set(str(self.selected_index))
+            self.tree.focus(str(self.selected_index))
+
+        self._evict_pages(self.first // self.page_size, max(self.first, last - 1) // self.page_size)
+        if self.total:
+            self.scrollbar.set(self.first / self.total, last / self.total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll_to(self, index, select=False):
+        """Scrolls so that row index is visible (at the top when it was off screen)."""
+        if self.total == 0:
+            self._load_page(0)
+        index = max(0, min(int(index), self.total - 1))
+        visible = self.visible_rows()
+        if not self.first <= index < self.first + visible:
+            self.first = index
+        if select:
+            self.selected_index = index
+        self._render()
+
+    def scroll_by(self, rows):
+        self.first += rows
+        self._render()
+
+    # ---------------------------- EVENTS ----------------------------
+    def _on_scrollbar(self, action, *args):
+        visible = self.visible_rows()
+        if action == "moveto":
+            self.first = int(float(args[0]) * self.total)
+        elif action == "scroll":
+            amount, unit = int(args[0]), args[1]
+            self.first += amount * (visible if unit == "pages" else 1)
+        self._render()
+
+    def _on_mousewheel(self, event):
+        self.scroll_by(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def _on_select(self, event):
+        selection = self.tree.selection()
+        if selection:
+            self.selected_index = int(selection[0])
+
+    def _move_selection(self, step):
+        current = self.selected_index if self.selected_index is not None else self.first - 1
+        index = max(0, min(current + step, self.total - 1))
+        visible = self.visible_rows()
+        if index < self.first:
+            self.first = index
+        elif index >= self.first + visible:
+            self.first = index - visible + 1
+        self.selected_index = index
+        self._render()
+        return "break"